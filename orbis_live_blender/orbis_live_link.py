@@ -45,6 +45,9 @@ HI_BANDS  =  ["5000Hz","6000Hz","10000Hz","15000Hz","20000Hz"]
 # Señales que llegarán a los sockets de Geometry Nodes
 INPUT_BAL_LH  = "SpectralBalance_LH"   # grave ↔ agudo  (‑1 a +1)
 INPUT_BAL_MID = "SpectralBalance_MID"  # peso de medios (‑1 a +1)
+INPUT_ONSET   = "Onset"                # 1 en cada golpe, decae a 0
+ONSET_DECAY   = 0.5                    # por lectura sin golpes nuevos
+STALE_S       = 0.5                    # frame analizado hace más que esto = fuente parada, no se aplica
 
 last_data = {
     "volume": 0.0,
@@ -57,8 +60,16 @@ last_data = {
     "dev_himid": 0.0,
     "dev_high": 0.0,
     "spectrum": {},
+    "onset": 0.0,
+    "bpm": 0.0,
     "timestamp": 0.0,
+    "seq": None,
+    "lag": 0.0,
+    "stale": False,
+    "silent": False,
 }
+# último JSON parseado y su mtime: sin escritura nueva (p. ej. silencio) no se vuelve a parsear
+_json_cache = {"mtime": None, "data": {}}
 
 # --- 1 · Valores de referencia pop (dBFS) -----------------------------
 REF_DB = {
@@ -78,6 +89,14 @@ ZONE_MAP = {
     "HIMID" : ["2000Hz", "5000Hz"],
     "HIGH"  : ["6000Hz", "10000Hz", "15000Hz", "20000Hz"]
 }
+# Rangos (Hz) de cada zona cuando el JSON trae "bands" (octavas ISO 266)
+ZONE_RANGES = {
+    "LOW"   : (20, 120),
+    "LOWMID": (120, 500),
+    "MID"   : (500, 2000),
+    "HIMID" : (2000, 6000),
+    "HIGH"  : (6000, 20001),
+}
 DEV_SOCKETS = {
     "LOW"   : "Dev_LOW",
     "LOWMID": "Dev_LOWMID",
@@ -94,8 +113,16 @@ def compute_deviation(db_list, ref):
     # normalizamos al rango (‑1 .. 1) usando la tolerancia
     return max(-1, min(1, delta / TOLERANCE))
 
-def calc_zone_deltas(spec_dict):
+def calc_zone_deltas(spec_dict, bands=None):
+    # Con "bands" (todas las bandas de octava fraccional) cada zona promedia
+    # las bandas cuyo centro cae en su rango; si no, usa las 12 claves de ZONE_MAP.
     deltas = {}
+    if bands:
+        centers = [(float(k[:-2]), v) for k, v in bands.items()]
+        for zone, (lo, hi) in ZONE_RANGES.items():
+            values = [v for f, v in centers if lo <= f < hi]
+            deltas[zone] = compute_deviation(values, REF_DB[zone])
+        return deltas
     for zone, bands in ZONE_MAP.items():
         values = [spec_dict.get(b, -60) for b in bands]  # -60 dB si no viene
         deltas[zone] = compute_deviation(values, REF_DB[zone])
@@ -151,6 +178,10 @@ def update_geometry_nodes():
         for key, socket_name in DEV_SOCKETS.items():
             if socket_name in ng.inputs:
                 ng.inputs[socket_name].default_value = last_data[f"dev_{key.lower()}"]
+
+        # Golpes (onsets) detectados por Orbis
+        if INPUT_ONSET in ng.inputs:
+            ng.inputs[INPUT_ONSET].default_value = last_data["onset"]
     except Exception as e:
         print("[Orbis] Error aplicando datos:", e)
 
@@ -166,8 +197,29 @@ def refresh_loop():
             try:
                 if os.path.exists(JSON_PATH):
                     #print(f"[Orbis] JSON leído correctamente: {JSON_PATH}")
-                    with open(JSON_PATH, "r") as f:
-                        data = json.load(f)
+                    mtime = os.stat(JSON_PATH).st_mtime_ns
+                    if mtime != _json_cache["mtime"]:
+                        with open(JSON_PATH, "r") as f:
+                            _json_cache["data"] = json.load(f)
+                        _json_cache["mtime"] = mtime
+                    data = _json_cache["data"]
+                    # Orbis sella cada frame con seq y t_adc / t_done en time.monotonic(), reloj común
+                    # a todos los procesos del equipo → retardo real captura → Blender.  Mismo seq = nada
+                    # nuevo; analizado hace más de STALE_S = Orbis cerrado o atascado.  En ambos casos solo decae el golpe.
+                    # "silent": Orbis escribió el primer frame de silencio y no escribirá más hasta que vuelva
+                    # la señal → frame viejo pero válido, no "sin datos".
+                    seq = data.get("seq")
+                    last_data["silent"] = bool(data.get("silent", False))
+                    if data.get("clock") == "monotonic" and data.get("t_done") is not None:
+                        now = time.monotonic()
+                        last_data["lag"] = now - data["t_adc"]
+                        last_data["stale"] = now - data["t_done"] > STALE_S and not last_data["silent"]
+                    if last_data["stale"] or (seq is not None and seq == last_data["seq"]):
+                        last_data["onset"] *= ONSET_DECAY
+                        bpy.app.timers.register(update_geometry_nodes, first_interval=0.0)
+                        time.sleep(0.1)
+                        continue
+                    last_data["seq"] = seq
                     last_data["bal_lh"]      = float(data.get("bal_lh", 0.0))
                     last_data["bal_mid"]     = float(data.get("bal_mid", 0.0))
                     last_data["dev_low"]     = float(data.get("dev_low", 0.0))
@@ -178,32 +230,39 @@ def refresh_loop():
                     last_data["volume"] = float(data.get("volume", 0.0))
                     last_data["dominant_freq"] = float(data.get("dominant_freq") or data.get("dominant-freq") or 0.0)
                     last_data["spectrum"] = data.get("spectrum", {})
-                    zone = calc_zone_deltas(last_data["spectrum"])
+                    # "onsets" lista los golpes desde el export anterior → pulso que decae
+                    last_data["onset"] = 1.0 if data.get("onsets") else last_data["onset"] * ONSET_DECAY
+                    last_data["bpm"] = float(data.get("bpm", 0.0))
+                    # Orbis ya exporta dev_* y bal_* desde su registro de features;
+                    # solo se recalculan aquí con JSON antiguos que no los traen.
+                    if "dev_low" in data:
+                        zone = {k: float(data.get(f"dev_{k.lower()}", 0.0)) for k in DEV_SOCKETS}
+                    else:
+                        zone = calc_zone_deltas(last_data["spectrum"], data.get("bands"))
                     last_data["zone_dev"] = zone     # {'LOW':‑0.3, 'MID':+0.8…}
 
-                    
-
-                    # ------------------------------------------------------------------
-                    # Cálculo de los pesos espectrales
-                    # ------------------------------------------------------------------
-                    # 1 · Helper para pasar de dB → lineal
-                    def db_to_amp(db):
-                        """Devuelve amplitud lineal a partir de dBFS."""
-                        return 10 ** (db / 20.0)
+                    if "bal_lh" not in data:
+                        # ------------------------------------------------------------------
+                        # Cálculo de los pesos espectrales
+                        # ------------------------------------------------------------------
+                        # 1 · Helper para pasar de dB → lineal
+                        def db_to_amp(db):
+                            """Devuelve amplitud lineal a partir de dBFS."""
+                            return 10 ** (db / 20.0)
 
-                    # 2 · Suma en lineal (amplitud) y calcula balances normalizados
-                    low_amp  = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in LOW_BANDS)
-                    mid_amp  = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in MID_BANDS)
-                    high_amp = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in HI_BANDS)
+                        # 2 · Suma en lineal (amplitud) y calcula balances normalizados
+                        low_amp  = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in LOW_BANDS)
+                        mid_amp  = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in MID_BANDS)
+                        high_amp = sum(db_to_amp(last_data["spectrum"].get(b, -120)) for b in HI_BANDS)
 
-                    total = max(low_amp + mid_amp + high_amp, 1e-6)  # evita división 0
+                        total = max(low_amp + mid_amp + high_amp, 1e-6)  # evita división 0
 
-                    # −1 (dominan graves) … 0 … +1 (dominan agudos)
-                    last_data["bal_lh"] = (high_amp - low_amp) / total
+                        # −1 (dominan graves) … 0 … +1 (dominan agudos)
+                        last_data["bal_lh"] = (high_amp - low_amp) / total
 
-                    # −1 (pocos medios) … 0 … +1 (sobran medios)
-                    last_data["bal_mid"] = (mid_amp - 0.5 * (low_amp + high_amp)) / total
-                    # ------------------------------------------------------------------
+                        # −1 (pocos medios) … 0 … +1 (sobran medios)
+                        last_data["bal_mid"] = (mid_amp - 0.5 * (low_amp + high_amp)) / total
+                        # ------------------------------------------------------------------
 
                     last_data["timestamp"] = time.time()
 
@@ -248,18 +307,20 @@ class ORBIS_PT_sidebar(bpy.types.Panel):
         col.label(text="JSON path:")
         col.label(text=os.path.basename(JSON_PATH), icon='FILE')
 
-        connected = last_data["timestamp"] > 0 and os.path.exists(JSON_PATH)
-        col.label(text="Conectado:" if connected else "Sin datos", 
+        connected = last_data["timestamp"] > 0 and not last_data["stale"] and os.path.exists(JSON_PATH)
+        col.label(text=("Silencio" if last_data["silent"] else "Conectado:") if connected else "Sin datos", 
                   icon='CHECKMARK' if connected else 'ERROR')
 
         col.label(text=f"dB: {last_data['volume']:.1f}")
         col.label(text=f"Freq: {last_data['dominant_freq']:.1f} Hz")
         col.label(text=f"Bal LH:  {last_data['bal_lh']:+.2f}")
         col.label(text=f"Bal MID: {last_data['bal_mid']:+.2f}")
+        col.label(text=f"BPM: {last_data['bpm']:.1f}")
 
         if last_data["timestamp"] > 0:
             t = time.localtime(last_data["timestamp"])
             col.label(text="Última lectura: " + time.strftime("%H:%M:%S", t))
+            col.label(text=f"Retardo: {last_data['lag'] * 1000:.0f} ms")
     
         col.separator()
         col.label(text="Bandas de Espectro (dB):", icon='SOUND')
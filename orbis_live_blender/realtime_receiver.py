@@ -1,10 +1,19 @@
 # realtime_receiver.py (Blender)
 import bpy
+import pathlib
 import socket
+import sys
 import threading
+import time
+
+# frame_codec.py vive junto al analizador; solo necesita numpy (incluido en Blender)
+CODE_DIR = pathlib.Path(__file__).resolve().parents[1] / "proyecto_integrado-main" / "proyecto Integrado"
+sys.path.insert(0, str(CODE_DIR))
+from frame_codec import FrameDecoder, CodecError
 
 HOST = 'localhost'
 PORT = 65432
+STALE_S = 0.5   # frames analizados hace más que esto (t_done, reloj monotónico del equipo) se descartan
 
 # Deformación en Geometry Nodes (mejor opción a largo plazo),
 # pero aquí aplicamos en escala como ejemplo simple
@@ -14,13 +23,27 @@ def aplicar_deformacion(obj, grave, medio, agudo):
     a = 1 + agudo*2  # eje Z
     obj.scale = (s, m, a)
 
+def nivel(db):
+    # pico de banda en dB → 0‥1 (‑60 dB o menos = 0)
+    return max(0.0, min(1.0, (db + 60.0) / 60.0))
+
 def receptor():
+    decoder = FrameDecoder()
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
         s.bind((HOST, PORT))
         while True:
-            data, _ = s.recvfrom(1024)
-            grave, medio, agudo = map(float, data.decode().split(","))
-            bpy.app.timers.register(lambda: aplicar_deformacion(bpy.data.objects["Icosphere"], grave, medio, agudo), first_interval=0.0)
+            data, _ = s.recvfrom(65536)
+            try:
+                frame = decoder.decode(data)
+            except CodecError:
+                continue        # paquete perdido: los deltas esperan al siguiente key frame
+            if time.monotonic() - frame.get("t_done", time.monotonic()) > STALE_S:
+                continue        # llegó tarde (Blender ocupado, cola del socket llena): mejor saltarlo
+            grave, medio, agudo = (nivel(frame.get(f"features.band_peaks.{k}", -60.0))
+                                   for k in ("low", "mid", "high"))
+            bpy.app.timers.register(lambda g=grave, m=medio, a=agudo:
+                                    aplicar_deformacion(bpy.data.objects["Icosphere"], g, m, a),
+                                    first_interval=0.0)
 
 # Lanza el receptor como hilo
 threading.Thread(target=receptor, daemon=True).start()
@@ -1,19 +1,39 @@
 # realtime_sender.py
+# Envía cada frame del analizador por UDP con el códec binario (frame_codec.py):
+# dB en int16 a 0.01 dB, deltas contra el frame anterior y zlib → ~100 B por frame en vez de ~1 KB de JSON.
+#   python realtime_sender.py              → entrada en vivo (loopback / dispositivo por defecto)
+#   python realtime_sender.py audio.wav    → reproduce un fichero en bucle, a tiempo real
+import pathlib
 import socket
+import sys
 import time
+
+CODE_DIR = pathlib.Path(__file__).resolve().parents[1] / "proyecto_integrado-main" / "proyecto Integrado"
+sys.path.insert(0, str(CODE_DIR))
+
 from audio_analyzer import AudioAnalyzer
-from exportador_csv import extraer_bandas  # asegúrate de que este está en el mismo path
+from frame_codec import FrameEncoder, frame_fields
+from sources import FileSource
 
 HOST = 'localhost'
 PORT = 65432
 
-analyzer = AudioAnalyzer("tu_audio.wav")  # o sin parámetro para micrófono
-sample_rate = analyzer.rate
+source = FileSource(sys.argv[1], loop=True) if len(sys.argv) > 1 else None
+analyzer = AudioAnalyzer(source=source, multirate=True)
+analyzer.subscribe(("band_peaks",))
+encoder = FrameEncoder("zlib")          # key frame cada 60 frames: el receptor se resincroniza si pierde uno
 
 with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-    while True:
-        data = analyzer.get_frequency_data()
-        bandas = extraer_bandas(data, sample_rate)
-        mensaje = f"{bandas['Grave']:.3f},{bandas['Medio']:.3f},{bandas['Agudo']:.3f}"
-        s.sendto(mensaje.encode(), (HOST, PORT))
-        time.sleep(0.1)  # 10 veces por segundo
+    def enviar(frame):
+        # Hilo de audio: un sendto no bloqueante por frame (UDP), sin esperar a nadie.
+        s.sendto(encoder.encode(frame_fields(frame), frame["seq"]), (HOST, PORT))
+
+    analyzer.frames.add_listener(enviar)
+    analyzer.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        analyzer.stop()
@@ -1,39 +1,105 @@
 """
-audio_analyzer.py  – safe‑fallback version
-• If a device called “Stereo Mix” exists, use it.
-• Otherwise leave PortAudio’s default input unchanged.
+audio_analyzer.py  – source-agnostic analysis chain
+• Blocks come from an AudioSource (sources.py): live PortAudio input by
+  default – a “Stereo Mix” / loopback device if one exists, otherwise
+  PortAudio’s default input – or a file player / synthetic generator.
 • You can still pass an explicit `device` index/name from the UI.
+• Nothing touches PortAudio at import time, so the DSP runs headless.
+• Frames carry seq, t_adc (capture of the block's first sample) and
+  t_done (analysis finished), both on time.monotonic(), so consumers in
+  any process on the machine can measure their lag and drop stale frames.
+• callback / fft / bands durations go to instrumentation.HOT_PATH (or the
+  `timings` passed in), budgeted against the block period.  With a
+  `timings_key` the stages are "callback/<key>" …, so analyzers running in
+  parallel (MultiStreamManager) never share a histogram or a budget.
+• FFT size, frequency range, sensitivity and band resolution form one
+  AnalysisPlan.  set_plan() builds the next plan on the caller's thread and
+  swaps it in with a single assignment, so the stream never stops and a
+  frame is always analysed with one plan.  Blocks go through a ring, hence
+  the FFT size is free of the block size (`hop`): a small hop with a long
+  FFT gives fine bins at a high frame rate, a short FFT reacts faster.
+• Metering on every block: RMS, sample / true peak (true_peak.py) and
+  momentary / short-term loudness in LUFS (loudness.py, BS.1770).
+• A SilenceGate (silence_gate.py) runs on the block level: while the input
+  is silent only metering runs (FFT, bands, features, pitch once per
+  idle_s) and frames carry silent = True, so the cockpit and exporters can
+  stop redrawing / writing.  silence_gate=False analyses every block.
 """
 
-import warnings
-import threading
+import time
 from typing import Any, Dict, Optional
 
 import numpy as np
-import sounddevice as sd
-from sounddevice import PortAudioError   # only used for caller-side handling
+
+from octave_bands import OctaveBands
+from multirate    import DecimationPyramid
+from true_peak    import TruePeakMeter
+from loudness     import LoudnessMeter
+from pitch        import PitchTracker
+from features     import SpectralFrame, Subscription, default_registry
+from onsets       import OnsetDetector, BeatTracker
+from frames       import FrameChannel
+from stereo       import StereoMeter
+from silence_gate import SilenceGate
+from sources      import AudioSource, PortAudioSource
+from instrumentation import HOT_PATH, StageTimings
+
+MULTIRATE_FFT = 2048        # FFT size of every pyramid stage
+MULTIRATE_HOP = 1024        # PortAudio block size in multirate mode
+FFT_SIZES = (512, 1024, 2048, 4096, 8192, 16384)   # what the cockpit offers live
+MAX_FFT   = FFT_SIZES[-1]   # ring length (or the block size, if larger)
 
 
 # ---------------------------------------------------------------------------
-# Prefer “Stereo Mix”, but don’t crash if it isn’t there
-# ---------------------------------------------------------------------------
-preferred = next(
-    (i for i, d in enumerate(sd.query_devices()) if "Stereo Mix" in d["name"]),
-    None,
-)
+class AnalysisPlan:
+    """
+    Immutable per-frame setup: Hann window, FFT size, band weights, search
+    range and the magnitude scale.  Levels stay on the scale of a `ref_size`
+    FFT (the size the analyzer opened with, as DecimationPyramid does), so a
+    live size change does not move every dB reading by 6 dB per octave.
+    """
+
+    def __init__(self, sample_rate: int, n_fft: int, band_fraction: int = 3,
+                 f_min: float = 20.0, f_max: float = 20000.0, gain_db: float = 0.0,
+                 ref_size: Optional[int] = None):
+        self.sample_rate   = int(sample_rate)
+        self.n_fft         = int(n_fft)
+        self.band_fraction = int(band_fraction)
+        self.f_min         = float(f_min)
+        self.f_max         = min(float(f_max), self.sample_rate / 2)
+        if not 0 < self.f_min < self.f_max:
+            raise ValueError(f"frequency range {f_min}…{f_max} Hz is empty")
+        self.gain_db       = float(gain_db)
+        self.ref_size      = int(ref_size or self.n_fft)
+        self.scale         = 10 ** (self.gain_db / 20) * self.ref_size / self.n_fft
+        self.window        = np.hanning(self.n_fft)
+        self.bands         = OctaveBands(self.sample_rate, self.n_fft, self.band_fraction,
+                                         self.f_min, self.f_max, window=self.window)
+
+    @property
+    def window_s(self) -> float:
+        """Analysis window length in seconds (time smear of every frame)."""
+        return self.n_fft / self.sample_rate
+
+    def peak_range(self, n_bins: int, n_fft: int) -> tuple:
+        """(first, end) bins of f_min…f_max in an n_fft-point spectrum at sample_rate."""
+        df = self.sample_rate / n_fft
+        return max(int(self.f_min / df), 0), min(int(self.f_max / df) + 1, n_bins)
 
-if preferred is not None:
-    sd.default.device = (preferred, None)      # (input, output) tuple
-    print(f"✓ Using input device: Stereo Mix  (index {preferred})")
-else:
-    warnings.warn("Stereo Mix not found – using system‑default input device")
+    def replace(self, **kw) -> "AnalysisPlan":
+        """Copy with the given fields changed (None = keep)."""
+        args = dict(n_fft=self.n_fft, band_fraction=self.band_fraction, f_min=self.f_min,
+                    f_max=self.f_max, gain_db=self.gain_db, ref_size=self.ref_size)
+        args.update({k: v for k, v in kw.items() if v is not None})
+        return AnalysisPlan(self.sample_rate, **args)
 
 
 # ---------------------------------------------------------------------------
 class AudioAnalyzer:
     """
     Real‑time audio capture + basic FFT analyser.
-    Call start() / stop(), then read get_audio_data().
+    Call start() / stop(), then read get_audio_data().  With a `source`,
+    sample rate and channel count come from the source.
     """
 
     def __init__(
@@ -41,73 +107,331 @@ class AudioAnalyzer:
         sample_rate: int = 44100,
         chunk_size: int = 8192,
         device: Optional[int | str] = None,
+        band_fraction: int = 3,
+        multirate: bool = False,
+        channels: int = 1,
+        source: Optional[AudioSource] = None,
+        timings: Optional[StageTimings] = None,
+        timings_key: Optional[str] = None,
+        hop: Optional[int] = None,
+        n_fft: Optional[int] = None,
+        f_min: float = 20.0,
+        f_max: float = 20000.0,
+        gain_db: float = 0.0,
+        silence_gate: bool = True,
     ):
+        if source is None:
+            source = PortAudioSource(device, sample_rate, channels)
+        self.source      = source
+        sample_rate, channels = source.sample_rate, source.channels
         self.sample_rate = sample_rate
         self.chunk_size  = chunk_size
         self.device      = device            # may be None → use default
+        self.band_fraction = band_fraction   # 1/N octave (1, 3, 6, 24)
+        self.channels    = int(channels)     # 1 = mono; ≥2 adds per-channel + stereo stages
 
         # shared state
         self.volume         = 0.0
         self.dominant_freq  = 0.0
         self.fft_data: list[float] = []
+        self.band_levels    = np.zeros(0)   # mix (mono / mid)
+        self.channel_volume = np.full(self.channels, -200.0)
+        self.channel_bands: Optional[np.ndarray] = None    # (channels, bands)
+        self._stereo        = StereoMeter(self.sample_rate) if self.channels >= 2 else None
+        self.stereo: Optional[Dict[str, Any]] = None
+        self._bands: Optional[OctaveBands] = None
+        self._peak_meter    = TruePeakMeter(self.sample_rate)
+        self.peaks          = self._peak_meter.values()
+        self._loudness      = LoudnessMeter(self.sample_rate)
+        self.loudness       = self._loudness.values()
+        self.peak_freq      = 0.0            # raw spectral peak (jumpy)
+        self._pitch         = PitchTracker()
+        self.pitch_info     = self._pitch.values()
+        # feature extractors: declared once, run only when subscribed
+        self.registry       = default_registry()
+        self.features: Dict[str, Any] = {}
+        # onset / beat stage runs on the registry's spectral flux
+        self._flux_sub      = self.registry.subscribe(("flux",))
+        self._onsets        = OnsetDetector(self.sample_rate)
+        self._beats         = BeatTracker(self.sample_rate)
+        self._sample_pos    = 0              # samples since the stream started
+        self._t_adc         = 0.0            # monotonic capture time of the last block
+        # every analysed block is published here (seq-numbered, listeners)
+        self.frames         = FrameChannel()
+        self._taps: tuple = ()               # raw-block listeners (recorder …)
+        # silence: metering only, full analysis once per gate.idle_s
+        self.gate: Optional[SilenceGate] = SilenceGate(self.sample_rate) if silence_gate else None
+        self.silent         = False
 
-        # open PortAudio stream (caller may need to catch PortAudioError)
-        self._stream = sd.InputStream(
-            callback=self._callback,
-            channels=1,
-            samplerate=self.sample_rate,
-            blocksize=self.chunk_size,
-            device=self.device,
-        )
+        # multirate mode: small hops, octave pyramid supplies the bands
+        self._pyramid: Optional[DecimationPyramid] = None
+        blocksize = hop or self.chunk_size
+        if multirate:
+            blocksize = MULTIRATE_HOP
+            self._pyramid = DecimationPyramid(
+                self.sample_rate, n_fft=MULTIRATE_FFT, hop=MULTIRATE_HOP,
+                fraction=self.band_fraction, ref_size=self.chunk_size,
+            )
 
-        self._thread = threading.Thread(target=self._stream.start, daemon=True)
+        # a source with its own block size wins (e.g. a file read in 512s)
+        if source.blocksize is None:
+            source.blocksize = blocksize
+        self.blocksize = source.blocksize
+
+        # FFT input: the newest n_fft samples of a ring written twice (every
+        # read is one contiguous view).  With a `hop`, chunk_size stays the
+        # FFT size; without, one block per FFT as before (also a file read in
+        # 512s).  The first plan's size is the dB reference of later ones.
+        self._ring_cap = max(MAX_FFT, self.blocksize)
+        self._ring     = np.zeros((self.channels, 2 * self._ring_cap))
+        self._ring_pos = 0
+        n_fft = int(n_fft or (self.chunk_size if hop else self.blocksize))
+        self._check_fft(n_fft)
+        self._plan = AnalysisPlan(self.sample_rate, n_fft, self.band_fraction, f_min, f_max, gain_db)
+
+        # stage histograms: the whole callback must fit one block period
+        self.timings = HOT_PATH if timings is None else timings
+        self._stage_cb, self._stage_fft, self._stage_bands = (
+            f"{s}/{timings_key}" if timings_key else s for s in ("callback", "fft", "bands"))
+        period = self.blocksize / self.sample_rate
+        self.timings.set_budget(self._stage_cb, period)
+        self.timings.set_budget(self._stage_fft, period / 4)
+        self.timings.set_budget(self._stage_bands, period / 4)
+
+        # open the device now (caller may need to catch PortAudioError)
+        source.open()
 
     # -----------------------------------------------------------------------
-    # PortAudio callback – runs in its own thread
+    # source callback – runs in the source's thread (PortAudio, file, worker)
     # -----------------------------------------------------------------------
-    def _callback(self, indata, frames, time, status):
-        signal = indata[:, 0]
+    def process(self, indata: np.ndarray, t_adc: Optional[float] = None) -> None:
+        """Analyse one (samples, channels) block and publish its frame."""
+        t_start = time.perf_counter_ns()
+        timings = self.timings
+        plan    = self._plan                          # read once: set_plan() may swap it meanwhile
+        for tap in self._taps:
+            tap(indata)
+        frames = len(indata)
+        # sources stamp the capture time; direct callers get "just arrived"
+        self._t_adc = t_adc if t_adc is not None else time.monotonic() - frames / self.sample_rate
+        x = indata.T                                  # (channels, samples)
+        # mix feeding the mono stages (pitch, onsets, pyramid): mono or mid
+        signal = x[0] if len(x) == 1 else x.mean(axis=0)
+
+        # --- volume (RMS → dBFS), per channel in one pass ----------------
+        ms = np.mean(x ** 2, axis=1)
+        self.channel_volume = 10 * np.log10(np.maximum(ms, 1e-20))
+        self.volume = 10 * np.log10(max(float(ms.mean()), 1e-20))
 
-        # --- volume (RMS → dBFS) ------------------------------------------
-        rms       = np.sqrt(np.mean(signal ** 2))
-        self.volume = 20 * np.log10(max(rms, 1e-10))
+        # --- sample / true peak (4× polyphase, BS.1770 Annex 2) -----------
+        self.peaks = self._peak_meter.process(x)
+        # --- K-weighted loudness, momentary / short-term (BS.1770) --------
+        self.loudness = self._loudness.process(x)
 
-        # --- FFT with Hann window -----------------------------------------
-        window = np.hanning(len(signal))
-        windowed = signal * window
-        fft      = np.abs(np.fft.rfft(windowed))
-        self.fft_data = fft
+        # --- silence gate: skip the spectral stages between idle analyses -
+        gate, was_silent = self.gate, self.silent
+        self.silent = gate is not None and gate.update(self.volume, frames)
+        if self.silent and not was_silent:
+            # the pause ends the piece: tempo / phase / onset threshold start over when sound returns
+            self._onsets.reset()
+            self._beats.reset()
+        if self.silent and not gate.due(frames):
+            self._idle(x, signal, frames)
+            timings.record(self._stage_cb, t_start)
+            return
+
+        pyr = self._pyramid
+        if pyr is not None:
+            # --- multirate: decimate, small FFT per due stage --------------
+            if pyr.fraction != self.band_fraction:
+                pyr.set_fraction(self.band_fraction)
+            t0 = time.perf_counter_ns()
+            pyr.push(signal)
+            fft   = pyr.stage_spectrum(0)
+            n_fft = pyr.n_fft
+            if plan.gain_db:
+                fft = fft * 10 ** (plan.gain_db / 20)
+            timings.record(self._stage_fft, t0)
+            self.fft_data = fft
+            t0 = time.perf_counter_ns()
+            self._bands = pyr.layout
+            self.band_levels = pyr.levels() + plan.gain_db
+            timings.record(self._stage_bands, t0)
+            self.channel_bands = None             # pyramid runs on the mix only
+            spec = None
+        else:
+            # --- FFT with Hann window: channels (+ mix) in one batched call -
+            t0       = time.perf_counter_ns()
+            n_fft    = plan.n_fft
+            seg      = self._push(x, n_fft)           # newest n_fft samples (channels, n_fft)
+            rows     = seg if len(seg) == 1 else np.vstack((seg, seg.mean(axis=0)))
+            spec     = np.fft.rfft(rows * plan.window, axis=-1)
+            mags     = np.abs(spec)
+            if plan.scale != 1.0:
+                mags *= plan.scale
+            fft      = mags[-1]
+            self.fft_data = fft
+            timings.record(self._stage_fft, t0)
+
+            # --- fractional-octave bands (one gather + segmented sum) ------
+            t0 = time.perf_counter_ns()
+            bands = self._bands = plan.bands
+            levels = bands.levels(mags)
+            self.band_levels = levels[-1]
+            self.channel_bands = levels[:len(x)]
+            timings.record(self._stage_bands, t0)
+
+        # --- mid/side, phase correlation, width ----------------------------
+        if self._stereo is not None:
+            self.stereo = self._stereo.process(x, spec, self._bands if spec is not None else None)
 
         # --- dominant frequency (parabolic interp for sub‑bin accuracy) ----
-        peak_bin = int(np.argmax(fft))
+        k0, k1 = plan.peak_range(len(fft), n_fft)
+        peak_bin = k0 + int(np.argmax(fft[k0:k1])) if k1 > k0 else 0
 
-        if 1 <= peak_bin < len(fft) - 1:
+        if k0 < peak_bin < k1 - 1:                               # not on a range edge
             alpha, beta, gamma = fft[peak_bin - 1 : peak_bin + 2]
             p = 0.5 * (alpha - gamma) / (alpha - 2 * beta + gamma)
             peak_bin += p                                         # fractional shift
 
-        self.dominant_freq = peak_bin * self.sample_rate / self.chunk_size
+        self.peak_freq = peak_bin * self.sample_rate / n_fft
+
+        # --- tracked pitch on the same spectrum (stable across frames) ----
+        # multirate: stage 1 (fs/2) gives 4× finer bins than stage 0
+        if pyr is not None:
+            self.pitch_info = self._pitch.update(pyr.stage_spectrum(1), pyr.rates[1])
+        else:
+            self.pitch_info = self._pitch.update(fft, self.sample_rate)
+        pitch = self.pitch_info["pitch"]
+        self.dominant_freq = pitch if pitch > 0 else self.peak_freq
+
+        # --- subscribed spectral features (same spectrum, no extra FFT) ---
+        frame = SpectralFrame(fft, self.sample_rate, self._bands, self.band_levels)
+        self.features = self.registry.compute(frame)
+
+        # --- onsets (sample-accurate) + beat tracking ---------------------
+        start, flux = self._sample_pos, self.features.get("flux", 0.0)
+        onsets = self._onsets.process(flux, signal, start)
+        beats  = self._beats.process(start, frames, onsets)
+        self._sample_pos += frames
+
+        self.frames.publish(self._snapshot(start, onsets, beats))
+        timings.record(self._stage_cb, t_start)     # listeners included: they run on this thread
+
+    def _idle(self, x: np.ndarray, signal: np.ndarray, frames: int) -> None:
+        """Silent block: keep the FFT history current, publish the metering."""
+        self._onsets.reset(history=False)             # next analysed block does not follow the last one
+        if self._pyramid is not None:
+            self._pyramid.push(signal)                # decimator state / long windows
+        else:
+            self._push(x)
+        start = self._sample_pos
+        self._sample_pos += frames
+        self.frames.publish(self._snapshot(start, [], []))
+
+    def _push(self, x: np.ndarray, n: int = 0) -> np.ndarray:
+        """Append a (channels, samples) block to the ring → view of the newest n samples."""
+        cap, ring = self._ring_cap, self._ring
+        x = x[:, -cap:]
+        m, p = x.shape[1], self._ring_pos
+        first = min(m, cap - p)
+        ring[:, p:p + first] = ring[:, p + cap:p + cap + first] = x[:, :first]
+        if m > first:
+            ring[:, :m - first] = ring[:, cap:cap + m - first] = x[:, first:]
+        self._ring_pos = end = (p + m) % cap
+        return ring[:, end + cap - n:end + cap]
+
+    def _check_fft(self, n_fft: int) -> None:
+        if not 16 <= n_fft <= self._ring_cap:
+            raise ValueError(f"n_fft must be 16 … {self._ring_cap}, got {n_fft}")
 
     # -----------------------------------------------------------------------
     # public helpers
     # -----------------------------------------------------------------------
     def start(self) -> None:
-        """Begin capturing (non‑blocking)."""
-        self._thread.start()
+        """Begin capturing (non‑blocking); process() runs in the source's thread."""
+        self.source.start(self.process)
 
     def stop(self) -> None:
-        """Gracefully stop the PortAudio stream."""
+        """Gracefully stop the source (PortAudio stream, file player …)."""
         try:
-            self._stream.stop()
-            self._stream.close()
+            self.source.stop()
         except Exception as exc:
             print("AudioAnalyzer › error while stopping stream:", exc)
 
+    def reset_peak_hold(self) -> None:
+        """Clear the held true-peak reading."""
+        self._peak_meter.reset_hold()
+
+    def subscribe(self, names) -> Subscription:
+        """Activate the named features; see features.BUILTIN for the list."""
+        return self.registry.subscribe(names)
+
+    def add_tap(self, fn) -> None:
+        """fn(block) sees every raw block before analysis; it must only copy / enqueue."""
+        self._taps = self._taps + (fn,)
+
+    def remove_tap(self, fn) -> None:
+        self._taps = tuple(t for t in self._taps if t != fn)
+
+    def feature_costs(self) -> Dict[str, dict]:
+        """Per-extractor timing (calls, mean_us, last_us)."""
+        return self.registry.costs()
+
+    @property
+    def plan(self) -> AnalysisPlan:
+        """The plan the next block is analysed with."""
+        return self._plan
+
+    def set_plan(self, n_fft: Optional[int] = None, f_min: Optional[float] = None,
+                 f_max: Optional[float] = None, gain_db: Optional[float] = None,
+                 band_fraction: Optional[int] = None) -> AnalysisPlan:
+        """
+        Change any of FFT size / frequency range / sensitivity (dB) / 1/N
+        octave while the stream runs (None = keep).  Window and band weights
+        are built here, not in the audio callback; the swap lands between
+        two blocks.  Multirate mode keeps the pyramid's FFT and band layout;
+        range (peak search) and sensitivity still apply.
+        """
+        if n_fft is not None:
+            self._check_fft(int(n_fft))
+        plan = self._plan.replace(n_fft=n_fft, f_min=f_min, f_max=f_max,
+                                  gain_db=gain_db, band_fraction=band_fraction)
+        self.band_fraction = plan.band_fraction
+        self._plan = plan
+        return plan
+
+    def set_band_resolution(self, fraction: int) -> None:
+        """Switch 1/N-octave resolution; takes effect on the next block."""
+        self.set_plan(band_fraction=fraction)
+
     def get_audio_data(self) -> Dict[str, Any]:
-        """Return the latest analysis snapshot."""
+        """Return the latest analysis snapshot (see also `frames.read_since`)."""
+        return self.frames.latest() or self._snapshot(self._sample_pos, [], [])
+
+    def _snapshot(self, start: int, onsets: list, beats: list) -> Dict[str, Any]:
         return {
             "volume": self.volume,
             "dominant_freq": self.dominant_freq,
             "fft": self.fft_data,
             "sample_rate": self.sample_rate,
+            "bands": self.band_levels,
+            "band_engine": self._bands,
+            "channels": self.channels,
+            "channel_volume": self.channel_volume,
+            "channel_bands": self.channel_bands,
+            "stereo": self.stereo,
+            **self.peaks,
+            **self.loudness,
+            "peak_freq": self.peak_freq,
+            **self.pitch_info,
+            "features": self.features,
+            "sample": start,                 # first sample of this block
+            "onsets": onsets,
+            "beats": beats,
+            "bpm": self._beats.bpm,
+            "beat_confidence": self._beats.confidence,
+            "silent": self.silent,
+            "t_adc": self._t_adc,
+            "t_done": time.monotonic(),
         }
@@ -0,0 +1,167 @@
+"""
+device_manager  – cached PortAudio device table with hot-plug monitoring
+• DeviceTable: one snapshot of sd.query_devices().  Every entry also gets
+  "index", "hostapi_name" and "key" = "<host API>/<name>", which survives
+  PortAudio renumbering the devices after a re-scan.  inputs(), get(i),
+  find(key), index_of(key), default_input – all plain lookups, so the
+  Qt thread never waits on PortAudio.
+• DeviceManager.start() re-scans every `poll_s` s on its own thread and
+  calls listeners with (table, added keys, removed keys) when something
+  changed.  PortAudio only sees new hardware after a re-initialisation,
+  which would kill open streams, so it re-initialises only while no
+  PortAudioSource is open (sources.PA_LOCK / open_streams); with a stream
+  running it re-reads the current table, and new devices show up once
+  the stream stops (e.g. right after a fallback).  sounddevice has no
+  public re-scan: the re-initialisation uses its private _terminate /
+  _initialize and is skipped if a version lacks them (hotplug = False).
+• `live` says whether the last scan saw the hardware as it is now; a flip
+  notifies the listeners too, so the UI can say the list may be behind.
+• fallback(lost_key) is where to reopen when the active device vanished:
+  the same device if it came back, else `fallback` (a name substring, the
+  cockpit passes ORBIS_FALLBACK_DEVICE), else a loopback capture, else
+  the PortAudio default input.
+"""
+from __future__ import annotations
+
+import threading
+import warnings
+from typing import Any, Callable, Dict, List, Optional
+
+from sources import LOOPBACK_NAMES, PA_LOCK, PortAudioSource
+
+
+class DeviceTable:
+    """Immutable device list; indices are PortAudio's as of this scan."""
+
+    def __init__(self, devices: List[Dict[str, Any]], hostapis: List[str] = (),
+                 default_input: Optional[int] = None):
+        self.devices: List[Dict[str, Any]] = []
+        for i, d in enumerate(devices):
+            api = hostapis[d["hostapi"]] if d.get("hostapi", -1) in range(len(hostapis)) else ""
+            self.devices.append(dict(d, index=i, hostapi_name=api, key=f"{api}/{d['name']}"))
+        self._by_key = {d["key"]: d for d in self.devices}
+        self.default_input = default_input if self.get(default_input) else None
+
+    def __len__(self) -> int:
+        return len(self.devices)
+
+    @property
+    def keys(self) -> set:
+        return set(self._by_key)
+
+    def inputs(self) -> List[Dict[str, Any]]:
+        return [d for d in self.devices if d["max_input_channels"] > 0]
+
+    def get(self, index: Optional[int]) -> Optional[Dict[str, Any]]:
+        return self.devices[index] if isinstance(index, int) and 0 <= index < len(self.devices) else None
+
+    def find(self, key: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self._by_key.get(key)
+
+    def index_of(self, key: Optional[str]) -> Optional[int]:
+        d = self._by_key.get(key)
+        return d["index"] if d else None
+
+    def key_of(self, index: Optional[int]) -> Optional[str]:
+        d = self.get(index)
+        return d["key"] if d else None
+
+
+class DeviceManager:
+    """start() / stop(); refresh() scans now (any thread); add_listener(fn(table, added, removed))."""
+
+    def __init__(self, poll_s: float = 5.0, fallback: Optional[str] = None):
+        self.poll_s = poll_s
+        self.fallback_name = fallback
+        self.table = DeviceTable([])
+        self.scans = 0
+        self.live = True                           # last scan re-initialised PortAudio (or was the first)
+        self.hotplug = True                        # sounddevice exposes the private re-init we rely on
+        self._listeners: List[Callable[[DeviceTable, set, set], None]] = []
+        self._lock = threading.Lock()              # poll thread vs. a refresh() from the UI
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_listener(self, fn: Callable[[DeviceTable, set, set], None]) -> None:
+        self._listeners = self._listeners + [fn]
+
+    def remove_listener(self, fn: Callable[[DeviceTable, set, set], None]) -> None:
+        self._listeners = [f for f in self._listeners if f is not fn]
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="orbis-devices", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        self.refresh()
+        while not self._stop.wait(self.poll_s):
+            self.refresh()
+
+    # -----------------------------------------------------------------------
+    def _scan(self) -> tuple[DeviceTable, bool]:
+        """(table, live): live = PortAudio was (re-)initialised for this scan."""
+        import sounddevice as sd
+        # private sounddevice API (no public re-scan exists): feature-checked, never assumed
+        self.hotplug = callable(getattr(sd, "_terminate", None)) and callable(getattr(sd, "_initialize", None))
+        with PA_LOCK:
+            # the first scan rides on the initialisation sounddevice did at import
+            live = not self.scans or (self.hotplug and PortAudioSource.open_streams == 0)
+            if self.scans and live:
+                sd._terminate()
+                sd._initialize()
+            devices = [dict(d) for d in sd.query_devices()]
+            hostapis = [h["name"] for h in sd.query_hostapis()]
+            default = sd.default.device[0]
+        table = DeviceTable(devices, hostapis, default if isinstance(default, int) and default >= 0 else None)
+        return table, live
+
+    def refresh(self) -> bool:
+        """Scan now; True (and listeners called) if the table or `live` changed, or on the first scan."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self) -> bool:
+        try:
+            table, live = self._scan()
+        except Exception as exc:                   # no PortAudio / driver hiccup: keep the old table
+            if not self.scans:
+                warnings.warn(f"Audio devices not available: {exc}")
+                table, live = DeviceTable([]), True
+            else:
+                return False
+        old, self.table = self.table, table
+        was_live, self.live = self.live, live
+        added, removed = table.keys - old.keys, old.keys - table.keys
+        first, self.scans = not self.scans, self.scans + 1
+        # same keys in a new order still matter: callers hold PortAudio indices
+        renumbered = [d["key"] for d in table.devices] != [d["key"] for d in old.devices]
+        if not (first or renumbered or table.default_input != old.default_input or live != was_live):
+            return False
+        for fn in self._listeners:
+            try:
+                fn(table, added, removed)
+            except Exception as exc:
+                print("DeviceManager › listener error:", exc)
+        return True
+
+    def fallback(self, lost_key: Optional[str] = None) -> Optional[int]:
+        """Input device index to reopen on (see module doc); None if there is no input at all."""
+        t = self.table
+        d = t.find(lost_key)
+        if d and d["max_input_channels"] > 0:
+            return d["index"]
+        inputs = t.inputs()
+        for names in ((self.fallback_name,) if self.fallback_name else (), LOOPBACK_NAMES):
+            for d in inputs:
+                if any(n.lower() in d["name"].lower() for n in names):
+                    return d["index"]
+        if t.default_input is not None and t.get(t.default_input)["max_input_channels"] > 0:
+            return t.default_input
+        return inputs[0]["index"] if inputs else None
@@ -0,0 +1,241 @@
+"""
+diagnostics  – in-process sampling profiler + tracemalloc diff, on demand
+• SamplingProfiler: a daemon thread reads sys._current_frames() every
+  `interval` and counts each thread's stack (root → leaf, one frame per
+  function).  Output is the collapsed-stack format flamegraph.pl,
+  speedscope and inferno read:  thread;func (file:line);… count
+  Native threads show up while they run Python (PortAudio callback
+  → "Dummy-n").  Cost ≈ one stack walk per thread per sample – a few %
+  at 100 Hz, most of it tracemalloc, and only while a capture runs.
+• Diagnostics.start(seconds) profiles for `seconds` in the background and
+  brackets the run with tracemalloc snapshots; it writes
+      profile.collapsed   sampled stacks
+      allocations.txt     top live allocations and the growth during the run
+      summary.json        samples, threads, duration, traced memory
+  into <root>/diagnostics_YYYYmmdd_HHMMSS/ and calls on_done(result).
+• install_signal(fn): SIGUSR1 (POSIX) or SIGBREAK (Windows, Ctrl+Break)
+  calls fn, so a degraded cockpit can be diagnosed without a debugger.
+• import_times(module) imports `module` in a fresh interpreter under
+  -X importtime and parses the per-module self / cumulative µs;
+  import_table() formats the slowest ones as an indented tree.
+  `python diagnostics.py --imports [module]` prints it (default orbis_ui).
+"""
+from __future__ import annotations
+
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_FRAMES = 8                           # traceback depth kept by tracemalloc during a run
+SKIP_THREADS = {"orbis-profiler", "orbis-diagnostics"}
+
+
+def _label(code) -> str:
+    # ';' separates frames in the collapsed format, ' ' the count
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+class SamplingProfiler:
+    """start() / stop() → Counter{collapsed stack: samples}; threads filtered by name if given."""
+
+    def __init__(self, interval: float = 0.01, threads: Optional[set[str]] = None):
+        self.interval = interval
+        self.threads = threads
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.busy_s = 0.0                      # time spent walking stacks (overhead)
+        self._labels: Dict[Any, str] = {}      # code object → frame label
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="orbis-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.stacks
+
+    def _run(self) -> None:
+        labels = self._labels
+        while not self._stop.wait(self.interval):
+            t0 = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, f"thread-{ident}")
+                if name in SKIP_THREADS or (self.threads is not None and name not in self.threads):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code)
+                    if label is None:
+                        label = labels[code] = _label(code)
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(name.replace(";", ","))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self.busy_s += time.perf_counter() - t0
+
+    def write_collapsed(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+
+
+def _alloc_report(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, top: int) -> str:
+    flt = (tracemalloc.Filter(False, tracemalloc.__file__),
+           tracemalloc.Filter(False, __file__),
+           tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+           tracemalloc.Filter(False, "<unknown>"))
+    before, after = before.filter_traces(flt), after.filter_traces(flt)
+    out = [f"top {top} live allocations at the end (by line)", ""]
+    for st in after.statistics("lineno")[:top]:
+        out.append(f"{st.size / 1024:10.1f} KiB {st.count:8} blocks  {st.traceback[0]}")
+    out += ["", f"top {top} growth during the run (by line)", ""]
+    diff = [d for d in after.compare_to(before, "lineno") if d.size_diff > 0]
+    for d in diff[:top]:
+        out.append(f"{d.size_diff / 1024:+10.1f} KiB {d.count_diff:+8} blocks  {d.traceback[0]}")
+    out += ["", "largest growth, full traceback", ""]
+    for d in after.compare_to(before, "traceback")[:3]:
+        if d.size_diff <= 0:
+            break
+        out.append(f"{d.size_diff / 1024:+.1f} KiB")
+        out += [f"    {line}" for line in d.traceback.format()]
+    return "\n".join(out) + "\n"
+
+
+class Diagnostics:
+    """One capture at a time; on_done(result dict) runs on the capture thread."""
+
+    def __init__(self, root: str | Path, interval: float = 0.01, top: int = 25,
+                 on_done: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.root = Path(root)
+        self.interval = interval
+        self.top = top
+        self.on_done = on_done
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 30.0) -> bool:
+        """Begin a capture; False if one is already running."""
+        if self.running:
+            return False
+        self._thread = threading.Thread(target=self._run, args=(seconds,),
+                                        name="orbis-diagnostics", daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, seconds: float) -> None:
+        out = self.root / time.strftime("diagnostics_%Y%m%d_%H%M%S")
+        result: Dict[str, Any] = dict(path=str(out), seconds=seconds)
+        owner = not tracemalloc.is_tracing()
+        try:
+            out.mkdir(parents=True, exist_ok=True)
+            if owner:
+                tracemalloc.start(TRACE_FRAMES)
+            before = tracemalloc.take_snapshot()
+            prof = SamplingProfiler(self.interval)
+            t0 = time.monotonic()
+            prof.start()
+            time.sleep(seconds)
+            prof.stop()
+            elapsed = time.monotonic() - t0
+            after = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            prof.write_collapsed(out / "profile.collapsed")
+            (out / "allocations.txt").write_text(_alloc_report(before, after, self.top), encoding="utf-8")
+            threads = Counter()
+            for stack, n in prof.stacks.items():
+                threads[stack.split(";", 1)[0]] += n
+            result.update(samples=prof.samples, elapsed_s=elapsed,
+                          overhead=prof.busy_s / elapsed if elapsed else 0.0,
+                          threads=dict(threads), traced_kib=current / 1024, traced_peak_kib=peak / 1024)
+            (out / "summary.json").write_text(json.dumps(result, indent=2))
+        except Exception as exc:
+            result["error"] = str(exc)
+        finally:
+            if owner:
+                tracemalloc.stop()
+        if self.on_done is not None:
+            self.on_done(result)
+
+
+def install_signal(fn: Callable[[], None]) -> Optional[str]:
+    """Call fn() on SIGUSR1 / SIGBREAK; returns the signal name (None if unavailable). Main thread only."""
+    sig = getattr(signal, "SIGUSR1", None) or getattr(signal, "SIGBREAK", None)
+    if sig is None:
+        return None
+    signal.signal(sig, lambda *_: fn())
+    return signal.Signals(sig).name
+
+
+def import_times(module: str, python: str = sys.executable, cwd: Optional[str | Path] = None,
+                 timeout: float = 120.0) -> List[Dict[str, Any]]:
+    """
+    Cold import of `module` in a child interpreter → rows in import order:
+    {name, depth, self_us, cumulative_us}.  Nested imports come before their
+    parent, as -X importtime prints them.  RuntimeError if the import fails.
+    """
+    cwd = Path(cwd) if cwd is not None else Path(__file__).resolve().parent
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (str(cwd), os.environ.get("PYTHONPATH")))))
+    proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=timeout)
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cum, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append(dict(name=name.strip(), depth=depth, self_us=int(own), cumulative_us=int(cum)))
+    return rows
+
+
+def import_table(rows: List[Dict[str, Any]], top: int = 30) -> str:
+    """The `top` slowest imports by cumulative time, indented by depth, plus the total."""
+    if not rows:
+        return ""
+    total = sum(r["cumulative_us"] for r in rows if r["depth"] == 0)
+    slow = sorted(range(len(rows)), key=lambda i: rows[i]["cumulative_us"], reverse=True)[:top]
+    out = [f"{'cumulative':>11}{'self':>10}  module  (total {total / 1e3:.0f} ms, {len(rows)} modules)"]
+    # report order: each parent above its children, i.e. reversed import order
+    for i in sorted(slow, reverse=True):
+        r = rows[i]
+        out.append(f"{r['cumulative_us'] / 1e3:>8.1f} ms{r['self_us'] / 1e3:>7.1f} ms  {'  ' * r['depth']}{r['name']}")
+    return "\n".join(out)
+
+
+if __name__ == "__main__" and "--imports" in sys.argv:
+    args = [a for a in sys.argv[1:] if a != "--imports"]
+    print(import_table(import_times(args[0] if args else "orbis_ui")))
+elif __name__ == "__main__":
+    # headless self-check: profile a synthetic analysis run
+    from audio_analyzer import AudioAnalyzer
+    from sources import SyntheticSource
+
+    secs = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    a = AudioAnalyzer(source=SyntheticSource("mix", channels=2))
+    done = threading.Event()
+    d = Diagnostics(Path.cwd(), on_done=lambda r: (print(json.dumps(r, indent=2)), done.set()))
+    a.start()
+    d.start(secs)
+    done.wait()
+    a.stop()
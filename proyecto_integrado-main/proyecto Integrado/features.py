@@ -0,0 +1,241 @@
+"""
+features  – pluggable spectral feature registry on the shared FFT frame
+• Extractors are declared once (name → function) and all read the same
+  SpectralFrame: magnitude spectrum, band levels, cached power / freq axis.
+• Only features somebody subscribed to (plus what they require) are run,
+  and each extractor's cost is measured so expensive ones show up.
+• Built-ins: centroid, rolloff, flatness, flux, band energies / peaks,
+  zone deviations and low/high balance (formerly in the Blender add-on).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import numpy as np
+
+_EPS = 1e-20
+
+# Low / Mid / High split used by the cockpit read-outs and the orb
+BAND_RANGES = {"low": (20, 250), "mid": (250, 5000), "high": (5000, 20000)}
+
+# Pop reference per zone (dBFS) and tolerance – same values as the add-on
+ZONE_RANGES = {
+    "LOW"   : (20, 120),
+    "LOWMID": (120, 500),
+    "MID"   : (500, 2000),
+    "HIMID" : (2000, 6000),
+    "HIGH"  : (6000, 20001),
+}
+REF_DB    = {"LOW": -18, "LOWMID": -16.5, "MID": -13.5, "HIMID": -11, "HIGH": -11.5}
+TOLERANCE = 3
+
+# grave / medio / agudo split of the add-on's LOW/MID/HI_BANDS (20–100 | 250–2k | 5k–20k)
+BALANCE_RANGES = {"low": (20, 160), "mid": (160, 3500), "high": (3500, 20001)}
+
+
+class SpectralFrame:
+    """One analysed frame, shared read-only by every extractor."""
+
+    def __init__(self, mag: np.ndarray, sample_rate: float,
+                 bands=None, band_levels: Optional[np.ndarray] = None):
+        self.mag = np.asarray(mag, float)
+        self.sample_rate = float(sample_rate)
+        self.bands = bands                      # BandLayout / OctaveBands
+        self.band_levels = band_levels
+        self.features: Dict[str, Any] = {}      # filled as extractors run
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        return self.mag ** 2
+
+    @cached_property
+    def freqs(self) -> np.ndarray:
+        return np.fft.rfftfreq(2 * (len(self.mag) - 1), 1 / self.sample_rate)
+
+    @property
+    def has_bands(self) -> bool:
+        return (self.bands is not None and self.band_levels is not None
+                and len(self.band_levels) == len(self.bands))
+
+
+class Subscription:
+    """Handle returned by FeatureRegistry.subscribe(); call unsubscribe() when done."""
+
+    def __init__(self, registry: "FeatureRegistry", names: frozenset):
+        self._registry, self.names = registry, names
+
+    def unsubscribe(self) -> None:
+        self._registry._drop(self)
+
+
+class FeatureRegistry:
+    """
+    register(name, fn, requires) → declare; subscribe(names) → activate;
+    compute(frame) → dict of the active features; costs() → timing table.
+    fn(frame, state) gets a private state dict that survives between frames.
+    """
+
+    def __init__(self):
+        self._fns: Dict[str, Callable] = {}
+        self._requires: Dict[str, tuple] = {}
+        self._state: Dict[str, dict] = {}
+        self._subs: list[Subscription] = []
+        self._active: tuple = ()
+        self._cost: Dict[str, list] = {}        # name → [calls, total_ns, last_ns]
+        self._lock = threading.Lock()
+
+    # -----------------------------------------------------------------------
+    def register(self, name: str, fn: Callable, requires: Iterable[str] = ()) -> None:
+        requires = tuple(requires)
+        missing = [r for r in requires if r not in self._fns]
+        if missing:
+            raise KeyError(f"feature '{name}' requires unregistered {missing}")
+        self._fns[name], self._requires[name] = fn, requires
+        self._state[name], self._cost[name] = {}, [0, 0, 0]
+
+    def feature(self, name: str, requires: Iterable[str] = ()):
+        """Decorator form of register()."""
+        def deco(fn):
+            self.register(name, fn, requires)
+            return fn
+        return deco
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._fns)
+
+    def subscribe(self, names: Iterable[str]) -> Subscription:
+        names = frozenset(names)
+        unknown = names - set(self._fns)
+        if unknown:
+            raise KeyError(f"unknown features {sorted(unknown)}")
+        sub = Subscription(self, names)
+        with self._lock:
+            self._subs.append(sub)
+            self._rebuild()
+        return sub
+
+    def _drop(self, sub: Subscription) -> None:
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        wanted: set = set()
+        todo = [n for s in self._subs for n in s.names]
+        while todo:
+            n = todo.pop()
+            if n not in wanted:
+                wanted.add(n); todo.extend(self._requires[n])
+        # registration order already respects `requires`
+        self._active = tuple(n for n in self._fns if n in wanted)
+
+    # -----------------------------------------------------------------------
+    def compute(self, frame: SpectralFrame) -> Dict[str, Any]:
+        for name in self._active:               # tuple swap is atomic
+            t0 = time.perf_counter_ns()
+            frame.features[name] = self._fns[name](frame, self._state[name])
+            dt = time.perf_counter_ns() - t0
+            c = self._cost[name]; c[0] += 1; c[1] += dt; c[2] = dt
+        return frame.features
+
+    def costs(self) -> Dict[str, dict]:
+        """Per-extractor calls, mean and last cost in microseconds."""
+        return {n: dict(calls=c[0], mean_us=c[1] / c[0] / 1e3 if c[0] else 0.0,
+                        last_us=c[2] / 1e3, active=n in self._active)
+                for n, c in self._cost.items()}
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Built-in extractors
+# ═══════════════════════════════════════════════════════════════════════════
+def spectral_centroid(fr: SpectralFrame, _st) -> float:
+    p = fr.power
+    return float(np.dot(fr.freqs, p) / (p.sum() + _EPS))
+
+
+def spectral_rolloff(fr: SpectralFrame, _st, pct: float = 0.85) -> float:
+    c = np.cumsum(fr.power)
+    if c[-1] <= 0:
+        return 0.0
+    return float(fr.freqs[min(np.searchsorted(c, pct * c[-1]), len(c) - 1)])
+
+
+def spectral_flatness(fr: SpectralFrame, _st) -> float:
+    p = fr.power[1:] + _EPS                     # skip DC
+    return float(np.exp(np.mean(np.log(p))) / np.mean(p))
+
+
+def spectral_flux(fr: SpectralFrame, st) -> float:
+    """Half-wave rectified change of log-compressed magnitude vs last frame."""
+    cur  = np.log1p(fr.mag)
+    prev = st.get("prev")
+    st["prev"] = cur
+    if prev is None or prev.shape != cur.shape:
+        return 0.0
+    return float(np.mean(np.maximum(cur - prev, 0.0)))
+
+
+def band_energies(fr: SpectralFrame, _st) -> dict:
+    if not fr.has_bands:
+        return {k: -60.0 for k in BAND_RANGES}
+    return {k: fr.bands.range_level(fr.band_levels, lo, hi) for k, (lo, hi) in BAND_RANGES.items()}
+
+
+def band_peaks(fr: SpectralFrame, _st) -> dict:
+    if not fr.has_bands:
+        return {k: -60.0 for k in BAND_RANGES}
+    return {k: fr.bands.range_peak(fr.band_levels, lo, hi) for k, (lo, hi) in BAND_RANGES.items()}
+
+
+def zone_deviations(fr: SpectralFrame, _st) -> dict:
+    """−1 (falta) … 0 (ok) … +1 (sobra) per zone vs the pop reference."""
+    out = {}
+    for zone, (lo, hi) in ZONE_RANGES.items():
+        sel = None
+        if fr.has_bands:
+            c = fr.bands.centers
+            sel = (c >= lo) & (c < hi)
+        if sel is None or not sel.any():
+            out[zone] = 0.0
+            continue
+        delta = float(np.mean(fr.band_levels[sel])) - REF_DB[zone]
+        out[zone] = max(-1.0, min(1.0, delta / TOLERANCE))
+    return out
+
+
+def spectral_balance(fr: SpectralFrame, _st) -> dict:
+    """bal_lh: −1 graves … +1 agudos · bal_mid: −1 pocos medios … +1 sobran."""
+    if not fr.has_bands:
+        return {"bal_lh": 0.0, "bal_mid": 0.0}
+    amp = 10 ** (fr.band_levels / 20)
+    c = fr.bands.centers
+    low, mid, high = (float(amp[(c >= lo) & (c < hi)].sum())
+                      for lo, hi in BALANCE_RANGES.values())
+    total = max(low + mid + high, 1e-6)
+    return {"bal_lh": (high - low) / total,
+            "bal_mid": (mid - 0.5 * (low + high)) / total}
+
+
+BUILTIN = (
+    ("centroid",        spectral_centroid),
+    ("rolloff",         spectral_rolloff),
+    ("flatness",        spectral_flatness),
+    ("flux",            spectral_flux),
+    ("band_energies",   band_energies),
+    ("band_peaks",      band_peaks),
+    ("zone_deviations", zone_deviations),
+    ("balance",         spectral_balance),
+)
+
+
+def default_registry() -> FeatureRegistry:
+    """Registry pre-loaded with the built-in extractors (nothing subscribed)."""
+    reg = FeatureRegistry()
+    for name, fn in BUILTIN:
+        reg.register(name, fn)
+    return reg
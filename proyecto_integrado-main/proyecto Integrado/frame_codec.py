@@ -0,0 +1,230 @@
+"""
+frame_codec  – compact, versioned binary encoding of analysis frames
+• Input is a flat {name: number | 1-D array} dict (frame_fields() builds it
+  from an analyzer snapshot).  Each field has a storage kind:
+    int16 × scale   dB levels at 0.01 dB (±327 dB), 0…1 meters at 1e-4
+    float32         frequencies, BPM, anything not listed
+    float64         sample counters / timestamps
+• Packet = 12-byte header + body:
+    "OF" · version u8 · flags u8 · schema crc32 u32 · seq u32
+    body (optionally zlib / lz4): [u16 len + schema JSON on key frames]
+                                  int16[] · float32[] · float64[]
+  Non-key frames carry the int16 block as deltas against the previous
+  frame (mod 2¹⁶, lossless), which is what makes zlib / lz4 bite.
+• Every `key_interval` frames – and whenever the field set changes – a
+  key frame resends the schema and absolute values, so a receiver that
+  joins late or loses a UDP packet resynchronises within ~1 s.
+• Length-prefixed streams for files: write_packet() / read_packets().
+"""
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from typing import Any, BinaryIO, Dict, Iterator, Optional
+
+import numpy as np
+
+VERSION = 1
+MAGIC = b"OF"
+HEADER = struct.Struct("<2sBBII")           # magic, version, flags, schema crc, seq
+F_KEY, F_ZLIB, F_LZ4 = 1, 2, 4
+MISSING = -32768                            # int16 code for NaN / absent
+
+DB_STEP, UNIT_STEP = 0.01, 1e-4
+DB_FIELDS = {"volume", "bands", "channel_volume", "sample_peak", "true_peak", "peak_hold",
+             "channel_true_peak", "stereo.balance", "stereo.mid_level", "stereo.side_level",
+             "momentary_lufs", "short_term_lufs", "low", "mid", "high"}
+UNIT_FIELDS = {"stereo.correlation", "stereo.width", "stereo.band_correlation",
+               "pitch_confidence", "beat_confidence", "voiced", "features.flatness"}
+F64_FIELDS = {"sample", "time", "t", "t_adc", "t_done"}
+
+
+class CodecError(ValueError):
+    """Undecodable packet (bad header, unknown schema, delta without its base)."""
+
+
+def default_kind(name: str) -> Any:
+    """int16 step (float), "f4" or "f8" for a field name."""
+    if name in DB_FIELDS or name.startswith("features.band_peaks."):
+        return DB_STEP
+    if name in UNIT_FIELDS:
+        return UNIT_STEP
+    return "f8" if name in F64_FIELDS else "f4"
+
+
+def frame_fields(frame: Dict[str, Any], skip=("fft",)) -> Dict[str, Any]:
+    """Codec input from an analyzer snapshot: scalars and 1-D vectors, onset / beat."""
+    from recorder import flatten_frame
+    out: Dict[str, Any] = {}
+    for name, v in flatten_frame(frame):
+        if name in skip or v is None or isinstance(v, str) or np.size(v) == 0:
+            continue
+        if np.ndim(v) <= 1:
+            out[name] = v
+    out["onset"] = max((o["strength"] for o in frame.get("onsets", ())), default=0.0)
+    out["beat"] = float(bool(frame.get("beats")))
+    return out
+
+
+def _compressor(compress: Optional[str]):
+    if compress is None:
+        return 0, None
+    if compress == "zlib":
+        return F_ZLIB, lambda b: zlib.compress(b, 1)
+    if compress == "lz4":
+        try:
+            import lz4.block
+        except ImportError:
+            raise RuntimeError("lz4 compression needs the 'lz4' package") from None
+        return F_LZ4, lz4.block.compress
+    raise ValueError(f"unknown compression '{compress}' (None, 'zlib', 'lz4')")
+
+
+class _Schema:
+    """Field layout [name, length (0 = scalar), kind], grouped int16 / f4 / f8."""
+
+    def __init__(self, fields: list):
+        self.fields = fields
+        self.json = json.dumps(fields, separators=(",", ":")).encode()
+        self.crc = zlib.crc32(self.json)
+        groups: Dict[str, list] = {"q": [], "f4": [], "f8": []}
+        for name, n, kind in fields:
+            groups["q" if isinstance(kind, float) else kind].append((name, n, kind))
+        self.q, self.f4, self.f8 = groups["q"], groups["f4"], groups["f8"]
+        self.n_q, self.n_f4, self.n_f8 = (sum(max(n, 1) for _, n, _ in g)
+                                          for g in (self.q, self.f4, self.f8))
+        self.steps = np.concatenate([np.full(max(n, 1), k) for _, n, k in self.q] or [np.zeros(0)])
+
+    @classmethod
+    def of(cls, values: Dict[str, Any], kinds: Dict[str, Any]) -> "_Schema":
+        return cls([[name, int(np.size(v)) if np.ndim(v) else 0, kinds.get(name) or default_kind(name)]
+                    for name, v in values.items()])
+
+
+class FrameEncoder:
+    """encode(values, seq) → bytes; one encoder per stream (it keeps the delta base)."""
+
+    def __init__(self, compress: Optional[str] = "zlib", key_interval: int = 60,
+                 kinds: Optional[Dict[str, Any]] = None):
+        self._flag, self._pack = _compressor(compress)
+        self.key_interval = key_interval
+        self.kinds = dict(kinds or {})
+        self._schema: Optional[_Schema] = None
+        self._sig = None
+        self._prev_q: Optional[np.ndarray] = None
+        self._since_key = 0
+        self._seq = 0
+
+    def encode(self, values: Dict[str, Any], seq: Optional[int] = None) -> bytes:
+        sig = tuple((k, np.size(v) if np.ndim(v) else -1) for k, v in values.items())
+        if sig != self._sig:
+            self._schema, self._sig = _Schema.of(values, self.kinds), sig
+            self._prev_q = None
+        s = self._schema
+        self._seq = self._seq + 1 if seq is None else int(seq)
+
+        q = np.empty(s.n_q, np.float64)
+        f4 = np.empty(s.n_f4, np.float32)
+        f8 = np.empty(s.n_f8, np.float64)
+        for arr, group in ((q, s.q), (f4, s.f4), (f8, s.f8)):
+            i = 0
+            for name, n, _ in group:
+                n = max(n, 1)
+                arr[i:i + n] = np.ravel(np.asarray(values[name], float))
+                i += n
+        with np.errstate(invalid="ignore"):
+            qi = np.rint(q / s.steps)
+        qi = np.where(np.isfinite(qi), np.clip(qi, -32767, 32767), MISSING).astype(np.int16)
+
+        key = self._prev_q is None or self._since_key >= self.key_interval
+        flags = self._flag
+        if key:
+            flags |= F_KEY
+            body = [struct.pack("<H", len(s.json)), s.json, qi.astype("<i2").tobytes()]
+            self._since_key = 0
+        else:
+            delta = (qi.astype(np.int32) - self._prev_q).astype(np.int16)    # wraps mod 2¹⁶
+            body = [delta.astype("<i2").tobytes()]
+            self._since_key += 1
+        self._prev_q = qi.astype(np.int32)
+        body += [f4.astype("<f4").tobytes(), f8.astype("<f8").tobytes()]
+        payload = b"".join(body)
+        if self._pack is not None:
+            payload = self._pack(payload)
+        return HEADER.pack(MAGIC, VERSION, flags, s.crc, self._seq & 0xFFFFFFFF) + payload
+
+
+class FrameDecoder:
+    """decode(bytes) → {name: value, "seq": n}; raises CodecError until the next key frame after a loss."""
+
+    def __init__(self):
+        self._schemas: Dict[int, _Schema] = {}
+        self._prev_q: Optional[np.ndarray] = None
+        self._last_seq: Optional[int] = None
+        self._crc: Optional[int] = None
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if len(data) < HEADER.size:
+            raise CodecError("short packet")
+        magic, version, flags, crc, seq = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise CodecError(f"not an Orbis frame (magic {magic!r}, version {version})")
+        payload = data[HEADER.size:]
+        if flags & F_ZLIB:
+            payload = zlib.decompress(payload)
+        elif flags & F_LZ4:
+            try:
+                import lz4.block
+            except ImportError:
+                raise CodecError("lz4-compressed frame but the 'lz4' package is missing") from None
+            payload = lz4.block.decompress(payload)
+
+        off = 0
+        if flags & F_KEY:
+            (n,) = struct.unpack_from("<H", payload)
+            raw = bytes(payload[2:2 + n])
+            s = self._schemas.get(crc)
+            if s is None:
+                s = self._schemas[crc] = _Schema(json.loads(raw))
+            off = 2 + n
+            qi = np.frombuffer(payload, "<i2", s.n_q, off).astype(np.int32)
+        else:
+            s = self._schemas.get(crc)
+            if s is None or self._prev_q is None or crc != self._crc or seq != self._last_seq + 1:
+                self._prev_q = None
+                raise CodecError(f"delta frame {seq} without its base – waiting for a key frame")
+            d = np.frombuffer(payload, "<i2", s.n_q, off).astype(np.int32)
+            qi = (self._prev_q + d).astype(np.int16).astype(np.int32)
+        off += 2 * s.n_q
+        f4 = np.frombuffer(payload, "<f4", s.n_f4, off)
+        off += 4 * s.n_f4
+        f8 = np.frombuffer(payload, "<f8", s.n_f8, off)
+        self._prev_q, self._last_seq, self._crc = qi, seq, crc
+
+        q = np.where(qi == MISSING, np.nan, qi * s.steps)
+        out: Dict[str, Any] = {"seq": seq}
+        for arr, group in ((q, s.q), (f4, s.f4), (f8, s.f8)):
+            i = 0
+            for name, n, _ in group:
+                out[name] = arr[i:i + n].astype(float) if n else float(arr[i])
+                i += max(n, 1)
+        return out
+
+
+# --- length-prefixed packet streams (recorder, files) ----------------------
+def write_packet(f: BinaryIO, packet: bytes) -> None:
+    f.write(struct.pack("<I", len(packet)))
+    f.write(packet)
+
+
+def read_packets(f: BinaryIO) -> Iterator[bytes]:
+    while True:
+        head = f.read(4)
+        if len(head) < 4:
+            return
+        (n,) = struct.unpack("<I", head)
+        packet = f.read(n)
+        if len(packet) < n:                       # truncated tail of a crashed session
+            return
+        yield packet
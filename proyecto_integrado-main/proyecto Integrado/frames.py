@@ -0,0 +1,64 @@
+"""
+frames  – bounded, thread-safe stream of analysis frames
+• The analyzer publishes one frame (dict) per block; each gets a sequence
+  number so pollers can read everything since their last visit.
+• Listeners are called synchronously in the publishing (audio) thread –
+  keep them tiny (e.g. emit a Qt signal) so the callback stays on budget.
+"""
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+
+class FrameChannel:
+    """publish(frame) → seq; latest(); read_since(seq); add_listener(fn)."""
+
+    def __init__(self, maxlen: int = 256):
+        self._buf: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._listeners: list[Callable[[dict], None]] = []
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the newest frame (0 = nothing published yet)."""
+        return self._seq
+
+    @property
+    def listener_count(self) -> int:
+        return len(self._listeners)
+
+    def publish(self, frame: dict) -> int:
+        with self._lock:
+            self._seq += 1
+            frame["seq"] = self._seq
+            self._buf.append(frame)
+            listeners = self._listeners
+        for fn in listeners:
+            try:
+                fn(frame)
+            except Exception as exc:            # never kill the audio thread
+                print("FrameChannel › listener error:", exc)
+        return frame["seq"]
+
+    def latest(self) -> Optional[dict]:
+        buf = self._buf
+        return buf[-1] if buf else None
+
+    def read_since(self, seq: int) -> list[dict]:
+        """Frames newer than seq (oldest first); older ones may have been dropped."""
+        with self._lock:
+            if not self._buf or self._seq <= seq:
+                return []
+            n = min(self._seq - seq, len(self._buf))
+            return list(self._buf)[-n:]
+
+    def add_listener(self, fn: Callable[[dict], None]) -> None:
+        with self._lock:
+            self._listeners = self._listeners + [fn]     # copy-on-write
+
+    def remove_listener(self, fn: Callable[[dict], None]) -> None:
+        with self._lock:
+            self._listeners = [f for f in self._listeners if f is not fn]
@@ -0,0 +1,186 @@
+"""
+instrumentation  – fixed-bucket latency histograms for the hot-path stages
+• Histogram: log-spaced buckets, 4 per octave from 1 µs to ~4 s, plus an
+  overflow bucket.  record(ns) is a bisect and a few integer adds on
+  preallocated lists – no allocation, cheap enough for the audio callback.
+  Percentiles come from the buckets (within one bucket width, ≈19 %).
+• Every stage has a budget; samples over it bump the overrun counter and
+  stamp the time (monotonic), so the status bar can point at the stage that
+  blew its budget during a stutter.
+• StageTimings: stage name → Histogram.  HOT_PATH is the process-wide set
+  the analyzer (callback, fft, bands) and the cockpit (tick, plot, export,
+  json) record into:
+      t0 = time.perf_counter_ns(); …; HOT_PATH.record("fft", t0)
+  One writer thread per stage; readers take approximate snapshots.
+  Analyzers that run side by side key their stages "<stage>/<source>"
+  (each with its own budget); summary() folds the keys of a stage.
+• snapshot() → dicts, table() → text with a sparkline of each histogram,
+  summary() → one status-bar line, dump(path) → JSON with the raw buckets.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+PER_OCTAVE = 4
+OCTAVES = 22                                          # 1 µs · 2²² ≈ 4.2 s
+EDGES_NS = [int(1000 * 2 ** (i / PER_OCTAVE)) for i in range(OCTAVES * PER_OCTAVE + 1)]
+
+# default budgets (ms); the analyzer sets callback / fft / bands from its block
+# period, the cockpit sets tick from its timer
+DEFAULT_BUDGETS_MS = {"callback": 23.0, "fft": 6.0, "bands": 6.0,
+                      "tick": 100.0, "plot": 40.0, "export": 10.0, "json": 10.0}
+STAGES = tuple(DEFAULT_BUDGETS_MS)
+SPARK = " ▁▂▃▄▅▆▇█"
+
+
+class Histogram:
+    """Latency histogram on EDGES_NS; counts[i] = samples in [EDGES[i-1], EDGES[i])."""
+
+    def __init__(self, budget_ns: int = 0):
+        self.budget_ns = int(budget_ns)
+        self.reset()
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(EDGES_NS) + 1)
+        self.n = self.total_ns = self.max_ns = self.last_ns = 0
+        self.overruns = 0
+        self.last_overrun = 0.0                       # time.monotonic() of the latest one
+
+    def record_ns(self, dt: int) -> None:
+        self.counts[bisect.bisect_right(EDGES_NS, dt)] += 1
+        self.n += 1
+        self.total_ns += dt
+        self.last_ns = dt
+        if dt > self.max_ns:
+            self.max_ns = dt
+        if self.budget_ns and dt > self.budget_ns:
+            self.overruns += 1
+            self.last_overrun = time.monotonic()
+
+    def percentile_ns(self, p: float) -> int:
+        """Upper edge of the bucket holding the p-th percentile, capped at the max (0 when empty)."""
+        counts = list(self.counts)
+        n = sum(counts)
+        if not n:
+            return 0
+        rank, acc = p / 100 * n, 0
+        for i, c in enumerate(counts):
+            acc += c
+            if acc >= rank:
+                return min(EDGES_NS[i], self.max_ns) if i < len(EDGES_NS) else self.max_ns
+        return self.max_ns
+
+    def stats(self) -> Dict[str, Any]:
+        n = self.n
+        return dict(n=n, mean_us=self.total_ns / n / 1e3 if n else 0.0,
+                    p50_us=self.percentile_ns(50) / 1e3, p99_us=self.percentile_ns(99) / 1e3,
+                    max_us=self.max_ns / 1e3, last_us=self.last_ns / 1e3,
+                    budget_us=self.budget_ns / 1e3, overruns=self.overruns,
+                    last_overrun=self.last_overrun)
+
+
+class StageTimings:
+    """
+    record(stage, t0_ns) / record_ns(stage, dt_ns); set_budget(stage, seconds).
+    Unknown stages are created on first use with no budget.
+    """
+
+    def __init__(self, budgets_ms: Optional[Dict[str, float]] = None):
+        budgets = DEFAULT_BUDGETS_MS if budgets_ms is None else budgets_ms
+        self._h: Dict[str, Histogram] = {s: Histogram(int(ms * 1e6)) for s, ms in budgets.items()}
+        self.t_reset = time.monotonic()
+
+    def histogram(self, stage: str) -> Histogram:
+        h = self._h.get(stage)
+        if h is None:
+            h = self._h.setdefault(stage, Histogram())
+        return h
+
+    def record(self, stage: str, t0_ns: int) -> None:
+        """Close a stage opened with t0_ns = time.perf_counter_ns()."""
+        self.histogram(stage).record_ns(time.perf_counter_ns() - t0_ns)
+
+    def record_ns(self, stage: str, dt_ns: int) -> None:
+        self.histogram(stage).record_ns(dt_ns)
+
+    def set_budget(self, stage: str, seconds: float) -> None:
+        self.histogram(stage).budget_ns = int(seconds * 1e9)
+
+    def reset(self) -> None:
+        for h in list(self._h.values()):
+            h.reset()
+        self.t_reset = time.monotonic()
+
+    # -----------------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """{stage: stats()} for every stage that has samples."""
+        return {s: h.stats() for s, h in list(self._h.items()) if h.n}
+
+    def worst(self, window_s: float = 5.0) -> Optional[str]:
+        """Stage with the most recent overrun within window_s, if any."""
+        now = time.monotonic()
+        late = [(h.last_overrun, s) for s, h in list(self._h.items())
+                if h.overruns and now - h.last_overrun < window_s]
+        return max(late)[1] if late else None
+
+    def summary(self, stages=("callback", "tick")) -> str:
+        """Compact status-bar text: p99 of the key stages (worst source), total overruns, the culprit."""
+        snap = self.snapshot()
+        parts = []
+        for s in stages:
+            p99 = [st["p99_us"] for k, st in snap.items() if k == s or k.startswith(s + "/")]
+            if p99:
+                parts.append(f"{s} p99 {_fmt_us(max(p99))}")
+        over = sum(st["overruns"] for st in snap.values())
+        if over:
+            bad = self.worst()
+            parts.append(f"{over} over" + (f" ⚠ {bad}" if bad else ""))
+        return " · ".join(parts)
+
+    def table(self) -> str:
+        """Fixed-width text: one row per stage, histogram as a sparkline from min to max bucket."""
+        w = max([9] + [len(s) + 1 for s in list(self._h)])
+        head = f"{'stage':<{w}}{'n':>8}{'mean':>10}{'p50':>10}{'p99':>10}{'max':>10}{'budget':>10}{'over':>6}  histogram"
+        rows = [head]
+        for s, h in list(self._h.items()):
+            if not h.n:
+                continue
+            st = h.stats()
+            rows.append(f"{s:<{w}}{st['n']:>8}"
+                        + "".join(f"{_fmt_us(st[k]):>10}" for k in ("mean_us", "p50_us", "p99_us", "max_us", "budget_us"))
+                        + f"{st['overruns']:>6}  {_sparkline(h.counts)}")
+        return "\n".join(rows) if len(rows) > 1 else ""
+
+    def dump(self, path: str | Path) -> Path:
+        """Write stats + raw bucket counts (upper edges in ns) as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = dict(since_s=time.monotonic() - self.t_reset, edges_ns=EDGES_NS,
+                    stages={s: dict(h.stats(), counts=list(h.counts))
+                            for s, h in list(self._h.items()) if h.n})
+        path.write_text(json.dumps(data, indent=2))
+        return path
+
+
+def _fmt_us(us: float) -> str:
+    return f"{us:.0f} µs" if us < 1000 else f"{us / 1e3:.1f} ms"
+
+
+def _sparkline(counts: list, width: int = 24) -> str:
+    used = [i for i, c in enumerate(counts) if c]
+    if not used:
+        return ""
+    part = counts[used[0]:used[-1] + 1]
+    step = -(-len(part) // width)                    # merge buckets to fit `width`
+    part = [sum(part[i:i + step]) for i in range(0, len(part), step)]
+    top = max(part)
+    lo, hi = EDGES_NS[max(used[0] - 1, 0)] / 1e3, EDGES_NS[min(used[-1], len(EDGES_NS) - 1)] / 1e3
+    bars = "".join(SPARK[-(-c * (len(SPARK) - 1) // top)] for c in part)
+    return f"{_fmt_us(lo)} {bars} {_fmt_us(hi)}"
+
+
+HOT_PATH = StageTimings()
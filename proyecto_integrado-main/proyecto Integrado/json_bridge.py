@@ -0,0 +1,195 @@
+"""
+json_bridge  – orbis_data.json, the file Blender's add-on polls
+• payload(d, new, version, seq) builds the dict the cockpit has always
+  written from the latest snapshot `d` and the frames `new` since the
+  previous write: volume / dominant_freq / version, low·mid·high, peaks,
+  pitch confidence, bpm, every onset and beat of `new`, seq + monotonic
+  stamps, the silence flag, stereo, extra sources, flattened features, and the 11-key
+  "spectrum" (octave-bank levels, or single FFT bins without a bank) plus
+  "bands" at the selected resolution.
+• write(path, data): indent=2 so a diff in Git stays readable.
+• Both record the "export" / "json" stages on HOT_PATH.
+• JsonBridge(analyzer, path).start() runs the same export on its own
+  thread, for processes without a Qt tick (orbis_daemon, latency_bench).
+• silent(): exporters write the first frame with silent = True (readers
+  see the gate close) and nothing more until the signal returns.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from instrumentation import HOT_PATH
+
+# features payload() reads; whoever exports must subscribe them on the analyzer
+FEATURES = ("band_peaks", "balance", "zone_deviations",
+            "centroid", "rolloff", "flatness", "flux")
+SPECTRUM_HZ = (20, 50, 100, 250, 500, 1000, 2000, 5000, 10000, 15000, 20000)
+
+
+def stereo_fields(st: Optional[dict]) -> dict:
+    """Stereo metrics (empty for mono → the JSON does not change)."""
+    if not st:
+        return {}
+    return dict(correlation=round(float(st["correlation"]), 3),
+                width=round(float(st["width"]), 3),
+                balance_lr=round(float(st["balance"]), 2),
+                mid_level=round(float(st["mid_level"]), 2),
+                side_level=round(float(st["side_level"]), 2))
+
+
+def feature_fields(feats: dict) -> dict:
+    """Flatten features to the keys the add-on expects (bal_lh, dev_low, …)."""
+    out = {k: round(float(v), 3) for k, v in feats.get("balance", {}).items()}
+    out.update({f"dev_{z.lower()}": round(float(v), 3)
+                for z, v in feats.get("zone_deviations", {}).items()})
+    for k in ("centroid", "rolloff", "flatness", "flux"):
+        if k in feats:
+            out[k] = round(float(feats[k]), 4)
+    return out
+
+
+def source_fields(view: Dict[str, dict]) -> Dict[str, dict]:
+    """MultiStreamManager.view() → per-source summary for the "sources" key ("main" left out)."""
+    out = {}
+    for name, d in view.items():
+        if name == "main":
+            continue
+        pk = (d.get("features") or {}).get("band_peaks", {})
+        out[name] = dict(volume=round(float(d["volume"]), 2),
+                         dominant_freq=round(float(d["dominant_freq"]), 2),
+                         true_peak=round(float(d["true_peak"]), 2),
+                         bpm=round(float(d["bpm"]), 1),
+                         **{k: round(float(v), 2) for k, v in pk.items()})
+    return out
+
+
+def spectrum_fields(fft, sr: int, ob=None, lv=None) -> dict:
+    # with an octave bank every key is the level of the ISO 266 band holding
+    # that frequency (not a single FFT bin) and "bands" carries all of them
+    if ob is not None:
+        return dict(spectrum={f"{t}Hz": round(float(db), 2)
+                              for t, db in zip(SPECTRUM_HZ, ob.level_at(lv, SPECTRUM_HZ))},
+                    band_resolution=f"1/{ob.fraction}",
+                    bands={lab: round(float(db), 2) for lab, db in zip(ob.labels, lv)})
+    if fft is not None and len(fft):
+        f = np.fft.rfftfreq(len(fft) * 2 - 2, 1 / sr)
+        return dict(spectrum={f"{t}Hz": round(20 * np.log10(max(fft[(np.abs(f - t)).argmin()], 1e-10)), 2)
+                              for t in SPECTRUM_HZ})
+    return {}
+
+
+def payload(d: Dict[str, Any], new: list, version: str, seq: int,
+            sources: Optional[Dict[str, dict]] = None) -> Dict[str, Any]:
+    """The orbis_data.json dict; `sources` = source_fields(...) when several inputs run."""
+    t0 = time.perf_counter_ns()
+    vol = float(d.get("volume", -60.0))
+    feats = d.get("features") or {}
+    pk = feats.get("band_peaks", {})
+    ob, lv = d.get("band_engine"), d.get("bands")
+    if ob is None or lv is None or len(lv) != len(ob):
+        ob = lv = None                         # no block yet or resolution just changed
+    data = dict(volume=round(vol, 2),
+                dominant_freq=round(float(d.get("dominant_freq", 0.0)), 2),
+                version=version)
+    data.update({k: float(pk.get(k, -60.0)) for k in ("low", "mid", "high")})
+    data.update(sample_peak=round(float(d.get("sample_peak", vol)), 2),
+                true_peak=round(float(d.get("true_peak", vol)), 2),
+                pitch_confidence=round(float(d.get("pitch_confidence", 0.0)), 3),
+                bpm=round(float(d.get("bpm", 0.0)), 1),
+                onsets=[round(o["t"], 4) for fr in new for o in fr.get("onsets", ())],
+                beats=[round(b["t"], 4) for fr in new for b in fr.get("beats", ())],
+                seq=seq, t_adc=d.get("t_adc"), t_done=d.get("t_done"), clock="monotonic",
+                silent=bool(d.get("silent", False)),
+                **stereo_fields(d.get("stereo")))
+    if sources:
+        data["sources"] = sources
+    data.update(feature_fields(feats))
+    data.update(spectrum_fields(d.get("fft"), int(d.get("sample_rate", 48000)), ob, lv))
+    HOT_PATH.record("export", t0)
+    return data
+
+
+def silent(frames: list, was_silent: bool) -> Optional[bool]:
+    """Gate state of the newest frame; None when it is silent and that was already exported."""
+    now = bool(frames[-1].get("silent", False))
+    return None if now and was_silent else now
+
+
+def write(path: str | Path, data: Dict[str, Any]) -> None:
+    t0 = time.perf_counter_ns()
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    HOT_PATH.record("json", t0)
+
+
+class JsonBridge:
+    """
+    Every `interval` s: frames since the last write → payload → file.
+    Idle ticks (no new frame) and silence after its first frame write
+    nothing; readers see an ageing t_done.
+    sources() → source_fields(...) is called per write when given.
+    """
+
+    def __init__(self, analyzer, path: str | Path, interval: float = 0.1, version: str = "",
+                 sources: Optional[Callable[[], Dict[str, dict]]] = None,
+                 on_write: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.analyzer = analyzer
+        self.path = Path(path)
+        self.interval = interval
+        self.version = version
+        self.sources = sources
+        self.on_write = on_write
+        self.writes = 0
+        self._seq = 0
+        self._silent = False
+        self._sub = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._sub = self.analyzer.subscribe(FEATURES)
+        self._thread = threading.Thread(target=self._run, name="orbis-json", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._sub is not None:
+            self._sub.unsubscribe()
+            self._sub = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            new = self.analyzer.frames.read_since(self._seq)
+            if not new:
+                continue
+            self._seq = new[-1]["seq"]
+            now = silent(new, self._silent)
+            if now is None:
+                continue
+            try:
+                data = payload(new[-1], new, self.version, self._seq,
+                               self.sources() if self.sources is not None else None)
+                write(self.path, data)
+            except Exception as exc:           # disk full / path gone: keep analysing
+                print("JsonBridge › write failed:", exc)
+                continue
+            self._silent = now
+            self.writes += 1
+            if self.on_write is not None:
+                self.on_write(data)
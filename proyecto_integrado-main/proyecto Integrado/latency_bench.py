@@ -0,0 +1,374 @@
+"""
+latency_bench  – end-to-end latency of the Orbis → Blender chain, per transport
+• A realtime SyntheticSource("mix") injects clicks at a known tempo into an
+  AudioAnalyzer.  Every click the onset detector finds is traced through
+      adc      capture of the click sample (frame t_adc + offset in the block)
+      done     analysis finished (frame t_done)
+      export   written (json) / encoded and handed to the transport (shm, udp)
+      recv     the Blender side saw it
+      apply    bpy.app.timers ran the update (update_geometry_nodes)
+  all on time.monotonic(), which every process on the machine shares.
+• Transports
+      json   what OrbisUI + orbis_live_link do today: the UI tick writes the
+             JSON every `tick_s`, refresh_loop polls the file every `poll_s`
+      shm    latest frame_codec packet in a shared-memory slot (seqlock),
+             polled every `shm_poll_s`
+      udp    frame_codec packets per frame, blocking receive
+             (realtime_sender / realtime_receiver)
+• The Blender side runs in its own process: a receiver thread plus
+  BlenderStandIn, which plays bpy.app.timers – callbacks registered from the
+  receiver run on a main loop ticking at the viewport rate (`fps`).
+• run() → {transport: {stage: {n, p50, p90, p99, max} ms, clicks, missed}}.
+  `python latency_bench.py [json shm udp] [--seconds 20] [--multirate]`.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing as mp
+import os
+import queue
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+import json_bridge
+from frame_codec import CodecError, FrameDecoder, FrameEncoder, frame_fields
+
+TRANSPORTS = ("json", "shm", "udp")
+STAGES = (("analysis", "adc", "done"), ("export", "done", "export"),
+          ("transport", "export", "recv"), ("apply", "recv", "apply"),
+          ("total", "adc", "apply"))
+PERCENTILES = (50, 90, 99)
+MATCH_S = 0.05                  # a detected onset belongs to the click within ±50 ms
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Shared-memory slot: one writer, any number of pollers, latest value wins
+# ═══════════════════════════════════════════════════════════════════════════
+class ShmSlot:
+    """
+    Seqlock over multiprocessing.shared_memory: the generation counter is odd
+    while the writer copies, so a reader that sees it change retries later
+    instead of taking a torn packet.
+    """
+
+    HEAD = struct.Struct("<QI")                    # generation, payload length
+
+    def __init__(self, name: Optional[str] = None, size: int = 1 << 16):
+        from multiprocessing import shared_memory
+        self._shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.name = self._shm.name
+        self._owner = name is None
+        self._gen = 0
+
+    def write(self, data: bytes) -> None:
+        buf, n = self._shm.buf, len(data)
+        if self.HEAD.size + n > len(buf):
+            raise ValueError(f"packet of {n} B does not fit the {len(buf)} B slot")
+        self._gen += 1
+        self.HEAD.pack_into(buf, 0, self._gen, n)
+        buf[self.HEAD.size:self.HEAD.size + n] = data
+        self._gen += 1
+        self.HEAD.pack_into(buf, 0, self._gen, n)
+
+    def read(self, last: int = 0) -> tuple[Optional[bytes], int]:
+        """(packet, generation) if something newer than `last` is complete, else (None, last)."""
+        buf = self._shm.buf
+        gen, n = self.HEAD.unpack_from(buf)
+        if gen == last or gen & 1:
+            return None, last
+        data = bytes(buf[self.HEAD.size:self.HEAD.size + n])
+        if self.HEAD.unpack_from(buf)[0] != gen:
+            return None, last
+        return data, gen
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Blender side (child process)
+# ═══════════════════════════════════════════════════════════════════════════
+class BlenderStandIn:
+    """bpy.app.timers.register() stand-in: callbacks run on the main loop at `fps`."""
+
+    def __init__(self, fps: float = 60.0):
+        self.period = 1.0 / fps
+        self._due: deque = deque()
+
+    def register(self, fn: Callable[[], Any], first_interval: float = 0.0) -> None:
+        self._due.append((time.monotonic() + first_interval, fn))
+
+    def run(self, stop) -> None:
+        while not stop.is_set():
+            now, later = time.monotonic(), []
+            while self._due:
+                t, fn = self._due.popleft()
+                if t <= now:
+                    fn()
+                else:
+                    later.append((t, fn))
+            self._due.extend(later)
+            time.sleep(self.period)
+
+
+def _receive_json(path, poll_s, seen, stop):
+    # refresh_loop: read the whole file, skip repeated seq, sleep 0.1 s
+    last = None
+    while not stop.is_set():
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):            # missing or half-written: next poll
+            data = {}
+        if data.get("seq") not in (None, last):
+            last = data["seq"]
+            keys = [round(t, 4) for t in data.get("onsets", ())]
+            if keys:
+                seen(keys)
+        time.sleep(poll_s)
+
+
+def _receive_codec(read, seen, stop):
+    decoder = FrameDecoder()
+    while not stop.is_set():
+        packet = read()
+        if packet is None:
+            continue
+        try:
+            frame = decoder.decode(packet)
+        except CodecError:
+            continue
+        if frame.get("onset", 0.0) > 0:
+            seen([frame["seq"]])
+
+
+def _blender(transport, target, poll_s, fps, ready, stop, out):
+    """Child process: receive `transport`, apply on the stand-in main loop, report stamps."""
+    bl = BlenderStandIn(fps)
+    recv: Dict[Any, float] = {}
+    apply: Dict[Any, float] = {}
+
+    def applied(keys):
+        t = time.monotonic()
+        for k in keys:
+            apply.setdefault(k, t)
+
+    def seen(keys):
+        t = time.monotonic()
+        for k in keys:
+            recv.setdefault(k, t)
+        bl.register(lambda: applied(keys), first_interval=0.0)
+
+    if transport == "json":
+        ready.put(None)
+        rx = threading.Thread(target=_receive_json, args=(target, poll_s, seen, stop), daemon=True)
+    elif transport == "udp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(0.1)
+        ready.put(sock.getsockname()[1])
+
+        def read():
+            try:
+                return sock.recv(65536)
+            except socket.timeout:
+                return None
+        rx = threading.Thread(target=_receive_codec, args=(read, seen, stop), daemon=True)
+    else:
+        slot, gen = ShmSlot(target), [0]
+        ready.put(None)
+
+        def read():
+            packet, gen[0] = slot.read(gen[0])
+            if packet is None:
+                time.sleep(poll_s)
+            return packet
+        rx = threading.Thread(target=_receive_codec, args=(read, seen, stop), daemon=True)
+    rx.start()
+    bl.run(stop)
+    rx.join(1.0)
+    out.put((recv, apply))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Orbis side
+# ═══════════════════════════════════════════════════════════════════════════
+class _Trace:
+    """Stage stamps per click, keyed by onset time (JSON) and frame seq (codec)."""
+
+    def __init__(self, period: float, sr: int):
+        self.period, self.sr = period, sr
+        self.clicks: Dict[float, Dict[str, float]] = {}
+        self.by_seq: Dict[int, list] = {}
+        self.by_t: Dict[float, float] = {}
+        self._lock = threading.Lock()
+
+    def on_frame(self, fr: dict) -> None:
+        # analyzer thread: match each onset to the click that caused it
+        keys = []
+        for o in fr["onsets"]:
+            k = round(o["t"] / self.period) * self.period
+            if abs(o["t"] - k) > MATCH_S:
+                continue
+            adc = fr["t_adc"] + (k * self.sr - fr["sample"]) / self.sr
+            with self._lock:
+                if k not in self.clicks:
+                    self.clicks[k] = dict(adc=adc, done=fr["t_done"])
+                    keys.append(k)
+                    self.by_t[round(o["t"], 4)] = k
+        if keys:
+            self.by_seq[fr["seq"]] = keys
+
+    def stamp(self, stage: str, keys, t: float, by: Dict) -> None:
+        with self._lock:
+            for key in keys:
+                k = by.get(key)
+                for c in (k if isinstance(k, list) else [k] if k is not None else []):
+                    self.clicks[c].setdefault(stage, t)
+
+
+def _export_json(analyzer, path, tick_s, trace, stop):
+    # OrbisUI._tick: everything since the last tick, the cockpit's full payload once per tick
+    last = 0
+    while not stop.is_set():
+        time.sleep(tick_s)
+        new = analyzer.frames.read_since(last)
+        if not new:
+            continue
+        last = new[-1]["seq"]
+        data = json_bridge.payload(new[-1], new, "bench", last)
+        json_bridge.write(path, data)
+        trace.stamp("export", data["onsets"], time.monotonic(), trace.by_t)
+
+
+def _percentiles(ms: list) -> Dict[str, float]:
+    if not ms:
+        return dict(n=0)
+    a = np.asarray(ms)
+    out = {f"p{p}": round(float(np.percentile(a, p)), 2) for p in PERCENTILES}
+    out.update(n=len(a), max=round(float(a.max()), 2))
+    return out
+
+
+def measure(transport: str, seconds: float = 10.0, tick_s: float = 0.1, poll_s: float = 0.1,
+            shm_poll_s: float = 0.001, fps: float = 60.0, bpm: float = 120.0,
+            blocksize: Optional[int] = None, **analyzer_kw) -> Dict[str, Any]:
+    """One transport, fresh analyzer and Blender process; stage percentiles in ms."""
+    from audio_analyzer import AudioAnalyzer
+    from sources import SyntheticSource
+
+    if transport not in TRANSPORTS:
+        raise ValueError(f"unknown transport '{transport}', expected one of {TRANSPORTS}")
+    ctx = mp.get_context("spawn")                  # same start method as on Windows
+    ready, out, stop = ctx.Queue(), ctx.Queue(), ctx.Event()
+    src = SyntheticSource("mix", bpm=bpm, blocksize=blocksize)
+    analyzer = AudioAnalyzer(source=src, **analyzer_kw)
+    trace = _Trace(60.0 / bpm, src.sample_rate)
+    analyzer.frames.add_listener(trace.on_frame)
+    tmp, slot, sock, writer = None, None, None, None
+    wstop = threading.Event()
+
+    if transport == "json":
+        tmp = tempfile.mkdtemp(prefix="orbis_bench_")
+        target = os.path.join(tmp, "orbis_data.json")
+    elif transport == "shm":
+        slot = ShmSlot()
+        target = slot.name
+    else:
+        target = None
+    child = ctx.Process(target=_blender, args=(transport, target, poll_s if transport == "json" else shm_poll_s,
+                                               fps, ready, stop, out), daemon=True)
+    child.start()
+    port = ready.get(timeout=30)
+
+    if transport == "json":
+        writer = threading.Thread(target=_export_json, args=(analyzer, target, tick_s, trace, wstop), daemon=True)
+        writer.start()
+    else:
+        # one packet per frame straight from the analyzer thread; shm keeps only the
+        # latest packet, so every one of them must be a key frame
+        encoder = FrameEncoder("zlib", key_interval=0 if transport == "shm" else 60)
+        if transport == "udp":
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            send = lambda b: sock.sendto(b, ("127.0.0.1", port))
+        else:
+            send = slot.write
+
+        def publish(fr):
+            packet = encoder.encode(frame_fields(fr), fr["seq"])
+            trace.stamp("export", [fr["seq"]], time.monotonic(), trace.by_seq)
+            send(packet)
+        analyzer.frames.add_listener(publish)
+
+    analyzer.start()
+    try:
+        time.sleep(seconds)
+    finally:
+        analyzer.stop()
+        wstop.set()
+        time.sleep(max(tick_s, poll_s, 0.2))       # let the last click arrive
+        stop.set()
+        try:
+            recv, apply = out.get(timeout=10)
+        except queue.Empty:
+            recv, apply = {}, {}
+        child.join(5)
+        if writer is not None:
+            writer.join()
+        if sock is not None:
+            sock.close()
+        if slot is not None:
+            slot.close()
+        if tmp is not None:
+            Path(target).unlink(missing_ok=True)
+            os.rmdir(tmp)
+
+    by = trace.by_t if transport == "json" else trace.by_seq
+    for key, t in recv.items():
+        trace.stamp("recv", [key], t, by)
+    for key, t in apply.items():
+        trace.stamp("apply", [key], t, by)
+    clicks = list(trace.clicks.values())
+    result: Dict[str, Any] = {name: _percentiles([(c[b] - c[a]) * 1e3 for c in clicks if a in c and b in c])
+                              for name, a, b in STAGES}
+    result.update(clicks=len(clicks), missed=sum("apply" not in c for c in clicks))
+    return result
+
+
+def run(transports=TRANSPORTS, **kw) -> Dict[str, Dict[str, Any]]:
+    """measure() every transport in turn."""
+    return {t: measure(t, **kw) for t in transports}
+
+
+def report(results: Dict[str, Dict[str, Any]]) -> str:
+    lines = []
+    for transport, r in results.items():
+        lines.append(f"{transport}: {r['clicks']} clicks, {r['missed']} not applied")
+        for name, _, _ in STAGES:
+            p = r[name]
+            if p["n"]:
+                lines.append(f"  {name:<9} p50 {p['p50']:7.1f}  p90 {p['p90']:7.1f}  "
+                             f"p99 {p['p99']:7.1f}  max {p['max']:7.1f} ms")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    kw: Dict[str, Any] = {"multirate": "--multirate" in args}
+    for flag, key, cast in (("--seconds", "seconds", float), ("--blocksize", "blocksize", int),
+                            ("--tick", "tick_s", float), ("--poll", "poll_s", float), ("--fps", "fps", float)):
+        if flag in args:
+            kw[key] = cast(args[args.index(flag) + 1])
+    chosen = [a for a in args if a in TRANSPORTS] or TRANSPORTS
+    print(report(run(chosen, **kw)))
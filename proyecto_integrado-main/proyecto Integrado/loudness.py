@@ -0,0 +1,151 @@
+"""
+loudness  – streaming K-weighted loudness (ITU-R BS.1770-4, EBU R128 windows)
+• K-weighting = high shelf (+4 dB above ~1.7 kHz) followed by the RLB
+  high-pass (38 Hz), designed for any sample rate with the formulas
+  libebur128 uses (at 48 kHz they give the coefficients printed in BS.1770).
+• Both biquads run as one 4th-order IIR – exactly, but a block at a time in
+  state-space form: the zero-state part is an FFT convolution with the
+  impulse response, the carried state enters through an (n × 4) product.
+  The matrices are built once per block size, so no per-sample loop runs.
+• momentary (400 ms) and short-term (3 s) loudness over the newest samples:
+  −0.691 + 10·log10(Σ channel mean square), channel weights 1 (mono, L/R,
+  C).  Until a window has filled it covers what has arrived.  Both window
+  sums are kept running (re-summed exactly once per 3 s ring wrap).
+  Integrated loudness (gated, whole programme) is not computed here.
+"""
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+FLOOR_LUFS = -120.0
+
+
+def k_weighting(sample_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+    """(b, a) of the cascaded K-weighting filter (4th order, a[0] = 1)."""
+    # stage 1: high shelf
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    b1 = np.array([vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k]) / a0
+    a1 = np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0])
+    # stage 2: RLB high-pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    b2 = np.array([1.0, -2.0, 1.0])
+    a2 = np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0])
+    return np.convolve(b1, b2), np.convolve(a1, a2)
+
+
+class _BlockIIR:
+    """
+    Transposed direct form II, evaluated per block:
+        y = h[:n] ∗ x  +  G z          z ← Aⁿ z + F x
+    with h the impulse response, G[k] = C Aᵏ, F[:, k] = Aⁿ⁻¹⁻ᵏ B.
+    """
+
+    def __init__(self, b: np.ndarray, a: np.ndarray):
+        b, a = np.asarray(b, float) / a[0], np.asarray(a, float) / a[0]
+        m = len(a) - 1
+        self._a = np.zeros((m, m))
+        self._a[:, 0] = -a[1:]
+        self._a[np.arange(m - 1), np.arange(1, m)] = 1.0
+        self._b = b[1:] - a[1:] * b[0]
+        self._d = b[0]
+        self._cache: Dict[int, tuple] = {}
+        self.order = m
+
+    def _mats(self, n: int) -> tuple:
+        mats = self._cache.get(n)
+        if mats is None:
+            if len(self._cache) >= 8:               # sources keep one block size; direct callers may not
+                self._cache.clear()
+            a = self._a
+            v = self._b[None]                       # v[k] = Aᵏ B
+            g = np.eye(self.order)[:1]              # g[k] = C Aᵏ (C = e₀)
+            p = a                                   # doubling: rows k + 2ʲ from rows k
+            while len(v) < n:
+                v, g, p = np.vstack((v, v @ p.T)), np.vstack((g, g @ p)), p @ p
+            v, g = v[:n], g[:n]
+            h = np.r_[self._d, v[:-1, 0]]
+            size = 1 << (2 * n - 1).bit_length()    # linear (not circular) convolution
+            mats = self._cache[n] = (np.fft.rfft(h, size), size, g, v[::-1].T.copy(),
+                                     np.linalg.matrix_power(a, n))
+        return mats
+
+    def process(self, x: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """x (channels, n), z (channels, order) → (y, new z)."""
+        n = x.shape[1]
+        hf, size, g, f, an = self._mats(n)
+        y = np.fft.irfft(np.fft.rfft(x, size, axis=-1) * hf, size, axis=-1)[:, :n]
+        y += z @ g.T
+        return y, z @ an.T + x @ f.T
+
+
+class LoudnessMeter:
+    """process(block or channels×block) → dict(momentary_lufs, short_term_lufs)."""
+
+    def __init__(self, sample_rate: int, momentary_s: float = 0.4, short_term_s: float = 3.0):
+        self.sample_rate = int(sample_rate)
+        self._iir = _BlockIIR(*k_weighting(self.sample_rate))
+        self._m = max(1, int(round(momentary_s * self.sample_rate)))
+        self._e = np.zeros(max(self._m, int(round(short_term_s * self.sample_rate))))
+        self._z = np.zeros((1, self._iir.order))
+        self.reset()
+
+    def reset(self) -> None:
+        self._z = np.zeros_like(self._z)
+        self._e[:] = 0.0                             # Σ over channels of the weighted squares
+        self._pos = self._filled = 0
+        self._sum_m = self._sum_s = 0.0
+        self.momentary = self.short_term = FLOOR_LUFS
+
+    def process(self, x: np.ndarray) -> dict:
+        x = np.atleast_2d(np.asarray(x, np.float64))
+        if not x.shape[1]:
+            return self.values()
+        if len(self._z) != len(x):                   # channel count changed
+            self._z = np.zeros((len(x), self._iir.order))
+        y, self._z = self._iir.process(x, self._z)
+        e = np.einsum("cn,cn->n", y, y)[-len(self._e):]
+        ring, p, n, m = self._e, self._pos, len(e), self._m
+        if p + n >= len(ring):                       # wraps: write, then re-sum both windows exactly
+            first = len(ring) - p
+            ring[p:] = e[:first]
+            ring[:n - first] = e[first:]
+            self._pos = (p + n) % len(ring)
+            self._sum_s = ring.sum()
+            self._sum_m = self._span(self._pos - m, m)
+        else:                                        # slide: add the block, drop what left each window
+            total = e.sum()
+            self._sum_m = e[-m:].sum() if n >= m else self._sum_m + total - self._span(p - m, n)
+            self._sum_s += total - ring[p:p + n].sum()
+            ring[p:p + n] = e
+            self._pos = p + n
+        self._filled = min(self._filled + n, len(ring))
+        self.momentary = self._lufs(self._sum_m, m)
+        self.short_term = self._lufs(self._sum_s, len(ring))
+        return self.values()
+
+    def _span(self, start: int, count: int) -> float:
+        """Sum of `count` ring entries from `start` (indices wrap)."""
+        ring = self._e
+        start %= len(ring)
+        end = start + count
+        return ring[start:end].sum() if end <= len(ring) else ring[start:].sum() + ring[:end - len(ring)].sum()
+
+    def _lufs(self, s: float, m: int) -> float:
+        m = min(m, self._filled)
+        if not m or s <= 0:
+            return FLOOR_LUFS
+        return max(FLOOR_LUFS, float(-0.691 + 10 * np.log10(s / m)))
+
+    def values(self) -> dict:
+        return {
+            "momentary_lufs": self.momentary,
+            "short_term_lufs": self.short_term,
+        }
@@ -0,0 +1,224 @@
+"""
+metrics  – Prometheus text-format health endpoint for the analysis pipeline
+• MetricsServer(analyzers).start() serves GET /metrics on 127.0.0.1:9464
+  (ThreadingHTTPServer in a daemon thread, like launch_baryon's viewer).
+  `analyzers` is a callable → {stream name: AudioAnalyzer}, so the cockpit
+  and the daemon can swap analyzers without telling the server.
+• Per stream (label stream="…"):
+      orbis_frames_total               frames published (counter)
+      orbis_frames_per_second          over the time since the previous scrape
+      orbis_last_frame_age_seconds     now − t_done: grows when the orb froze
+      orbis_capture_latency_seconds    t_done − t_adc of the latest frame
+      orbis_frame_listeners            subscribers on the frame channel
+      orbis_silent                     1 while the silence gate is closed
+      orbis_source_overflows_total     input overruns (PortAudio / pacing)
+      orbis_dropped_blocks_total, orbis_backlog_blocks   (MultiStreamManager)
+• Process-wide, from instrumentation.HOT_PATH (label stage="…", plus
+  stream="…" for the per-source stages of a MultiStreamManager):
+      orbis_stage_seconds{quantile}    summary: 0.5 / 0.9 / 0.99 + _sum / _count
+                                       (export write rate = rate(…_count{stage="json"}))
+      orbis_stage_overruns_total       samples over the stage budget
+      orbis_stage_budget_seconds
+  plus orbis_process_resident_bytes, orbis_threads, process_start_time_seconds.
+• Rendering reads counters only – nothing is locked against the audio thread.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+
+from instrumentation import HOT_PATH, StageTimings
+
+DEFAULT_PORT = 9464
+QUANTILES = (0.5, 0.9, 0.99)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+_START = time.time()
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:                                             # Linux without psutil
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _stage_labels(stage: str) -> Dict[str, str]:
+    # "callback/mic" (per-source analyzer stage) → stage="callback", stream="mic"
+    name, _, stream = stage.partition("/")
+    return dict(stage=name, stream=stream) if stream else dict(stage=name)
+
+
+def _esc(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Doc:
+    """Accumulates one exposition: HELP / TYPE once per family, then samples."""
+
+    def __init__(self):
+        self.lines: list[str] = []
+
+    def family(self, name: str, kind: str, help_: str) -> None:
+        self.lines += [f"# HELP {name} {help_}", f"# TYPE {name} {kind}"]
+
+    def sample(self, name: str, value: float, **labels) -> None:
+        lab = ",".join(f'{k}="{_esc(v)}"' for k, v in labels.items())
+        self.lines.append(f"{name}{{{lab}}} {value:.9g}" if lab else f"{name} {value:.9g}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines) + "\n"
+
+
+class MetricsServer:
+    """start() → bound port; stop(); render() → exposition text (also usable without HTTP)."""
+
+    def __init__(self, analyzers: Callable[[], Dict[str, Any]],
+                 stats: Optional[Callable[[], Dict[str, dict]]] = None,
+                 timings: StageTimings = HOT_PATH, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.analyzers = analyzers
+        self.stats = stats
+        self.timings = timings
+        self.host, self.port = host, port
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._rate: Dict[str, tuple] = {}          # stream → (t, seq, fps) of the previous scrape
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._httpd is not None
+
+    def start(self) -> int:
+        """Bind and serve in a daemon thread; OSError if the port is taken."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):         # one line per scrape is noise
+                pass
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        threading.Thread(target=self._httpd.serve_forever, name="orbis-metrics", daemon=True).start()
+        return self.port
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    # -----------------------------------------------------------------------
+    def render(self) -> str:
+        doc = _Doc()
+        try:
+            streams = dict(self.analyzers() or {})
+        except Exception:                          # analyzer being swapped: report the process only
+            streams = {}
+        self._streams(doc, streams)
+        if self.stats is not None:
+            self._manager(doc, self.stats() or {})
+        self._stages(doc)
+        self._process(doc)
+        return doc.text()
+
+    def _streams(self, doc: _Doc, streams: Dict[str, Any]) -> None:
+        now, mono = time.time(), time.monotonic()
+        rows = []
+        for name, a in streams.items():
+            fr = a.frames.latest()
+            seq = a.frames.seq
+            with self._lock:
+                t0, seq0, fps = self._rate.get(name, (mono, seq, 0.0))
+                if mono - t0 >= 0.5:
+                    fps = (seq - seq0) / (mono - t0) if seq >= seq0 else 0.0
+                    self._rate[name] = (mono, seq, fps)
+                elif name not in self._rate:
+                    self._rate[name] = (t0, seq0, fps)
+            src = getattr(a, "source", None)
+            rows.append((name, seq, fps, fr, a.frames.listener_count, getattr(src, "overflows", 0)))
+        with self._lock:                            # forget streams that went away
+            for gone in set(self._rate) - set(streams):
+                del self._rate[gone]
+
+        doc.family("orbis_frames_total", "counter", "Analysis frames published.")
+        for name, seq, *_ in rows:
+            doc.sample("orbis_frames_total", seq, stream=name)
+        doc.family("orbis_frames_per_second", "gauge", "Frame rate since the previous scrape.")
+        for name, _, fps, *_ in rows:
+            doc.sample("orbis_frames_per_second", fps, stream=name)
+        doc.family("orbis_last_frame_age_seconds", "gauge",
+                   "Time since the latest frame finished analysis (monotonic clock).")
+        for name, _, _, fr, *_ in rows:
+            if fr is not None and fr.get("t_done") is not None:
+                doc.sample("orbis_last_frame_age_seconds", mono - fr["t_done"], stream=name)
+        doc.family("orbis_capture_latency_seconds", "gauge", "ADC capture to analysis done, latest frame.")
+        for name, _, _, fr, *_ in rows:
+            if fr is not None and fr.get("t_adc") is not None:
+                doc.sample("orbis_capture_latency_seconds", fr["t_done"] - fr["t_adc"], stream=name)
+        doc.family("orbis_frame_listeners", "gauge", "Subscribers on the frame channel.")
+        for name, _, _, _, listeners, _ in rows:
+            doc.sample("orbis_frame_listeners", listeners, stream=name)
+        doc.family("orbis_silent", "gauge", "1 while the analyzer's silence gate is closed (latest frame).")
+        for name, _, _, fr, *_ in rows:
+            if fr is not None:
+                doc.sample("orbis_silent", float(bool(fr.get("silent"))), stream=name)
+        doc.family("orbis_source_overflows_total", "counter", "Input overruns reported by the audio source.")
+        for name, *_, overflows in rows:
+            doc.sample("orbis_source_overflows_total", overflows, stream=name)
+        doc.family("orbis_scrape_timestamp_seconds", "gauge", "Wall-clock time of this scrape.")
+        doc.sample("orbis_scrape_timestamp_seconds", now)
+
+    @staticmethod
+    def _manager(doc: _Doc, stats: Dict[str, dict]) -> None:
+        doc.family("orbis_dropped_blocks_total", "counter", "Blocks dropped because the DSP worker was behind.")
+        for name, st in stats.items():
+            doc.sample("orbis_dropped_blocks_total", st["dropped"], stream=name)
+        doc.family("orbis_backlog_blocks", "gauge", "Blocks queued for the DSP worker.")
+        for name, st in stats.items():
+            doc.sample("orbis_backlog_blocks", st["backlog"], stream=name)
+
+    def _stages(self, doc: _Doc) -> None:
+        hists = [(_stage_labels(s), self.timings.histogram(s)) for s in list(self.timings.snapshot())]
+        doc.family("orbis_stage_seconds", "summary", "Hot-path stage duration (bucketed quantiles).")
+        for lb, h in hists:
+            for q in QUANTILES:
+                doc.sample("orbis_stage_seconds", h.percentile_ns(q * 100) / 1e9, **lb, quantile=q)
+            doc.sample("orbis_stage_seconds_sum", h.total_ns / 1e9, **lb)
+            doc.sample("orbis_stage_seconds_count", h.n, **lb)
+        doc.family("orbis_stage_overruns_total", "counter", "Stage samples over their budget.")
+        for lb, h in hists:
+            doc.sample("orbis_stage_overruns_total", h.overruns, **lb)
+        doc.family("orbis_stage_budget_seconds", "gauge", "Stage budget (0 = none).")
+        for lb, h in hists:
+            doc.sample("orbis_stage_budget_seconds", h.budget_ns / 1e9, **lb)
+
+    @staticmethod
+    def _process(doc: _Doc) -> None:
+        rss = _rss_bytes()
+        if rss is not None:
+            doc.family("orbis_process_resident_bytes", "gauge", "Resident memory of this process.")
+            doc.sample("orbis_process_resident_bytes", rss)
+        doc.family("orbis_threads", "gauge", "Python threads alive.")
+        doc.sample("orbis_threads", threading.active_count())
+        doc.family("process_start_time_seconds", "gauge", "Start time of the process (unix seconds).")
+        doc.sample("process_start_time_seconds", _START)
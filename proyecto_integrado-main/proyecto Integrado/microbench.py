@@ -0,0 +1,332 @@
+"""
+microbench  – fixed-input microbenchmarks for the DSP, UI-update and mesh hot paths
+• Cases (seeded inputs, identical on every run):
+    analyzer.process/<n>      AudioAnalyzer.process on n-sample blocks (512 … 16384)
+    analyzer.multirate/512    the same in multirate mode
+    features.ui/1-<k>         the registry work behind _tick's band read-outs
+                              (UI_FEATURES) at 1/1, 1/3 and 1/6 octave
+    ui.plot_spectrum          OrbisUI on an offscreen Qt platform; skipped when
+                              PySide6 / pyqtgraph / sounddevice are missing
+    export.json               json_bridge payload + write, as _tick / the daemon do
+    mesh.load_obj/<tris>      generated grid OBJ of 10k … 5M triangles
+    mesh.icosphere/<s>        create_icosphere(subdivisions=1 … 7)
+• Every case repeats until `min_time`, counted from a warm-up call (which is
+  the only sample when it alone took min_time – 1M-triangle OBJs), and reports
+  median / best seconds per call, calls/s, a unit rate (samples/s,
+  triangles/s) and allocations of one call – tracemalloc peak and bytes
+  still held afterwards – from a separate traced call, so tracing never
+  inflates the timings.  Tracing slows a call several-fold, so cases whose
+  best untraced call exceeds `alloc_max_s` (ALLOC_MAX_S) skip it and
+  report no allocations (5M-triangle OBJs).
+• Baselines are JSON ({meta, cases}); compare() flags cases whose median
+  moved by more than `threshold`.
+  `python microbench.py [-k filter] [--quick] [--save [file]] [--compare [file]]`
+  (default file: benchmarks/<host>.json next to this module).
+"""
+from __future__ import annotations
+
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import numpy as np
+
+from json_bridge import FEATURES
+
+BASELINE_DIR = Path(__file__).resolve().parent / "benchmarks"
+CHUNKS = (512, 1024, 2048, 4096, 8192, 16384)
+FRACTIONS = (1, 3, 6)
+TRIANGLES = (10_000, 100_000, 1_000_000, 5_000_000)
+SUBDIVISIONS = (1, 2, 3, 4, 5, 6, 7)
+QUICK = dict(chunks=(512, 2048, 8192), triangles=(10_000, 100_000), subdivisions=(1, 2, 3, 4))
+# same subscription as orbis_ui.UI_FEATURES (that module needs Qt to import)
+UI_FEATURES = FEATURES
+SR = 44100
+ALLOC_MAX_S = 1.0                                  # slower calls are not re-run under tracemalloc
+
+
+class Skip(Exception):
+    """A case that cannot run here (missing optional package)."""
+
+
+class Case:
+    """name, setup() → fn(), and what one call processes (`units` of `unit`)."""
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], Any]],
+                 units: float = 1.0, unit: str = "calls"):
+        self.name, self.setup, self.units, self.unit = name, setup, units, unit
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Inputs
+# ═══════════════════════════════════════════════════════════════════════════
+def _signal(n: int, channels: int = 2, seed: int = 0) -> np.ndarray:
+    """Sine + clicks + noise, the same "mix" SyntheticSource plays."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / SR
+    mono = 0.25 * np.sin(2 * np.pi * 440 * t) + 0.7 * np.exp(-t * 60) * np.sin(2 * np.pi * 80 * t)
+    out = mono[:, None] + 0.01 * rng.standard_normal((n, channels))
+    return (out * 0.25).astype(np.float32)
+
+
+def _analyzer(blocksize: int, **kw):
+    from audio_analyzer import AudioAnalyzer
+    from sources import SyntheticSource
+    return AudioAnalyzer(source=SyntheticSource("mix", channels=2, blocksize=blocksize), **kw)
+
+
+def _frame(fraction: int = 3, chunk: int = 8192) -> dict:
+    """A real analyzer snapshot (fft, bands, …) after a few blocks of signal."""
+    a = _analyzer(chunk)
+    a.set_band_resolution(fraction)
+    for _ in range(4):
+        a.process(_signal(chunk))
+    return a.get_audio_data()
+
+
+def _write_grid_obj(path: Path, triangles: int) -> int:
+    """Square grid of 2·n² triangles (no normals, like most exports); returns the count."""
+    n = max(1, int(round((triangles / 2) ** 0.5)))
+    y, x = np.mgrid[0:n + 1, 0:n + 1]
+    z = 0.1 * np.sin(x * 0.1) * np.cos(y * 0.1)
+    verts = np.column_stack((x.ravel(), y.ravel(), z.ravel())).astype(np.float32)
+    i = (np.arange(n)[:, None] * (n + 1) + np.arange(n)[None, :]).ravel() + 1     # OBJ is 1-based
+    faces = np.concatenate([np.column_stack((i, i + 1, i + n + 2)),
+                            np.column_stack((i, i + n + 2, i + n + 1))])
+    with open(path, "w") as f:
+        f.write("".join(f"v {a:.6f} {b:.6f} {c:.6f}\n" for a, b, c in verts.tolist()))
+        f.write("".join(f"f {a} {b} {c}\n" for a, b, c in faces.tolist()))
+    return len(faces)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Cases
+# ═══════════════════════════════════════════════════════════════════════════
+def _process_case(n: int, multirate: bool = False) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        a = _analyzer(n, multirate=multirate)
+        a.subscribe(UI_FEATURES)
+        block = _signal(n)
+        return lambda: a.process(block)
+    return setup
+
+
+def _features_case(fraction: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        from features import SpectralFrame, default_registry
+        fr = _frame(fraction)
+        reg = default_registry()
+        reg.subscribe(UI_FEATURES)
+        mag = np.asarray(fr["fft"], float)
+        return lambda: reg.compute(SpectralFrame(mag, fr["sample_rate"], fr["band_engine"], fr["bands"]))
+    return setup
+
+
+_UI: Dict[str, Any] = {}
+
+
+def _ui():
+    """One offscreen OrbisUI shared by the ui.* cases, its JSON pointed at a temp file."""
+    if "win" not in _UI:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PySide6.QtWidgets import QApplication
+            import orbis_ui
+        except ImportError as exc:
+            raise Skip(f"needs the '{exc.name}' package") from None
+        _UI["app"] = QApplication.instance() or QApplication([])
+        orbis_ui.JSON_PATH = Path(tempfile.mkdtemp(prefix="orbis_bench_")) / "orbis_data.json"
+        _UI["win"] = orbis_ui.OrbisUI(None)
+    return _UI["win"]
+
+
+def _plot_case():
+    win, fr = _ui(), _frame()
+    fft = np.asarray(fr["fft"])
+    return lambda: win._plot_spectrum(fft, fr["sample_rate"], fr["band_engine"], fr["bands"])
+
+
+def _export_case():
+    import json_bridge
+    fr = _frame()
+    path = Path(tempfile.mkdtemp(prefix="orbis_bench_")) / "orbis_data.json"
+    return lambda: json_bridge.write(path, json_bridge.payload(fr, [fr], "bench", fr["seq"]))
+
+
+def _obj_case(tmp: Path, triangles: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        from mesh_utils import load_obj
+        path = tmp / f"grid_{triangles}.obj"
+        if not path.exists():
+            _write_grid_obj(path, triangles)
+        return lambda: load_obj(path)
+    return setup
+
+
+def _icosphere_case(s: int) -> Callable[[], Callable[[], Any]]:
+    def setup():
+        from mesh_utils import create_icosphere
+        return lambda: create_icosphere(1.0, s)
+    return setup
+
+
+def cases(quick: bool = False, tmp: Optional[Path] = None) -> Iterator[Case]:
+    chunks = QUICK["chunks"] if quick else CHUNKS
+    tris = QUICK["triangles"] if quick else TRIANGLES
+    subs = QUICK["subdivisions"] if quick else SUBDIVISIONS
+    tmp = tmp or Path(tempfile.mkdtemp(prefix="orbis_bench_"))
+    for n in chunks:
+        yield Case(f"analyzer.process/{n}", _process_case(n), n, "samples")
+    yield Case("analyzer.multirate/512", _process_case(512, multirate=True), 512, "samples")
+    for k in FRACTIONS:
+        yield Case(f"features.ui/1-{k}", _features_case(k))
+    yield Case("ui.plot_spectrum", _plot_case)
+    yield Case("export.json", _export_case)
+    for t in tris:
+        n = max(1, int(round((t / 2) ** 0.5)))
+        yield Case(f"mesh.load_obj/{t}", _obj_case(tmp, t), 2 * n * n, "triangles")
+    for s in subs:
+        yield Case(f"mesh.icosphere/{s}", _icosphere_case(s), 20 * 4 ** s, "triangles")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Runner
+# ═══════════════════════════════════════════════════════════════════════════
+def _allocations(fn: Callable[[], Any]) -> Dict[str, int]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return dict(peak_bytes=peak - before, held_bytes=current - before)
+
+
+def measure(case: Case, min_time: float = 0.5, max_calls: int = 10_000,
+            alloc_max_s: float = ALLOC_MAX_S) -> Dict[str, Any]:
+    fn = case.setup()
+    t0 = time.perf_counter()
+    t_end = t0 + min_time                          # the warm-up counts against min_time
+    fn()                                           # warm-up: caches, lazy imports
+    warm = time.perf_counter() - t0
+    times: list[float] = [warm] if warm >= min_time else []
+    while not times or (time.perf_counter() < t_end and len(times) < max_calls):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    med = statistics.median(times)
+    out: Dict[str, Any] = dict(median_s=med, best_s=min(times), calls=len(times),
+                               per_s=1.0 / med, unit=case.unit, units_per_s=case.units / med)
+    out.update(_allocations(fn) if min(times) <= alloc_max_s else dict(peak_bytes=None, held_bytes=None))
+    return out
+
+
+def run(quick: bool = False, select: Optional[str] = None, min_time: float = 0.5,
+        progress: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """{meta, cases: {name: stats | {"skipped": reason}}} for every case matching `select`."""
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="orbis_bench_") as tmp:
+        for case in cases(quick, Path(tmp)):
+            if select and select not in case.name:
+                continue
+            try:
+                results[case.name] = measure(case, min_time)
+            except Skip as exc:
+                results[case.name] = {"skipped": str(exc)}
+            if progress:
+                progress(case.name, results[case.name])
+    return {"meta": _meta(), "cases": results}
+
+
+def _meta() -> Dict[str, Any]:
+    return dict(host=platform.node(), machine=platform.machine(), platform=platform.platform(),
+                python=platform.python_version(), numpy=np.__version__,
+                date=time.strftime("%Y-%m-%d %H:%M:%S"))
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Baselines
+# ═══════════════════════════════════════════════════════════════════════════
+def default_baseline() -> Path:
+    return BASELINE_DIR / f"{platform.node() or 'local'}.json"
+
+
+def save(results: Dict[str, Any], path: Optional[Path] = None) -> Path:
+    path = Path(path or default_baseline())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(results, indent=2))
+    tmp.replace(path)
+    return path
+
+
+def load(path: Optional[Path] = None) -> Dict[str, Any]:
+    return json.loads(Path(path or default_baseline()).read_text())
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.10) -> list[str]:
+    """Report lines; a case slower (or allocating more) by more than `threshold` is a REGRESSION."""
+    lines = []
+    for name, b in new["cases"].items():
+        a = old["cases"].get(name)
+        if "skipped" in b or not a or "skipped" in a:
+            continue
+        ratio = b["median_s"] / a["median_s"]
+        traced = a.get("peak_bytes") is not None and b.get("peak_bytes") is not None
+        mem = (b["peak_bytes"] + 1) / (a["peak_bytes"] + 1) if traced else 1.0
+        tag = ("REGRESSION" if ratio > 1 + threshold or mem > 1 + threshold else
+               "faster" if ratio < 1 - threshold else "")
+        peak = f"{mem:5.2f}×" if traced else "    –"
+        lines.append(f"{name:<26} {_fmt_s(a['median_s']):>10} → {_fmt_s(b['median_s']):>10}  "
+                     f"{ratio:6.2f}×  peak {peak}  {tag}")
+    return lines
+
+
+def _fmt_s(s: float) -> str:
+    return f"{s * 1e6:.1f} µs" if s < 1e-3 else f"{s * 1e3:.2f} ms" if s < 1 else f"{s:.2f} s"
+
+
+def format_result(name: str, r: Dict[str, Any]) -> str:
+    if "skipped" in r:
+        return f"{name:<26} skipped – {r['skipped']}"
+    rate = "" if r["unit"] == "calls" else f"  {r['units_per_s']:12,.0f} {r['unit']}/s"
+    mem = ("  allocations not traced (slow case)" if r.get("peak_bytes") is None else
+           f"  peak {r['peak_bytes'] / 1024:,.0f} KiB  held {r['held_bytes'] / 1024:,.0f} KiB")
+    return (f"{name:<26} {_fmt_s(r['median_s']):>10} (best {_fmt_s(r['best_s'])}, {r['calls']} calls)"
+            f"{rate}{mem}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+
+    def opt(flag):
+        # "--save" alone → default file; "--save path" → that file
+        if flag not in args:
+            return None
+        i = args.index(flag) + 1
+        return Path(args[i]) if i < len(args) and not args[i].startswith("-") else default_baseline()
+
+    select = args[args.index("-k") + 1] if "-k" in args else None
+    base = opt("--compare")
+    old = load(base) if base is not None else None          # before --save may overwrite it
+    res = run("--quick" in args, select, progress=lambda n, r: print(format_result(n, r), flush=True))
+    out = opt("--save")
+    if out is not None:
+        print(f"\nbaseline saved → {save(res, out)}")
+    if old is not None:
+        report = compare(old, res)
+        print(f"\ncompared with {base}:")
+        print("\n".join(report))
+        sys.exit(any(line.endswith("REGRESSION") for line in report))
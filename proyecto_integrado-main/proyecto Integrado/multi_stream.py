@@ -0,0 +1,151 @@
+"""
+multi_stream  – several input devices analysed side by side in one process
+• Each source is its own AudioSource (PortAudio device, file, synthetic)
+  + AudioAnalyzer; the source callback only copies the block into a queue.
+• All sources share one pool of analysis workers.  A source is drained by
+  at most one worker at a time, so its (stateful) DSP still sees blocks in
+  order, while different sources run in parallel.
+• If a source falls behind, its oldest queued blocks are dropped (counted
+  in stats()) instead of letting latency grow.
+• Every analyzer keeps its own FrameChannel; the manager republishes all of
+  them, tagged with "source", on a combined channel and offers view().
+• Analyzers record their stage timings keyed by source ("callback/<name>"):
+  the workers run in parallel, a shared histogram would have two writers.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from audio_analyzer import AudioAnalyzer
+from frames         import FrameChannel
+from sources        import AudioSource
+
+
+class _Source:
+    """One input: source, analyzer and the block queue between them."""
+
+    def __init__(self, name: str, analyzer: AudioAnalyzer, pool: ThreadPoolExecutor,
+                 max_backlog: int):
+        self.name, self.analyzer, self._pool = name, analyzer, pool
+        self._queue: deque = deque()
+        self._max_backlog = max_backlog
+        self._lock = threading.Lock()
+        self._scheduled = False
+        self.blocks = self.dropped = 0
+        self.busy_ns = 0
+        self.source = analyzer.source
+
+    # source thread: copy + enqueue only
+    def _on_block(self, indata, t_adc=None):
+        with self._lock:
+            if len(self._queue) >= self._max_backlog:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((indata.copy(), t_adc))
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self._pool.submit(self._drain)
+
+    # worker thread: everything queued for this source, in order
+    def _drain(self):
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._scheduled = False
+                    return
+                block, t_adc = self._queue.popleft()
+            t0 = time.perf_counter_ns()
+            try:
+                self.analyzer.process(block, t_adc)
+            except Exception as exc:            # keep the other sources alive
+                print(f"MultiStreamManager › {self.name}: analysis error:", exc)
+            self.busy_ns += time.perf_counter_ns() - t0
+            self.blocks += 1
+
+    @property
+    def backlog(self) -> int:
+        return len(self._queue)
+
+
+class MultiStreamManager:
+    """
+    add(name, device, **analyzer_kw) → AudioAnalyzer; start() / stop();
+    view() → {name: latest snapshot}; frames → combined FrameChannel.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_backlog: int = 8):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                        thread_name_prefix="orbis-dsp")
+        self._max_backlog = max_backlog
+        self._sources: Dict[str, _Source] = {}
+        self.frames = FrameChannel()
+        self.running = False
+
+    # -----------------------------------------------------------------------
+    def add(self, name: str, device: Optional[int | str] = None,
+            source: Optional[AudioSource] = None, **analyzer_kw) -> AudioAnalyzer:
+        """Open a device (or adopt `source`); PortAudioError propagates to the caller."""
+        if name in self._sources:
+            raise KeyError(f"source '{name}' already exists")
+        analyzer_kw.setdefault("timings_key", name)
+        analyzer = AudioAnalyzer(device=device, source=source, **analyzer_kw)
+        src = _Source(name, analyzer, self._pool, self._max_backlog)
+        analyzer.frames.add_listener(lambda fr, n=name: self.frames.publish({**fr, "source": n}))
+        self._sources[name] = src
+        if self.running:
+            src.source.start(src._on_block)
+        return analyzer
+
+    def remove(self, name: str) -> None:
+        src = self._sources.pop(name)
+        self._close(src)
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._sources)
+
+    def __getitem__(self, name: str) -> AudioAnalyzer:
+        return self._sources[name].analyzer
+
+    def __len__(self) -> int:
+        return len(self._sources)
+
+    # -----------------------------------------------------------------------
+    def start(self) -> None:
+        for src in self._sources.values():
+            src.source.start(src._on_block)
+        self.running = True
+
+    def stop(self) -> None:
+        """Close every source, let the workers finish what is queued (final)."""
+        for src in self._sources.values():
+            self._close(src)
+        self._sources.clear()
+        self._pool.shutdown(wait=True)
+        self.running = False
+
+    @staticmethod
+    def _close(src: _Source) -> None:
+        try:
+            src.source.stop()
+        except Exception as exc:
+            print(f"MultiStreamManager › error while stopping {src.name}:", exc)
+
+    # -----------------------------------------------------------------------
+    def view(self) -> Dict[str, Dict[str, Any]]:
+        """Latest snapshot of every source, keyed by name."""
+        return {n: s.analyzer.get_audio_data() for n, s in self._sources.items()}
+
+    def stats(self) -> Dict[str, dict]:
+        """Per-source block count, drops, queue depth and mean DSP time (ms)."""
+        return {n: dict(blocks=s.blocks, dropped=s.dropped, overflows=s.source.overflows,
+                        backlog=s.backlog,
+                        mean_ms=s.busy_ns / s.blocks / 1e6 if s.blocks else 0.0)
+                for n, s in self._sources.items()}
@@ -0,0 +1,161 @@
+"""
+multirate  – octave decimation pyramid for cheap high-resolution bass
+• Stage 0 runs at the capture rate, every further stage at half the rate of
+  the previous one (streaming half-band FIR, evaluated in polyphase form).
+• Every stage keeps its own n_fft history and runs the same small FFT, so
+  the effective window doubles per octave while the FFT size stays fixed.
+• Stage s only refreshes every 2^s hops → total cost ≈ 2 small FFTs per hop.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from octave_bands import BandLayout, OctaveBands, band_centers, band_edges
+
+PASSBAND = 0.4      # fraction of a stage's sample rate that is alias-free
+
+
+class HalfbandDecimator:
+    """
+    Streaming 2:1 decimator.  A half-band FIR has every other tap equal to
+    zero, so only the even phase (plus the centre tap) is evaluated – at the
+    output rate.  Filter state carries across blocks of any length.
+    """
+
+    def __init__(self, taps: int = 47, beta: float = 8.0):
+        if taps % 4 != 3:
+            raise ValueError(f"half-band length must be 4k+3, got {taps}")
+        n = np.arange(taps) - (taps - 1) // 2
+        h = 0.5 * np.sinc(n / 2) * np.kaiser(taps, beta)
+        h /= h.sum()                         # unity DC gain
+        self.taps   = taps
+        self._h     = h[0::2]                # non-zero polyphase branch
+        self._c     = h[(taps - 1) // 2]     # centre tap
+        self._tail  = np.zeros(taps - 1)
+        self._phase = 0                      # parity of the next input sample
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        x    = np.asarray(x, float)
+        lag  = self.taps - 1
+        buf  = np.concatenate((self._tail, x))
+        first = lag + (1 - self._phase)      # outputs land on odd sample indices
+        m    = max(0, (len(buf) - first + 1) // 2)
+        self._tail  = buf[-lag:]
+        self._phase = (self._phase + len(x)) % 2
+        if m == 0:
+            return np.zeros(0)
+        even = buf[first - lag::2]
+        y = np.convolve(even, self._h, "valid")[:m]
+        y += self._c * buf[first - lag // 2::2][:m]
+        return y
+
+
+class DecimationPyramid:
+    """
+    push(block) → feed capture-rate samples; levels() / spectrum() read back.
+    Each fractional-octave band is measured on the deepest stage whose
+    alias-free passband still contains the whole band.  Levels and both
+    spectra are reported on the scale of a ref_size-point FFT so switching
+    modes keeps the dB values comparable.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        n_fft: int = 2048,
+        n_stages: int = 6,
+        hop: int | None = None,
+        fraction: int = 3,
+        f_min: float = 20.0,
+        f_max: float = 20000.0,
+        ref_size: int | None = None,
+    ):
+        self.sample_rate = int(sample_rate)
+        self.n_fft    = int(n_fft)
+        self.n_stages = int(n_stages)
+        self.hop      = int(hop or n_fft // 2)
+        self.f_min, self.f_max = f_min, f_max
+        self.rates    = self.sample_rate / 2.0 ** np.arange(self.n_stages)
+        self.window   = np.hanning(self.n_fft)
+        self._scale   = (ref_size or self.n_fft) / self.n_fft
+        self._gain_db = 20 * np.log10(self._scale)
+
+        self._dec     = [HalfbandDecimator() for _ in range(self.n_stages - 1)]
+        self._ring    = np.zeros((self.n_stages, self.n_fft))
+        self._pending = np.zeros(self.n_stages, int)
+        self._mag     = np.zeros((self.n_stages, self.n_fft // 2 + 1))
+
+        # crossover for the combined spectrum: stage s owns [lo_s, hi_s)
+        hi = PASSBAND * self.rates
+        hi[0] = self.sample_rate / 2 + 1
+        lo = np.r_[hi[1:], 0.0]
+        self._own = []
+        for s in range(self.n_stages):
+            df = self.rates[s] / self.n_fft
+            k0 = int(np.ceil(lo[s] / df)); k1 = min(int(np.ceil(hi[s] / df)), self.n_fft // 2 + 1)
+            self._own.append(slice(k0, k1))
+        self.set_fraction(fraction)
+
+    # -----------------------------------------------------------------------
+    def set_fraction(self, fraction: int) -> None:
+        """(Re)assign every band of the new resolution to its stage."""
+        fc = band_centers(fraction, self.f_min, min(self.f_max, self.sample_rate / 2))
+        lo, hi = band_edges(fraction, fc)
+        hi = np.minimum(hi, self.sample_rate / 2)
+        # deepest stage whose clean passband contains the band's upper edge
+        fits  = hi[:, None] <= PASSBAND * self.rates[None, 1:]
+        stage = np.where(fits.any(1), self.n_stages - 1 - np.argmax(fits[:, ::-1], 1), 0)
+        self._engines, self._slices = [], []
+        for s in range(self.n_stages):
+            sel = np.flatnonzero(stage == s)
+            eng = OctaveBands(self.rates[s], self.n_fft, fraction,
+                              window=self.window, centers=fc[sel]) if len(sel) else None
+            self._engines.append(eng)
+            self._slices.append(slice(sel[0], sel[-1] + 1) if len(sel) else slice(0, 0))
+        self.layout  = BandLayout(fc, lo, hi, fraction)
+        self._levels = np.full(len(fc), -200.0)
+        self.fraction = int(fraction)
+
+    def push(self, x: np.ndarray) -> int:
+        """Feed one block at the capture rate; returns how many stages refreshed."""
+        y, refreshed = np.asarray(x, float), 0
+        for s in range(self.n_stages):
+            if s:
+                y = self._dec[s - 1].process(y)
+            n = len(y)
+            if n == 0:
+                continue
+            ring = self._ring[s]
+            if n >= self.n_fft:
+                ring[:] = y[-self.n_fft:]
+            else:
+                ring[:-n] = ring[n:]
+                ring[-n:] = y
+            self._pending[s] += n
+            if self._pending[s] >= self.hop:      # stage s: every 2^s hops
+                self._pending[s] = 0
+                self._mag[s] = np.abs(np.fft.rfft(ring * self.window))
+                if self._engines[s] is not None:
+                    self._levels[self._slices[s]] = (self._engines[s].levels(self._mag[s])
+                                                     + self._gain_db)
+                refreshed += 1
+        return refreshed
+
+    # -----------------------------------------------------------------------
+    def levels(self) -> np.ndarray:
+        """Band levels in dB, ordered like layout.centers."""
+        return self._levels.copy()
+
+    def stage_spectrum(self, s: int = 0) -> np.ndarray:
+        """Uniform rFFT magnitude of one stage (stage 0 = full band)."""
+        return self._mag[s] * self._scale
+
+    def spectrum(self) -> tuple[np.ndarray, np.ndarray]:
+        """Non-uniform (freqs, magnitude) stitched from all stages, low → high."""
+        freqs, mags = [], []
+        for s in reversed(range(self.n_stages)):
+            own = self._own[s]
+            k = np.arange(own.start, own.stop)
+            freqs.append(k * self.rates[s] / self.n_fft)
+            mags.append(self._mag[s][own])
+        return np.concatenate(freqs), np.concatenate(mags) * self._scale
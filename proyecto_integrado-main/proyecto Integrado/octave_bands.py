@@ -0,0 +1,169 @@
+"""
+octave_bands  – ISO 266 / IEC 61260 fractional-octave band engine
+• Base-10 band centres for 1/1, 1/3, 1/6 and 1/24 octave resolution.
+• The bin→band mapping is precomputed once as a sparse weight table, so
+  every frame costs a single gather + segmented sum over the spectrum.
+• Bins that straddle a band edge are split proportionally, which keeps the
+  bass bands meaningful even when they are narrower than one FFT bin.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# fractions supported by the UI / exporters  (1/N octave)
+FRACTIONS = (1, 3, 6, 24)
+
+# ISO 266 R10 preferred numbers – used to print nominal centre labels
+_R10 = np.array([1.0, 1.25, 1.6, 2.0, 2.5, 3.15, 4.0, 5.0, 6.3, 8.0, 10.0])
+_G   = 10 ** (3 / 10)                    # octave ratio, base-10 system
+
+
+def band_centers(fraction: int = 3,
+                 f_min: float = 20.0,
+                 f_max: float = 20000.0) -> np.ndarray:
+    """Exact mid-band frequencies (IEC 61260-1) that fall in f_min…f_max."""
+    b = int(fraction)
+    if b < 1:
+        raise ValueError(f"fraction must be >= 1, got {fraction}")
+    # x range large enough to cover 1 Hz … 100 kHz
+    x = np.arange(-40 * b, 20 * b + 1)
+    if b % 2:                            # odd  → fm = 1000·G^(x/b)
+        fc = 1000.0 * _G ** (x / b)
+    else:                                # even → fm = 1000·G^((2x+1)/2b)
+        fc = 1000.0 * _G ** ((2 * x + 1) / (2 * b))
+    # keep the band if its centre is within range (half-band tolerance)
+    tol = _G ** (1 / (2 * b))
+    return fc[(fc >= f_min / tol) & (fc <= f_max * tol)]
+
+
+def nominal(fc: float) -> float:
+    """Round an exact centre to its nominal (printed) value."""
+    decade = 10 ** np.floor(np.log10(fc))
+    mant   = fc / decade
+    r10    = _R10[np.argmin(np.abs(_R10 - mant))]
+    if abs(r10 - mant) / mant < 0.015:   # 1/1 and 1/3 land on R10
+        return float(r10 * decade)
+    return float(f"{fc:.3g}")
+
+
+def band_label(fc: float) -> str:
+    """'20Hz', '31.5Hz', '1000Hz' … – same key style as the JSON export."""
+    return f"{nominal(fc):g}Hz"
+
+
+class BandLayout:
+    """
+    Band centres/edges plus the read-side queries used by the UI and exporters.
+    Shared by OctaveBands and the multirate pyramid (multirate.py).
+    """
+
+    def __init__(self, centers, lower, upper, fraction: int):
+        self.centers  = np.asarray(centers, float)
+        self.lower    = np.asarray(lower, float)
+        self.upper    = np.asarray(upper, float)
+        self.fraction = int(fraction)
+        self.labels   = [band_label(f) for f in self.centers]
+
+    def __len__(self) -> int:
+        return len(self.centers)
+
+    def level_at(self, levels: np.ndarray, freqs, floor: float = -60.0) -> np.ndarray:
+        """Level of the band that contains each frequency (floor outside)."""
+        freqs = np.atleast_1d(np.asarray(freqs, float))
+        idx = np.searchsorted(self.upper, freqs, side="right")
+        inside = (idx < len(self.centers))
+        idx = np.minimum(idx, len(self.centers) - 1)
+        inside &= freqs >= self.lower[idx]
+        return np.where(inside, np.asarray(levels)[..., idx], floor)
+
+    def range_peak(self, levels: np.ndarray, lo: float, hi: float,
+                   floor: float = -60.0) -> float:
+        """Loudest band whose centre lies in [lo, hi)."""
+        sel = (self.centers >= lo) & (self.centers < hi)
+        return float(np.max(levels[sel])) if sel.any() else floor
+
+    def range_level(self, levels: np.ndarray, lo: float, hi: float,
+                    floor: float = -60.0) -> float:
+        """Energy sum of the bands whose centre lies in [lo, hi), in dB."""
+        sel = (self.centers >= lo) & (self.centers < hi)
+        if not sel.any():
+            return floor
+        return float(10 * np.log10(np.sum(10 ** (levels[sel] / 10)) + 1e-20))
+
+
+def band_edges(fraction: int, centers: np.ndarray):
+    """Lower / upper band-edge frequencies for the given centres."""
+    half = _G ** (1 / (2 * int(fraction)))
+    return centers / half, centers * half
+
+
+class OctaveBands(BandLayout):
+    """
+    Precomputed fractional-octave filterbank over an rFFT magnitude spectrum.
+    levels(mag) → dB per band, same scale as 20·log10(|X|) of the legacy
+    single-bin export (the window ENBW is divided out so a pure tone reads
+    the same as its peak bin).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        n_fft: int,
+        fraction: int = 3,
+        f_min: float = 20.0,
+        f_max: float = 20000.0,
+        window: np.ndarray | None = None,
+        centers: np.ndarray | None = None,
+    ):
+        self.sample_rate = int(sample_rate)
+        self.n_fft       = int(n_fft)
+        self.n_bins      = self.n_fft // 2 + 1
+        df = self.sample_rate / self.n_fft
+
+        # explicit centres let the multirate pyramid hand each stage its share
+        nyq = self.sample_rate / 2
+        fc  = band_centers(fraction, f_min, min(f_max, nyq)) if centers is None \
+            else np.asarray(centers, float)
+        lo, hi = band_edges(fraction, fc)
+        hi = np.minimum(hi, nyq)
+        fc, lo, hi = fc[lo < hi], lo[lo < hi], hi[lo < hi]
+        super().__init__(fc, lo, hi, fraction)
+
+        # ── sparse weights: overlap of each bin interval with each band ──
+        rows, cols, wts = [], [], []
+        for b, (a, z) in enumerate(zip(lo, hi)):
+            k0 = max(int(np.floor(a / df + 0.5)), 0)
+            k1 = min(int(np.ceil(z / df - 0.5)), self.n_bins - 1)
+            k  = np.arange(k0, max(k0, k1) + 1)
+            b_lo = np.maximum((k - 0.5) * df, 0.0)
+            b_hi = (k + 0.5) * df
+            ov = np.clip((np.minimum(z, b_hi) - np.maximum(a, b_lo)) / df, 1e-9, None)
+            rows.append(np.full(len(k), b)); cols.append(k); wts.append(ov)
+
+        self._cols   = np.concatenate(cols).astype(np.intp)
+        self._w      = np.concatenate(wts)
+        rows         = np.concatenate(rows)
+        self._starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+
+        if window is None:
+            window = np.hanning(self.n_fft)
+        self._enbw = float(len(window) * np.sum(window ** 2) / np.sum(window) ** 2)
+
+    def matches(self, sample_rate: int, n_fft: int, fraction: int) -> bool:
+        return (self.sample_rate, self.n_fft, self.fraction) == (
+            int(sample_rate), int(n_fft), int(fraction))
+
+    # -----------------------------------------------------------------------
+    def band_sum(self, p: np.ndarray) -> np.ndarray:
+        """Overlap-weighted per-band sum of any per-bin power-like quantity
+        (|X|², Re{X·Y*} …); p may be (..., n_bins) for batched input."""
+        p = np.asarray(p)
+        return np.add.reduceat(p[..., self._cols] * self._w, self._starts, axis=-1) / self._enbw
+
+    def power(self, mag: np.ndarray) -> np.ndarray:
+        """Linear band power; mag may be (..., n_bins) for batched input."""
+        return self.band_sum(np.asarray(mag) ** 2)
+
+    def levels(self, mag: np.ndarray) -> np.ndarray:
+        """Band levels in dB (floor −200 dB)."""
+        return 10 * np.log10(np.maximum(self.power(mag), 1e-20))
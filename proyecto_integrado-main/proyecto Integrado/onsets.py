@@ -0,0 +1,230 @@
+"""
+onsets  – streaming onset detection and beat / tempo tracking
+• OnsetDetector: spectral flux (from the feature registry, same FFT frame)
+  against an adaptive threshold (ratio · median + delta · MAD); fires on the rising edge, so
+  there is no look-ahead latency.  The hit is then located to the sample
+  inside the block from its short-term energy envelope.
+• BeatTracker: autocorrelation of an onset-strength grid (10 ms cells, from
+  the sample-accurate onset times, so tempo resolution does not depend on
+  the block size) → tempo; beat phase is re-anchored on onsets that land
+  near a predicted beat and re-estimated (circular mean of onset phases)
+  with every tempo update.
+• Both have reset(): the analyzer calls it when its silence gate closes,
+  so a new piece after the pause starts from a clean tempo and phase.
+Events are plain dicts: {"sample": n, "t": seconds since start, "strength": x}.
+"""
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+
+
+class OnsetDetector:
+    """process(flux, block, start_sample) → list of onset events (0 or 1)."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        history: int = 43,           # flux frames in the adaptive threshold
+        ratio: float = 1.2,          # × median of recent flux
+        delta: float = 2.0,          # + MADs
+        floor: float = 0.01,         # absolute minimum flux
+        min_gap_s: float = 0.08,     # refractory period
+        env_win: int = 64,           # envelope resolution for sample refinement
+        warmup: int = 4,             # frames before the threshold is trusted
+    ):
+        self.sample_rate = int(sample_rate)
+        self.ratio, self.delta, self.floor = ratio, delta, floor
+        self.min_gap = int(min_gap_s * self.sample_rate)
+        self.env_win = env_win
+        self.warmup = warmup
+        self._hist = deque(maxlen=history)
+        self.reset()
+
+    def reset(self, history: bool = True) -> None:
+        """Forget the stream so far; history=False keeps the adaptive threshold (gap in the blocks only)."""
+        if history:
+            self._hist.clear()
+            self._last = -10 ** 12
+        self._prev = np.zeros(0)     # previous block: FFT windows may span two
+        self._above = False
+
+    def _locate(self, block: np.ndarray) -> int:
+        """Offset of the transient inside the block (sample resolution)."""
+        w = self.env_win
+        n = len(block) // w
+        if n < 2:
+            return 0
+        env = np.sqrt(np.mean(block[:n * w].reshape(n, w) ** 2, axis=1))
+        seg = int(np.argmax(np.diff(env))) + 1       # segment with largest rise
+        lo, hi = max(seg - 1, 0) * w, min((seg + 1) * w, len(block))
+        mag = np.abs(block[lo:hi])
+        first = np.flatnonzero(mag >= 0.5 * mag.max()) if mag.max() > 0 else [0]
+        return lo + int(first[0])
+
+    def process(self, flux: float, block: np.ndarray, start: int) -> list[dict]:
+        hist = self._hist
+        med = float(np.median(hist)) if hist else 0.0
+        mad = float(np.median(np.abs(np.asarray(hist) - med))) if hist else 0.0
+        thr = max(self.ratio * med + self.delta * mad, self.floor)
+        hist.append(flux)
+
+        block = np.asarray(block, float)
+        prev, self._prev = self._prev, block
+        above = flux > thr
+        fire = above and not self._above and len(hist) > self.warmup
+        self._above = above
+        if not fire:
+            return []
+        sample = start - len(prev) + self._locate(np.concatenate((prev, block)))
+        if sample - self._last < self.min_gap:
+            return []
+        self._last = sample
+        return [{"sample": sample, "t": sample / self.sample_rate,
+                 "strength": float(flux / (thr + 1e-12))}]
+
+
+class BeatTracker:
+    """process(start_sample, n, onsets) → beat events inside this block."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        bpm_range: tuple[float, float] = (60.0, 200.0),
+        window_s: float = 8.0,
+        update_s: float = 1.0,
+        grid_s: float = 0.01,
+    ):
+        self.sample_rate = int(sample_rate)
+        self.bpm_range = bpm_range
+        self.window = int(window_s * self.sample_rate)
+        self.update = int(update_s * self.sample_rate)
+        self.cell = int(grid_s * self.sample_rate)
+        self._onsets: deque = deque()          # (sample, strength)
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop onset history, tempo and phase."""
+        self._onsets.clear()
+        self._last_update = 0
+        self.bpm = 0.0
+        self.confidence = 0.0
+        self._next = None            # predicted sample of the next beat
+
+    @property
+    def period(self) -> float:
+        return 60.0 * self.sample_rate / self.bpm if self.bpm else 0.0
+
+    def _estimate(self, now: int) -> None:
+        n = self.window // self.cell
+        grid = np.zeros(n)
+        idx = np.fromiter(((now - s) // self.cell for s, _ in self._onsets), int)
+        np.add.at(grid, np.clip(n - 1 - idx, 0, n - 1),
+                  np.fromiter((w for _, w in self._onsets), float))
+        grid = np.convolve(grid, (0.25, 0.5, 1.0, 0.5, 0.25), "same")   # ±20 ms tolerance
+        spec = np.fft.rfft(grid - grid.mean(), 2 * n)
+        acf = np.fft.irfft(spec * np.conj(spec))[:n]
+        if acf[0] <= 0:
+            return
+        cell_s = self.cell / self.sample_rate
+        lags = np.arange(int(60.0 / self.bpm_range[1] / cell_s),
+                         int(60.0 / self.bpm_range[0] / cell_s) + 1)
+        lags = lags[(lags > 1) & (lags < n - 1)]
+        if not len(lags):
+            return
+        bpm_l = 60.0 / (lags * cell_s)
+        prior = np.exp(-0.5 * (np.log2(bpm_l / 120.0) / 0.9) ** 2)   # mild 120 BPM pull
+        k = int(lags[np.argmax(acf[lags] * prior)])
+        a, b, g = acf[k - 1], acf[k], acf[k + 1]
+        den = a - 2 * b + g
+        lag = k + (float(np.clip(0.5 * (a - g) / den, -0.5, 0.5)) if den != 0 else 0.0)
+        self.bpm = 60.0 / (lag * cell_s)
+        self.confidence = float(max(0.0, b / acf[0]))
+        self._estimate_phase(now)
+
+    def _estimate_phase(self, now: int) -> None:
+        """Align the beat grid with the weighted circular mean of onset phases."""
+        period = self.period
+        s = np.fromiter((s for s, _ in self._onsets), float)
+        w = np.fromiter((w for _, w in self._onsets), float)
+        z = np.sum(w * np.exp(2j * np.pi * (s % period) / period))
+        if abs(z) < 0.3 * w.sum():
+            return                               # onsets do not agree on a phase
+        ref = (np.angle(z) % (2 * np.pi)) / (2 * np.pi) * period
+        self._next = float(ref + period * np.ceil((now - ref) / period))
+
+    def process(self, start: int, n: int, onsets: list[dict]) -> list[dict]:
+        end = start + n
+        self._onsets.extend((o["sample"], o["strength"]) for o in onsets)
+        while self._onsets and self._onsets[0][0] < end - self.window:
+            self._onsets.popleft()
+
+        beats = []
+        period = self.period
+        if period:
+            beats = self._track(start, end, period, onsets)
+        # tempo / phase refresh applies from the next block on
+        if end - self._last_update >= self.update and len(self._onsets) > 3:
+            self._last_update = end
+            self._estimate(end)
+        return beats
+
+    def _track(self, start: int, end: int, period: float, onsets: list[dict]) -> list[dict]:
+        # re-anchor phase on an onset near the last / next predicted beat
+        for o in onsets:
+            s = o["sample"]
+            if self._next is None:
+                self._next = s
+            elif abs(s - (self._next - period)) < 0.2 * period:
+                self._next = s + period          # that beat was already emitted
+            elif abs(s - self._next) < 0.2 * period:
+                self._next = s
+        beats = []
+        while self._next is not None and self._next < end:
+            if self._next >= start:
+                beats.append({"sample": int(self._next), "t": self._next / self.sample_rate,
+                              "bpm": self.bpm})
+            self._next += period
+        return beats
+
+
+if __name__ == "__main__":
+    # regression check: 120 BPM clicks, silence until the analyzer's gate
+    # closes, then 90 BPM – nothing after the pause may still report 120
+    import sys
+
+    from audio_analyzer import AudioAnalyzer
+    from sources import SyntheticSource
+
+    n = 1024
+    a = AudioAnalyzer(source=SyntheticSource("clicks", realtime=False, blocksize=n))
+    sr = a.sample_rate
+
+    def play(src, seconds):
+        out = []
+        for block, _ in zip(src._blocks(n), range(int(seconds * sr / n))):
+            a.process(block)
+            out.append(a.get_audio_data())
+        return out
+
+    before = play(SyntheticSource("clicks", bpm=120, level_db=-12, realtime=False), 12)
+    quiet = play(SyntheticSource("sine", level_db=-120, realtime=False), 4)
+    after = play(SyntheticSource("clicks", bpm=90, level_db=-12, realtime=False), 10)
+    beats = [b["t"] for fr in after for b in fr["beats"]]
+    gaps = np.diff(beats)
+    failures = []
+    if abs(before[-1]["bpm"] / 120 - 1) > 0.03:
+        failures.append(f"no 120 BPM lock before the pause ({before[-1]['bpm']:.1f})")
+    if not quiet[-1]["silent"]:
+        failures.append("the gate did not close")
+    stale = [fr["bpm"] for fr in after if fr["bpm"] and abs(fr["bpm"] / 90 - 1) > 0.03]
+    if stale:
+        failures.append(f"{len(stale)} frames after the pause report {stale[0]:.1f} BPM")
+    if len(gaps) and np.any(np.abs(gaps / (60 / 90) - 1) > 0.1):
+        failures.append(f"beat gaps {np.round(gaps, 3).tolist()} off the 90 BPM grid")
+    if abs(after[-1]["bpm"] / 90 - 1) > 0.03:
+        failures.append(f"no 90 BPM lock after the pause ({after[-1]['bpm']:.1f})")
+    print(f"before {before[-1]['bpm']:.1f} BPM · after {after[-1]['bpm']:.1f} BPM · {len(beats)} beats after the pause")
+    print("ok" if not failures else "\n".join(failures))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,340 @@
+"""
+orbis_daemon  – headless analysis: AudioAnalyzer + exporters, no Qt
+• `python orbis_daemon.py [config.json] [--check]` runs until SIGTERM /
+  SIGINT.  PySide6 and pyqtgraph are never imported, so a render node or a
+  Blender workstation gets the frames the cockpit would publish without the
+  GUI's memory and start-up cost.  --check prints the merged config and exits.
+• Inputs run on a MultiStreamManager; frames leave through
+      json     json_bridge.JsonBridge → orbis_data.json (what the add-on polls)
+      udp      one frame_codec packet per frame of "main" (realtime_receiver)
+               – json and udp go quiet after the first silent frame
+      metrics  metrics.MetricsServer, Prometheus text on 127.0.0.1
+      record   recorder.SessionRecorder on "main", one session per start
+• Config (JSON, every key optional; missing ones come from DEFAULTS):
+      {"inputs":  {"main": {"device": null}, "drums": {"device": 3, "channels": 2}},
+       "analyzer": {"band_fraction": 3, "multirate": true},     # + hop, n_fft, f_max, gain_db …
+       "json":    {"path": "json/orbis_data.json", "interval": 0.1},
+       "udp":     {"host": "127.0.0.1", "port": 65432},
+       "metrics": {"port": 9464},
+       "record":  {"root": "captures", "audio_format": "wav"}}
+  An input is {"device": …} (PortAudio), {"file": …, "loop": true} or
+  {"synthetic": "mix"}; "main" is the one exported.  A section set to null
+  is off.  Relative paths are relative to the config file.
+• Signals: SIGTERM / SIGINT stop cleanly; SIGHUP re-reads the config and
+  restarts the pipeline (a file that does not parse is ignored, inputs that
+  fail to open fall back to the previous config) – unless only PLAN_KEYS of
+  "analyzer" changed: those go to AudioAnalyzer.set_plan() and the inputs
+  keep running without a gap; SIGUSR1 (Ctrl+Break on
+  Windows) writes a diagnostics capture – sampled profile, allocations and
+  the stage timings – under diagnostics.root.
+"""
+from __future__ import annotations
+
+import copy
+import json
+import signal
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import json_bridge
+from diagnostics import Diagnostics, install_signal
+from frame_codec import FrameEncoder, frame_fields
+from instrumentation import HOT_PATH
+from metrics import MetricsServer
+from multi_stream import MultiStreamManager
+from recorder import SessionRecorder
+from sources import FileSource, SyntheticSource
+
+VERSION = "v0.9‑beta"                          # orbis_ui.VERSION (that module needs Qt)
+# analyzer keys a reload applies live; a key left out goes back to its AudioAnalyzer default
+PLAN_DEFAULTS: Dict[str, Any] = {"f_min": 20.0, "f_max": 20000.0, "gain_db": 0.0, "band_fraction": 3}
+PLAN_KEYS = ("n_fft", *PLAN_DEFAULTS)
+BASE_DIR = Path(__file__).resolve().parent
+DIAG_SECONDS = 30
+DEFAULTS: Dict[str, Any] = {
+    "inputs":   {"main": {"device": None}},
+    "analyzer": {"band_fraction": 3, "multirate": False},
+    "json":     {"path": str(BASE_DIR / "json" / "orbis_data.json"), "interval": 0.1},
+    "udp":      None,
+    "metrics":  None,
+    "record":   None,
+    "diagnostics": {"root": str(BASE_DIR / "captures"), "seconds": DIAG_SECONDS},
+    "log_interval": 10.0,                       # status line (frames/s, stage p99s); 0 = quiet
+}
+SECTION_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "json":    {"path": DEFAULTS["json"]["path"], "interval": 0.1},
+    "udp":     {"host": "127.0.0.1", "port": 65432, "compress": "zlib", "key_interval": 60},
+    "metrics": {"host": "127.0.0.1", "port": 9464},
+    "record":  {"root": str(BASE_DIR / "captures"), "audio_format": "wav",
+                "spectrum": True, "compact": False},
+}
+
+
+def log(msg: str) -> None:
+    print(f"[orbis-daemon {time.strftime('%H:%M:%S')}] {msg}", flush=True)
+
+
+def load_config(path: Optional[str | Path]) -> Dict[str, Any]:
+    """DEFAULTS overlaid with the file; sections given as {} / true get their own defaults."""
+    cfg = copy.deepcopy(DEFAULTS)
+    if path is None:
+        return cfg
+    path = Path(path).resolve()
+    user = json.loads(path.read_text(encoding="utf-8"))
+    unknown = set(user) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"unknown config keys: {sorted(unknown)}")
+    for key, val in user.items():
+        if key in SECTION_DEFAULTS and val is not None and val is not False:
+            val = {**SECTION_DEFAULTS[key], **(val if isinstance(val, dict) else {})}
+        elif isinstance(DEFAULTS[key], dict) and isinstance(val, dict) and key != "inputs":
+            val = {**DEFAULTS[key], **val}
+        cfg[key] = None if val is False else val
+    if "main" not in cfg["inputs"]:
+        raise ValueError("inputs must contain 'main'")
+    # relative paths follow the config file, not the working directory
+    for sec, key in (("json", "path"), ("record", "root"), ("diagnostics", "root")):
+        if cfg.get(sec) and not Path(cfg[sec][key]).is_absolute():
+            cfg[sec][key] = str(path.parent / cfg[sec][key])
+    for inp in cfg["inputs"].values():
+        if "file" in inp and not Path(inp["file"]).is_absolute():
+            inp["file"] = str(path.parent / inp["file"])
+    return cfg
+
+
+def _plan_change(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """set_plan() kwargs if `new` differs from `old` only in analyzer PLAN_KEYS, else None."""
+    a, b = old["analyzer"], new["analyzer"]
+    rest = lambda d: {k: v for k, v in d.items() if k not in PLAN_KEYS}
+    if {**old, "analyzer": None} != {**new, "analyzer": None} or rest(a) != rest(b):
+        return None
+    if "n_fft" in a and "n_fft" not in b:        # its default depends on hop / source: reopen
+        return None
+    return {**PLAN_DEFAULTS, **{k: b[k] for k in PLAN_KEYS if k in b}}
+
+
+def _source(spec: Dict[str, Any]):
+    """Input spec → (device, source) for MultiStreamManager.add."""
+    if "file" in spec:
+        return None, FileSource(spec["file"], loop=spec.get("loop", True), channels=spec.get("channels"))
+    if "synthetic" in spec:
+        return None, SyntheticSource(spec["synthetic"], channels=spec.get("channels", 1))
+    return spec.get("device"), None
+
+
+class _Pipeline:
+    """Everything one config starts: inputs, exporters, recorder."""
+
+    def __init__(self, cfg: Dict[str, Any]):
+        self.cfg = cfg
+        self.streams = MultiStreamManager()
+        self.bridge: Optional[json_bridge.JsonBridge] = None
+        self.recorder: Optional[SessionRecorder] = None
+        self._sock: Optional[socket.socket] = None
+        self._sub = None
+        self._silent = False
+        try:
+            for name, spec in cfg["inputs"].items():
+                device, source = _source(spec)
+                kw = dict(cfg["analyzer"])
+                if source is None:
+                    kw["channels"] = spec.get("channels", 1)
+                self.streams.add(name, device=device, source=source, **kw)
+        except Exception:
+            self.streams.stop()
+            raise
+        self.main = self.streams["main"]             # stop() empties the manager
+
+    def start(self) -> None:
+        cfg, main = self.cfg, self.main
+        if cfg["json"]:
+            self.bridge = json_bridge.JsonBridge(
+                main, cfg["json"]["path"], cfg["json"]["interval"], VERSION,
+                sources=lambda: json_bridge.source_fields(self.streams.view()) if len(self.streams) > 1 else None)
+            self.bridge.start()
+        if cfg["udp"]:
+            udp = cfg["udp"]
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._encoder = FrameEncoder(udp["compress"], key_interval=udp["key_interval"])
+            self._addr = (udp["host"], udp["port"])
+            self._sub = main.subscribe(json_bridge.FEATURES)      # same fields the JSON carries
+            main.frames.add_listener(self._send)
+        if cfg["record"]:
+            rec = cfg["record"]
+            self.recorder = SessionRecorder(rec["root"], audio_format=rec["audio_format"],
+                                            spectrum=rec["spectrum"], compact=rec["compact"])
+            log(f"recording → {self.recorder.start(main)}")
+        self.streams.start()
+
+    def _send(self, frame: dict) -> None:
+        # analyzer thread: one non-blocking sendto per frame, as realtime_sender.py
+        now = json_bridge.silent([frame], self._silent)
+        if now is None:
+            return
+        self._silent = now
+        self._sock.sendto(self._encoder.encode(frame_fields(frame), frame["seq"]), self._addr)
+
+    def stop(self) -> None:
+        if self.recorder is not None:
+            st = self.recorder.stop()
+            log(f"recording closed: {st['rows']} rows, {st['dropped_frames']} frames dropped")
+        self.streams.stop()
+        if self.bridge is not None:
+            self.bridge.stop()
+        if self._sock is not None:
+            self.main.frames.remove_listener(self._send)
+            self._sub.unsubscribe()
+            self._sock.close()
+
+
+class Daemon:
+    """run() blocks; signals only set flags, the main loop acts on them."""
+
+    def __init__(self, config_path: Optional[str | Path] = None):
+        self.config_path = config_path
+        self.cfg = load_config(config_path)
+        self.pipeline: Optional[_Pipeline] = None
+        self.metrics: Optional[MetricsServer] = None
+        self._metrics_cfg: Optional[dict] = None
+        diag = self.cfg["diagnostics"] or DEFAULTS["diagnostics"]
+        self.diag = Diagnostics(diag["root"], on_done=self._diag_done)
+        self._wake = threading.Event()
+        self._stop = self._reload = False
+        self._rate = (time.monotonic(), 0)
+
+    # ── signal side: flag + wake, nothing else ─────────────────────────────
+    def _on_stop(self, *_):
+        self._stop = True
+        self._wake.set()
+
+    def _on_reload(self, *_):
+        self._reload = True
+        self._wake.set()
+
+    def install_signals(self) -> None:
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_reload)
+        sig = install_signal(self._diagnose)
+        if sig:
+            log(f"{sig} → diagnostics capture")
+
+    # ── lifecycle ──────────────────────────────────────────────────────────
+    def start(self) -> None:
+        self.pipeline = _Pipeline(self.cfg)
+        self.pipeline.start()
+        self._rate = (time.monotonic(), self.pipeline.main.frames.seq)
+        self._start_metrics()
+        log(f"analysing {', '.join(self.pipeline.streams.names)}"
+            + (f" → {self.cfg['json']['path']}" if self.cfg["json"] else "")
+            + (f" → udp {self.cfg['udp']['host']}:{self.cfg['udp']['port']}" if self.cfg["udp"] else ""))
+
+    def _start_metrics(self) -> None:
+        m = self.cfg["metrics"]
+        if self.metrics is not None and m != self._metrics_cfg:
+            self.metrics.stop()
+            self.metrics = None
+        self._metrics_cfg = m
+        if m and self.metrics is None:
+            # providers go through self.pipeline, so they survive a reload
+            self.metrics = MetricsServer(
+                lambda: {n: self.pipeline.streams[n] for n in self.pipeline.streams.names} if self.pipeline else {},
+                stats=lambda: self.pipeline.streams.stats() if self.pipeline else {},
+                host=m["host"], port=m["port"])
+            log(f"metrics on http://{m['host']}:{self.metrics.start()}/metrics")
+
+    def stop(self) -> None:
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            self.pipeline = None
+        if self.metrics is not None:
+            self.metrics.stop()
+            self.metrics = None
+
+    def reload(self) -> None:
+        """Re-read the config; a broken one is reported and the running pipeline kept."""
+        try:
+            cfg = load_config(self.config_path)
+        except (OSError, ValueError) as exc:
+            log(f"reload ignored, bad config: {exc}")
+            return
+        plan = _plan_change(self.pipeline.cfg, cfg) if self.pipeline is not None else None
+        if plan is not None:
+            try:
+                for name in self.pipeline.streams.names:
+                    self.pipeline.streams[name].set_plan(**plan)
+            except ValueError as exc:
+                log(f"reload ignored, bad analysis plan: {exc}")
+                return
+            self.cfg = self.pipeline.cfg = cfg
+            log(f"analysis plan updated live: {plan}")
+            return
+        old, self.cfg = self.pipeline, cfg
+        if old is not None:
+            old.stop()
+        self.pipeline = None
+        try:
+            self.start()
+        except Exception as exc:
+            log(f"reload failed ({exc}); restarting the previous config")
+            self.cfg = old.cfg if old is not None else copy.deepcopy(DEFAULTS)
+            self.start()
+        else:
+            log("config reloaded")
+
+    def run(self) -> int:
+        self.install_signals()
+        self.start()
+        every = self.cfg["log_interval"]
+        try:
+            while not self._stop:
+                self._wake.wait(every or None)
+                self._wake.clear()
+                if self._reload:
+                    self._reload = False
+                    self.reload()
+                    every = self.cfg["log_interval"]
+                elif every and not self._stop:
+                    self._status()
+        finally:
+            self.stop()
+            log("stopped")
+        return 0
+
+    # ── reporting ──────────────────────────────────────────────────────────
+    def _status(self) -> None:
+        t0, seq0 = self._rate
+        now, seq = time.monotonic(), self.pipeline.main.frames.seq
+        self._rate = (now, seq)
+        fps = (seq - seq0) / (now - t0) if now > t0 else 0.0
+        dropped = sum(st["dropped"] for st in self.pipeline.streams.stats().values())
+        log(f"{fps:.1f} frames/s · {dropped} dropped · {HOT_PATH.summary() or 'no timings yet'}")
+
+    def _diagnose(self) -> None:
+        secs = (self.cfg["diagnostics"] or DEFAULTS["diagnostics"])["seconds"]
+        if self.diag.start(secs):
+            log(f"diagnostics: profiling {secs} s …")
+
+    def _diag_done(self, res: dict) -> None:
+        if "error" in res:
+            log(f"diagnostics failed: {res['error']}")
+            return
+        HOT_PATH.dump(Path(res["path"]) / "timings.json")
+        log(f"diagnostics: {res['samples']} samples → {res['path']}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    try:
+        daemon = Daemon(args[0] if args else None)
+    except (OSError, ValueError) as exc:
+        sys.exit(f"orbis-daemon: bad config: {exc}")
+    if "--check" in sys.argv:
+        print(json.dumps(daemon.cfg, indent=2))
+        sys.exit(0)
+    sys.exit(daemon.run())
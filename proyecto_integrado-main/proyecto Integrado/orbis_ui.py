@@ -96,15 +96,25 @@
         Public-domain / CC0. El proyecto entero permanece abierto para futuras colaboraciones académicas y profesionales.
     '''
 
-import sys, time, math, json, warnings, ctypes
+import os, sys, time, math, json, warnings, ctypes, threading
+T_START = time.perf_counter()     # arranque: todo lo que sigue cuenta en el desglose de Settings › Startup
 from pathlib import Path
 from collections import deque
 from types import SimpleNamespace
 
-# External helpers
-from visualizers.launch_baryon import launch as launch_baryon
-from audio_analyzer           import AudioAnalyzer
-from mesh_utils               import load_obj, create_icosphere
+# External helpers (Baryon, psutil, sounddevice y OpenGL se importan al usarlos: no retrasan la ventana)
+from audio_analyzer           import AudioAnalyzer, FFT_SIZES
+from multi_stream             import MultiStreamManager
+from recorder                 import SessionRecorder
+from session_replay           import SessionReader, SessionPlayer
+from timeseries               import TimeSeriesStore
+from timeline_export          import TimelineExporter
+from instrumentation          import HOT_PATH
+from diagnostics              import Diagnostics, install_signal, import_times, import_table
+from metrics                  import MetricsServer, DEFAULT_PORT as METRICS_PORT
+from device_manager           import DeviceManager
+import json_bridge
+from octave_bands             import FRACTIONS
 
 # ───── Qt / PySide6 ─────────────────────────────────────────────────────────
 from PySide6.QtCore    import (
@@ -120,14 +130,12 @@ from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QLabel, QPushButton, QComboBox, QSlider, QCheckBox, QGroupBox, QStatusBar,
     QToolButton, QGraphicsDropShadowEffect, QDialog, QDialogButtonBox,
-    QFileDialog, QMessageBox
+    QFileDialog, QMessageBox, QListWidget, QListWidgetItem, QMenu
 )
-from PySide6.QtOpenGLWidgets import QOpenGLWidget
 import pyqtgraph as pg
 
 import numpy as np
-import psutil, sounddevice as sd
-import pyloudnorm
+T_IMPORTS = time.perf_counter()
 
 # ── Rutas & constantes ──────────────────────────────────────────────────────
 # Se calculan con pathlib.Path(resolve) de forma que la app es portable (no depende de rutas absolutas ni del CWD).
@@ -147,8 +155,14 @@ METRIC_LABELS = ("Peak Level",
                  "Short-term LUFS")
 Y_MIN_DB = -40     # fondo del gráfico
 Y_MAX_DB =  30     # head‑room visible
+DIAG_SECONDS = 30  # duración del modo diagnóstico (profiler de muestreo + tracemalloc)
+STALE_S  = 0.5     # frame analizado hace más que esto (t_done → ahora) = fuente parada / atascada
+DEVICE_LOST_S = 3.0  # sin bloques de PortAudio durante esto = dispositivo perdido → fallback
+UI_HOP   = 1024    # bloque de PortAudio de la cabina (~43 frames/s); el tamaño FFT (Resolution) va aparte
+# Features que la UI y el export JSON piden al registro del analizador (features.py)
+UI_FEATURES = json_bridge.FEATURES
 COLORS = dict(bg="#121212", panel="#1E1E1E", border="#2D2D2D", text="#E0E0E0",
-              primary="#45A4FF", secondary="#9B4DFF", cyan="#45D6FF")
+              primary="#45A4FF", secondary="#9B4DFF", cyan="#45D6FF", alert="#FF4D6A")
 
 # viridis LUT (fallback)
 # Tabla RGBA mínima por si pyqtgraph no encuentra la LUT oficial; evita que el espectrograma salga en gris plano.
@@ -161,15 +175,20 @@ except Exception:
 # ════════════════════════════════════════════════════════════════════════════
 #  WIDGETS
 # ════════════════════════════════════════════════════════════════════════════
-# GLWidget con fallback si PyOpenGL no está instalado
-try:
-    from OpenGL.GL import glClearColor, glClear, GL_COLOR_BUFFER_BIT
+# GLWidget con fallback si PyOpenGL no está instalado.  QtOpenGLWidgets + PyOpenGL (~170 ms de import) se cargan
+# la primera vez que se abre la vista 3-D Shape, no en el arranque.
+def make_gl_widget(parent):
+    try:
+        from PySide6.QtOpenGLWidgets import QOpenGLWidget
+        from OpenGL.GL import glClearColor, glClear, GL_COLOR_BUFFER_BIT
+    except ImportError:                   # sin PyOpenGL → canvas vacío
+        class GLWidget(QWidget):          # (evita el traceback)
+            def paintEvent(self,_): pass
+        return GLWidget(parent)
     class GLWidget(QOpenGLWidget):
         def initializeGL(self): glClearColor(18/255,18/255,18/255,1)        # Fija el clear‑color; Qt maneja el buffer‑swap por nosotros.
         def paintGL(self):       glClear(GL_COLOR_BUFFER_BIT)               # Hace un simple glClear().  El render 3D real se integrará más adelante o se delega al visor Baryon externo.
-except ImportError:                       # sin PyOpenGL → canvas vacío
-    class GLWidget(QWidget):              # (evita el traceback)
-        def paintEvent(self,_): pass
+    return GLWidget(parent)
 
 class OrbWidget(QWidget):
     """
@@ -229,7 +248,7 @@ class VisualizationWidget(QWidget):
     def __init__(self):
         super().__init__()
         # capas
-        self.gl=GLWidget(self); self.gl.lower()                                             # futuro mesh 3D
+        self.gl=None                                                                        # futuro mesh 3D (se crea en set_mode("shape"))
         self.orb=OrbWidget(self); self.orb.lower()                                          # sprite breathing
         # waveform
         self.wave_pg=pg.PlotWidget(self,background=None); self.wave_pg.hide()               # osciloscopio (pyqtgraph)
@@ -237,6 +256,10 @@ class VisualizationWidget(QWidget):
         self.wave_pg.getPlotItem().setContentsMargins(0,0,0,0)
         self.wave_buf=np.zeros(512)
         self.wave_curve=self.wave_pg.plot(pen=pg.mkPen(COLORS['secondary'],width=2))
+        # tendencia larga (timeseries.py): envolvente min/max alrededor de la media
+        self.trend_lo=self.wave_pg.plot(pen=pg.mkPen(COLORS['primary'],width=1))
+        self.trend_hi=self.wave_pg.plot(pen=pg.mkPen(COLORS['primary'],width=1))
+        self.wave_pg.addItem(pg.FillBetweenItem(self.trend_lo,self.trend_hi,brush=pg.mkBrush(69,164,255,40)))
         # spectrogram
         self.spec_pg=pg.PlotWidget(self,background=None); self.spec_pg.hide()               # espectrograma deslizante
         self.spec_pg.setMenuEnabled(False); self.spec_pg.setMouseEnabled(False,False)
@@ -257,7 +280,8 @@ class VisualizationWidget(QWidget):
         # Re‑coloca todo al redimensionar.  
         # Los botones se fijan en la esquina inferior izquierda a 14 px del borde; separados 38 px.
         
-        for w in (self.gl,self.orb,self.wave_pg,self.spec_pg): w.setGeometry(self.rect())
+        for w in (self.gl,self.orb,self.wave_pg,self.spec_pg):
+            if w is not None: w.setGeometry(self.rect())
         x,y=14,self.height()-46
         for b in self.ctrl.values(): b.move(x,y); x+=38
 
@@ -285,7 +309,9 @@ class VisualizationWidget(QWidget):
         self.wave_pg.setVisible(m=="wave")
         self.spec_pg.setVisible(m=="spec")
         self.orb.setVisible(m in ("shape","spectrum"))
-        self.gl.setVisible(m=="shape")
+        if m=="shape" and self.gl is None:
+            self.gl=make_gl_widget(self); self.gl.setGeometry(self.rect()); self.gl.lower(); self.orb.lower()   # mismo orden: gl sobre el orbe
+        if self.gl is not None: self.gl.setVisible(m=="shape")
 
     def zoom_y(self,factor:float):
         # Escala el eje Y de la vista visible conservando el centro; útil para hacer zoom vertical sin desplazar la señal.
@@ -304,8 +330,14 @@ class VisualizationWidget(QWidget):
 #  VENTANA PRINCIPAL
 # ════════════════════════════════════════════════════════════════════════════
 class OrbisUI(QMainWindow):
+    onsetDetected = Signal(float)         # emitida desde el hilo de audio → cola Qt
+    diagDone      = Signal(dict)          # emitida desde el hilo de diagnóstico al terminar
+    devicesChanged = Signal(object, object, object)  # (DeviceTable, añadidos, quitados) desde el hilo del DeviceManager
+    importsReady  = Signal(str)           # tabla -X importtime (o el error) desde su hilo
+
     def __init__(self,analyzer:AudioAnalyzer):
-        # Recibe un AudioAnalyzer (puede ser None para test offline).
+        # Recibe un AudioAnalyzer o None: sin stream hasta "Start Analysis" (el arranque normal, así
+        # no se importa sounddevice ni se abre PortAudio antes de mostrar la ventana).
         # Crea timers, carga tipografías, aplica CSS y construye paneles.
         # Mantiene tres variables de estado para el OrbWidget:
         #   _breath_seq  patrón de respiración
@@ -313,6 +345,29 @@ class OrbisUI(QMainWindow):
         #   _target_idx  frame objetivo según la ecualización instantánea
         super().__init__()
         self.analyzer=analyzer; self.running=False; 
+        self.streams=None                 # MultiStreamManager mientras hay análisis
+        self.recorder=SessionRecorder(CAPT_DIR)   # audio + frames → captures/session_*/ (hilo propio)
+        self.player=None                  # SessionPlayer mientras se reproduce una sesión grabada
+        self.timeline=None                # TimelineExporter de la grabación en curso (tabla para notebooks)
+        self._timings_dlg=None            # panel de histogramas por etapa (se crea al abrirlo)
+        self.diag=Diagnostics(CAPT_DIR, on_done=self.diagDone.emit)   # perfil + asignaciones → captures/diagnostics_*/
+        self.diagDone.connect(self._diag_done)
+        # /metrics en texto Prometheus (solo 127.0.0.1); se activa en Settings o con ORBIS_METRICS_PORT
+        self.metrics_server=MetricsServer(self._metric_streams, stats=self._metric_stats,
+                                          port=int(os.environ.get("ORBIS_METRICS_PORT") or METRICS_PORT))
+        self.history=TimeSeriesStore()    # volumen, true-peak, LUFS short-term, frecuencia y bandas: raw / 1 s / 10 s / 1 min
+        self.onsetDetected.connect(self._pulse_orb)
+        # PortAudio se consulta en segundo plano (DeviceManager): la ventana no espera a los drivers,
+        # los dispositivos enchufados / quitados aparecen solos y el footer lee la tabla cacheada.
+        # ORBIS_FALLBACK_DEVICE = parte del nombre del dispositivo al que saltar si se pierde el activo.
+        self.devman=DeviceManager(fallback=os.environ.get("ORBIS_FALLBACK_DEVICE"))
+        self.devman.add_listener(self.devicesChanged.emit)
+        self.devicesChanged.connect(self._on_devices)
+        self._devices_pending=True; self._main_key=None
+        self._startup=[("imports",T_IMPORTS)]       # fases del arranque (perf_counter) → Settings › Startup
+        self._startup_dlg=None; self._imports_report=None
+        self.importsReady.connect(self._on_imports)
+        self._attach_analyzer()
         # ── estado del orbe -------------------------------------------------
         self._breath_seq = [16,17,18,19,18,17,16,15,14,13,14,15]   # patrón base
         self._breath_idx = 0
@@ -321,6 +376,7 @@ class OrbisUI(QMainWindow):
         self._idle_timer.start()
         self.current_mode="wave"
         self._fonts(); self._style(); self._build(); self._timers()
+        self._startup.append(("window built",time.perf_counter()))
         self.setWindowTitle(f"ORBIS – Frequency‑Driven 3D Visualizer {VERSION}")
         if ICON_PATH.exists():
             QGuiApplication.setWindowIcon(QIcon(str(ICON_PATH)))
@@ -329,6 +385,14 @@ class OrbisUI(QMainWindow):
             QGuiApplication.setWindowIcon(QIcon(str(LOGO_PATH)))
             self.setWindowIcon(QIcon(str(LOGO_PATH)))
         self.resize(1280,800)
+        # kill -USR1 <pid> (Linux/macOS) o Ctrl+Break (Windows) lanza el diagnóstico sin tocar la UI
+        sig=install_signal(self._run_diagnostics)
+        if sig: self.diag_act.setToolTip(f"También con {sig}")
+        if os.environ.get("ORBIS_METRICS_PORT"):
+            self.metrics_act.setChecked(True)
+        # primera vuelta del bucle de eventos ≈ ventana pintada; el combo se rellena cuando PortAudio responde
+        QTimer.singleShot(0, lambda: self._startup.append(("first paint",time.perf_counter())))
+        self.devman.start()
     
 
     # ── fuentes + CSS ────────────────────────────────────────────────────
@@ -397,25 +461,88 @@ class OrbisUI(QMainWindow):
         bx.addWidget(QLabel(chr(0xf3c2),font=QFont("Remixicon",14),
                             styleSheet=f"color:{COLORS['secondary']}"))
         bx.addWidget(self.device_cb); box.setStyleSheet(f"background:{COLORS['border']};border-radius:12px")
-        hl.addWidget(box); hl.addStretch()
+        hl.addWidget(box)
+        # aviso: con un stream abierto PortAudio no se re-inicializa, la lista no ve hardware nuevo
+        self.dev_note=QLabel("",styleSheet=f"color:{COLORS['alert']};font-size:11px"); hl.addWidget(self.dev_note)
+        hl.addStretch()
         # botones
         self.start_btn=QPushButton(chr(0xefea)+"  Start Analysis"); self.start_btn.setObjectName("neon")
         self._neon(self.start_btn); self.start_btn.clicked.connect(self._toggle_stream); hl.addWidget(self.start_btn)
-        hl.addWidget(QPushButton(chr(0xeb8c)+"  Settings"))
+        set_btn=QPushButton(chr(0xeb8c)+"  Settings"); menu=QMenu(set_btn); set_btn.setMenu(menu)
+        self.diag_act=menu.addAction(f"Diagnostics: profile {DIAG_SECONDS} s",self._run_diagnostics); menu.setToolTipsVisible(True)
+        self.metrics_act=menu.addAction(f"Metrics endpoint :{self.metrics_server.port}"); self.metrics_act.setCheckable(True)
+        self.metrics_act.setToolTip(f"http://127.0.0.1:{self.metrics_server.port}/metrics (Prometheus)")
+        self.metrics_act.toggled.connect(self._toggle_metrics)
+        menu.addAction("Startup && import times…",self._show_startup)
+        hl.addWidget(set_btn)
         return hdr
+    def _on_devices(self, table, added: set, removed: set):
+        # Primera lectura (arranque) o cambio de hardware.  Los índices de PortAudio cambian tras re-escanear:
+        # la selección del combo y las fuentes marcadas se conservan por clave "<host API>/<nombre>".
+        if self._devices_pending:
+            self._devices_pending=False; self._startup.append(("devices",time.perf_counter()))
+        elif added or removed:
+            self.statusBar().showMessage("Audio devices: "+" · ".join(
+                [f"+ {k.split('/',1)[1]}" for k in sorted(added)]+[f"− {k.split('/',1)[1]}" for k in sorted(removed)]),8000)
+        sel=self._key_of(self.device_cb.currentData())
+        checked={it.data(Qt.UserRole+1) for it in map(self.src_list.item,range(self.src_list.count()))
+                 if it.checkState()==Qt.Checked}
+        self._fill_devices(); self._fill_sources(checked)
+        i=self.device_cb.findData(table.index_of(sel)) if sel else -1
+        if i>=0: self.device_cb.setCurrentIndex(i)
+        self._device_note()
+    def _device_note(self):
+        # Lista posiblemente atrasada: stream abierto (se re-escanea al parar o tras el fallback)
+        # o sounddevice sin la re-inicialización privada (solo al reiniciar la app).
+        dm=self.devman
+        note="" if dm.live else ("New devices appear after Stop" if dm.hotplug else "Restart to detect new devices")
+        self.dev_note.setText(note)
+        self.device_cb.setToolTip("Device list frozen while a stream is open: PortAudio re-scans once it stops"
+                                  if note and dm.hotplug else note)
+    def _key_of(self, device):
+        return self.devman.table.key_of(device)
     def _fill_devices(self):
-        # Interroga PortAudio → filtra solo dispositivos con canales de entrada y guarda el índice en userData para uso rápido.
+        # Filtra solo dispositivos con canales de entrada y guarda el índice en userData para uso rápido.
+        # Hasta que llega la lista, una entrada "por defecto" (None → loopback o entrada del sistema).
         self.device_cb.clear()
-        for i,d in enumerate(sd.query_devices()):
-            if d['max_input_channels']>0: self.device_cb.addItem(d['name'],userData=i)
+        inputs=self.devman.table.inputs()
+        if not inputs:
+            self.device_cb.addItem("Default input"+(" (detecting devices…)" if self._devices_pending else ""),userData=None)
+        for d in inputs: self.device_cb.addItem(d['name'],userData=d['index'])
+    def _fill_sources(self, checked=()):
+        # Mismos dispositivos que el combo, pero con check: se abren además del principal al pulsar Start.
+        self.src_list.clear()
+        for d in self.devman.table.inputs():
+            it=QListWidgetItem(f"{d['index']}: {d['name']}"); it.setData(Qt.UserRole,d['index']); it.setData(Qt.UserRole+1,d['key'])
+            it.setFlags(it.flags()|Qt.ItemIsUserCheckable)
+            it.setCheckState(Qt.Checked if d['key'] in checked else Qt.Unchecked)
+            self.src_list.addItem(it)
     # CONTROLS ------------------------------------------------------------
     def _panel_controls(self):
         gb=QGroupBox("Analysis Controls"); v=QVBoxLayout(gb)
-        for lab,val,init in [("Frequency Range","20Hz – 20kHz",100),
-                             ("Resolution","2048 FFT",70),("Sensitivity","‑24dB",50)]:
+        # rango (tope 500 Hz … 20 kHz), tamaño FFT y sensibilidad (±24 dB): set_plan en caliente, sin reabrir PortAudio
+        self.plan_sl={}; self.plan_lbl={}
+        for key,lab,top,init in [("range","Frequency Range",100,100),
+                                 ("fft","Resolution",len(FFT_SIZES)-1,FFT_SIZES.index(8192)),
+                                 ("sens","Sensitivity",48,24)]:
             lay=QVBoxLayout(); hl=QHBoxLayout(); hl.addWidget(QLabel(lab))
-            hl.addWidget(QLabel(val,styleSheet=f"color:{COLORS['secondary']};font-size:11px"))
-            lay.addLayout(hl); s=QSlider(Qt.Horizontal); s.setRange(0,100); s.setValue(init); lay.addWidget(s); v.addLayout(lay)
+            self.plan_lbl[key]=QLabel("",styleSheet=f"color:{COLORS['secondary']};font-size:11px"); hl.addWidget(self.plan_lbl[key])
+            lay.addLayout(hl); s=QSlider(Qt.Horizontal); s.setRange(0,top); s.setValue(init); lay.addWidget(s); v.addLayout(lay)
+            s.valueChanged.connect(self._apply_plan); self.plan_sl[key]=s
+        # resolución de bandas ISO 266 (1/1 … 1/24 octava) – la usan espectro, orbe y export JSON
+        hl=QHBoxLayout(); hl.addWidget(QLabel("Octave Bands"))
+        self.band_cb=QComboBox()
+        for n in FRACTIONS: self.band_cb.addItem(f"1/{n} oct",userData=n)
+        self.band_cb.setCurrentIndex(FRACTIONS.index(3))
+        self.band_cb.currentIndexChanged.connect(self._apply_plan)
+        hl.addWidget(self.band_cb); v.addLayout(hl); self._apply_plan()
+        # pirámide multirate: graves con ventana larga, agudos con ventana corta (se aplica al reiniciar el análisis)
+        self.chk_multirate=QCheckBox("Multirate Bass Detail",checked=False); v.addWidget(self.chk_multirate)
+        # fuentes extra (micro de escenario, playback …) analizadas a la vez en el pool compartido
+        v.addWidget(QLabel("Extra Sources"))
+        self.src_list=QListWidget(); self.src_list.setMaximumHeight(80); v.addWidget(self.src_list)
+        self._fill_sources()
+        self.lbl_sources=QLabel("",styleSheet="font-size:11px"); v.addWidget(self.lbl_sources)
         self.chk_peak=QCheckBox("Show Peak Markers",checked=True)
         self.chk_grid=QCheckBox("Show Grid Lines",checked=True)
         self.chk_log =QCheckBox("Logarithmic Scale",checked=True)
@@ -450,6 +577,10 @@ class OrbisUI(QMainWindow):
         )
         self.btn_baryon.clicked.connect(self._open_baryon)
         hl.addWidget(self.btn_baryon)
+        # ventana de la vista Waveform: últimos 512 frames o tendencia de la historia
+        self.hist_cb=QComboBox()
+        for lab,span in (("Live",0),("10 min",600),("1 h",3600),("12 h",43200)): self.hist_cb.addItem(lab,userData=span)
+        hl.addWidget(self.hist_cb)
         # ----------------------------------------------------------------------
 
         hl.addWidget(QLabel("● Live",styleSheet=f"color:{COLORS['primary']};font-size:11px"))
@@ -474,10 +605,10 @@ class OrbisUI(QMainWindow):
             bar=QWidget(bg); bar.setGeometry(0,0,0,6)
             bar.setStyleSheet("background:linear-gradient(90deg,#45A4FF,#9B4DFF);border-radius:3px")
             bl.addWidget(bg); v.addWidget(box); self.metrics[lab]=(val,bar)
-            self.metrics[lab] = (val, bar)
         fa=QGroupBox("Frequency Analysis"); g=QGridLayout(fa); self.band_lbl={}
         for i,(txt,key) in enumerate([("Low (20‑250Hz)","low"),("Mid (250‑2kHz)","mid"),
-                                      ("High (2k‑20kHz)","high"),("Dominant Freq","dom")]):
+                                      ("High (2k‑20kHz)","high"),("Dominant Freq","dom"),
+                                      ("Stereo Correlation","corr"),("Stereo Width","width")]):
             lay=QVBoxLayout(); lay.addWidget(QLabel(txt,styleSheet="font-size:11px"))
             val=QLabel("‑‑‑",font=QFont("Orbitron",12)); val.setStyleSheet(f"color:{COLORS['primary']}")
             lay.addWidget(val); g.addLayout(lay,i//2,i%2); self.band_lbl[key]=val
@@ -488,14 +619,29 @@ class OrbisUI(QMainWindow):
         hl=QHBoxLayout(); hl.addWidget(QLabel("Smoothing",styleSheet="font-size:11px"))
         self.smooth=QSlider(Qt.Horizontal); self.smooth.setRange(0,100); self.smooth.setValue(20); hl.addWidget(self.smooth)
         self.cap_btn=QPushButton(chr(0xf135)+" Capture"); self.cap_btn.clicked.connect(self._capture); hl.addWidget(self.cap_btn)
+        self.rec_btn=QPushButton(chr(0xe061)+" Record"); self.rec_btn.setCheckable(True)
+        self.rec_btn.toggled.connect(self._toggle_record); hl.addWidget(self.rec_btn)
+        # replay de sesiones grabadas: abrir, play/pausa, barra de posición y velocidad
+        self.open_btn=QPushButton(chr(0xe2c7)+" Open Session"); self.open_btn.clicked.connect(self._open_session); hl.addWidget(self.open_btn)
+        self.play_btn=QPushButton(chr(0xe037)); self.play_btn.setCheckable(True)
+        self.play_btn.toggled.connect(self._toggle_play); hl.addWidget(self.play_btn)
+        self.seek_sl=QSlider(Qt.Horizontal); self.seek_sl.setRange(0,1000); self.seek_sl.setMinimumWidth(240)
+        self.seek_sl.sliderMoved.connect(self._seek_session); hl.addWidget(self.seek_sl)
+        self.speed_cb=QComboBox()
+        for s in (-4,-1,0.25,0.5,1,2,4,16,64): self.speed_cb.addItem(f"{s:g}×",userData=float(s))
+        self.speed_cb.setCurrentIndex(4); self.speed_cb.currentIndexChanged.connect(self._set_speed); hl.addWidget(self.speed_cb)
+        self.lbl_pos=QLabel("",styleSheet="font-size:11px"); hl.addWidget(self.lbl_pos)
+        for w in (self.play_btn,self.seek_sl,self.speed_cb): w.setEnabled(False)
         hl.addStretch(); v.addLayout(hl)
         self.pg=pg.PlotWidget(background=COLORS['bg']); self.pg.getPlotItem().setContentsMargins(0,0,0,0)
         v.addWidget(self.pg); return gb
     # FOOTER --------------------------------------------------------------
     def _footer(self):
         sb=QStatusBar(); sb.setStyleSheet(f"background:{COLORS['panel']}"); self.setStatusBar(sb)
-        self.lbl_time,self.lbl_cpu,self.lbl_buf,self.lbl_sr=[QLabel() for _ in range(4)]
-        for w in (self.lbl_time,self.lbl_cpu,self.lbl_buf,self.lbl_sr): sb.addPermanentWidget(w)
+        self.lbl_rec,self.lbl_lag,self.lbl_time,self.lbl_cpu,self.lbl_buf,self.lbl_sr=[QLabel() for _ in range(6)]
+        # p99 de callback / tick + overruns; clic → panel con el histograma de cada etapa
+        self.perf_btn=QToolButton(autoRaise=True,toolTip="Hot-path timings"); self.perf_btn.clicked.connect(self._show_timings)
+        for w in (self.lbl_rec,self.perf_btn,self.lbl_lag,self.lbl_time,self.lbl_cpu,self.lbl_buf,self.lbl_sr): sb.addPermanentWidget(w)
         sb.addPermanentWidget(QLabel(f"ORBIS {VERSION}"))
     # neon ripple
     def _neon(self,btn:QPushButton):
@@ -512,6 +658,7 @@ class OrbisUI(QMainWindow):
     def _timers(self):
         self.t0=time.time()                                                                             # 100 ms → _tick()      (≈10 Hz)
         self.ui_timer=QTimer(interval=100,timeout=self._tick); self.ui_timer.start()
+        HOT_PATH.set_budget("tick", self.ui_timer.interval()/1000)                                      # un tick debe caber en su periodo
         self.footer_timer=QTimer(interval=1000,timeout=self._tick_footer); self.footer_timer.start()    # 1 s    → _tick_footer()
 
     # ────────────────────────────────────────────────────────────────────
@@ -520,16 +667,21 @@ class OrbisUI(QMainWindow):
     def _tick(self):
         # Bucle gordo de refresco UI:
         # 1. Obtiene volumen, frecuencia dominante, FFT y sample‑rate.
-        # 2. Calcula métricas globales (offsets de -6/-1/+1 LUFS para simular medidores broadcast).
+        # 2. Calcula métricas globales (LUFS short-term del analizador; offsets de -6/-1 dB para RMS / Integrated).
         # 3. Saca picos Low/Mid/High con peak_db().
         # 4. Actualiza labels y ancho de barras.
         # 5. Decide el frame destino del orbe con _update_target_from_audio().
         # 6. Si el modo es 'wave' o 'spec' actualiza su gráfica.
         # 7. Redibuja el gráfico de barras (_plot_spectrum()).
         # 8. Exporta JSON para Blender con _export_json().
+        # Con la puerta de silencio cerrada se pinta y exporta solo el primer frame silencioso:
+        # después ni redibujo ni JSON (el orbe sigue respirando) hasta que vuelva la señal.
  
-        if not self.running:
+        if not self.running and self.player is None:
             return
+        t_tick = time.perf_counter_ns()
+        if self.player is not None:
+            self._sync_replay()
 
         # --------- datos crudos de AudioAnalyzer -----------------------
         d   = self.analyzer.get_audio_data() or {}
@@ -537,37 +689,44 @@ class OrbisUI(QMainWindow):
         freq= float(d.get("dominant_freq", 0.0))
         fft = d.get("fft")
         sr  = int(d.get("sample_rate", 48000))
-
-        # --------- helper dB por banda ---------------------------------
-        def band(lo: float, hi: float) -> float:
-            if fft is None or not len(fft):
-                return -60.0
-            f_axis = np.fft.rfftfreq(len(fft)*2 - 2, 1/sr)
-            sel = (f_axis >= lo) & (f_axis < hi)
-            return 20*np.log10(np.mean(fft[sel]) + 1e-10) if np.any(sel) else -60.0
-        def peak_db(lo: float, hi: float) -> float:
-            """Devuelve el pico dBFS en el rango lo-hi Hz."""
-            if fft is None or not len(fft):
-                return -60.0
-            f_axis = np.fft.rfftfreq(len(fft)*2 - 2, 1/sr)
-            sel = (f_axis >= lo) & (f_axis < hi)
-            if not np.any(sel):
-                return -60.0
-            return 20*np.log10(np.max(fft[sel]) + 1e-10)
+        ob  = d.get("band_engine")                 # OctaveBands del analizador
+        lv  = d.get("bands")
+        if ob is None or lv is None or len(lv) != len(ob):
+            ob = lv = None                         # aún sin bloque o cambio de resolución
+        feats = d.get("features") or {}            # calculadas una vez en el analizador
+        # onsets / beats de todos los bloques desde el último tick (no solo el último) → export JSON
+        new = self.analyzer.frames.read_since(self._frame_seq)
+        if new:
+            self._frame_seq = new[-1]["seq"]
+            # edad del último frame al pintarlo: captura ADC → ahora, mismo reloj monotónico que el analizador
+            self._t_done = new[-1]["t_done"]
+            self._lag = time.monotonic() - new[-1]["t_adc"]
+        silent = json_bridge.silent(new, self._silent) if new else (None if self._silent else False)
+        if silent is None:
+            self._advance_idle(); return
+        self._silent = silent
 
         # --------- métricas globales (Peak, RMS, etc.) -----------------
-        for lab, off in zip(METRIC_LABELS, (0, -6, -1, 1)):
+        # Peak Level = true-peak con hold (sobremuestreo 4×) del analizador; Short-term = LUFS K-weighted de 3 s.
+        # RMS / Integrated siguen derivados de vol.
+        tp_hold = float(d.get("peak_hold", vol))
+        self._set_metric("Peak Level", tp_hold)
+        for lab, off in zip(METRIC_LABELS[1:3], (-6, -1)):
             self._set_metric(lab, vol + off)
+        self._set_metric("Short-term LUFS", float(d.get("short_term_lufs", vol + 1)))
 
         # --------- bandas Low / Mid / High -----------------------------
-        low_dB  = peak_db(20,   250)
-        mid_dB  = peak_db(250,  5000)
-        high_dB = peak_db(5000, 20000)
+        pk = feats.get("band_peaks", {})
+        low_dB, mid_dB, high_dB = (float(pk.get(k, -60.0)) for k in ("low", "mid", "high"))
 
         self.band_lbl["low"].setText(f"{low_dB:+.1f} dB")
         self.band_lbl["mid"].setText(f"{mid_dB:+.1f} dB")
         self.band_lbl["high"].setText(f"{high_dB:+.1f} dB")
         self.band_lbl["dom"].setText(f"{freq:.0f} Hz")
+        st = d.get("stereo")                       # None con dispositivos mono
+        if st:
+            self.band_lbl["corr"].setText(f"{st['correlation']:+.2f}")
+            self.band_lbl["width"].setText(f"{st['width'] * 100:.0f} %")
 
         # --------- decide destino del orbe y anima ---------------------
         self._update_target_from_audio(low_dB, mid_dB, high_dB)
@@ -577,7 +736,16 @@ class OrbisUI(QMainWindow):
         if self.current_mode == "wave":
             self.vis.wave_buf = np.roll(self.vis.wave_buf, -1)
             self.vis.wave_buf[-1] = vol
-            self.vis.wave_curve.setData(self.vis.wave_buf)
+            span = self.hist_cb.currentData()
+            if span:
+                # eje X en segundos hasta "ahora"; min/max del bucket como envolvente
+                s = self.history.series("volume", span)
+                x = s["t"] - s["t"][-1] if len(s["t"]) else s["t"]
+                self.vis.wave_curve.setData(x, s["mean"])
+                self.vis.trend_lo.setData(x, s["min"]); self.vis.trend_hi.setData(x, s["max"])
+            else:
+                self.vis.wave_curve.setData(self.vis.wave_buf)
+                self.vis.trend_lo.setData([], []); self.vis.trend_hi.setData([], [])
 
         # --------- espectrograma -------------------------------------------
         if self.current_mode == "spec" and fft is not None:
@@ -590,14 +758,17 @@ class OrbisUI(QMainWindow):
                                     levels=(0, 60), autoLevels=False)
 
         # --------- FFT gráfico de barras (panel inferior) -------------------
-        self._plot_spectrum(fft, sr)
+        t0 = time.perf_counter_ns()
+        self._plot_spectrum(fft, sr, ob, lv)
+        HOT_PATH.record("plot", t0)
 
         # --------- export JSON para Blender ---------------------------------
-        self._export_json(vol, freq, fft, sr,
-                        extra=dict(low=low_dB, mid=mid_dB, high=high_dB))
+        self._export_json(d, new)
+        HOT_PATH.record("tick", t_tick)
 
 
-    def _plot_spectrum(self, fft: np.ndarray | None, sr: int) -> None:
+    def _plot_spectrum(self, fft: np.ndarray | None, sr: int, ob=None, lv=None) -> None:
+        # • Con banco de octavas disponible dibuja una barra por banda ISO 266 (resolución seleccionable).
         # • Genera 33 centros de banda (geométrica) entre 1 Hz y 20 kHz.
         # • Función f2x() mapea frecuencia a posición X con: lineal 1‑20 Hz, log 20‑5 kHz, lineal 5‑20 kHz.
         #   Así los graves no se amontonan y los agudos se expanden.
@@ -617,6 +788,8 @@ class OrbisUI(QMainWindow):
             c = bounds[i+1] if i+1 < len(bounds) else b**2 / a
             centers.extend([math.sqrt(a*b), b, math.sqrt(b*c)])
         centers = np.unique(np.round(centers, 4))
+        if ob is not None:
+            centers = ob.centers
         # ── mapeo X híbrido (1‑20 lin · 20‑5k log · 5k‑20k lin) ─
         log20, log50 = np.log10(20), np.log10(50)
         seg0 = log50 - log20
@@ -637,16 +810,19 @@ class OrbisUI(QMainWindow):
         x_pos = f2x(centers)
         x_max = f2x(20000) + seg0 * .4
         # ── magnitudes dBFS ─────────────────────────────────────
-        freqs = np.fft.rfftfreq(len(fft)*2 - 2, 1 / sr)
-        mags_db = 20 * np.log10(np.interp(centers, freqs, fft,
-                                        left=1e-10, right=1e-10) + 1e-10)
-        # suavizado + picos
+        if ob is not None:
+            mags_db = np.asarray(lv, float)
+        else:
+            freqs = np.fft.rfftfreq(len(fft)*2 - 2, 1 / sr)
+            mags_db = 20 * np.log10(np.interp(centers, freqs, fft,
+                                            left=1e-10, right=1e-10) + 1e-10)
+        # suavizado + picos  (se reinician si cambia el nº de bandas)
         decay = 0.5
-        if not hasattr(self, "_peaks"):
+        if not hasattr(self, "_peaks") or self._peaks.shape != mags_db.shape:
             self._peaks = mags_db.copy()
         self._peaks = np.maximum(mags_db, self._peaks - decay)
         alpha = self.smooth.value() / 100
-        if not hasattr(self, "_smooth"):
+        if not hasattr(self, "_smooth") or self._smooth.shape != mags_db.shape:
             self._smooth = mags_db.copy()
         self._smooth = alpha * self._smooth + (1 - alpha) * mags_db
         sm_db = self._smooth
@@ -721,22 +897,92 @@ class OrbisUI(QMainWindow):
 
 
 
-    def _export_json(self, vol, freq, fft, sr, extra: dict | None = None):
-        # Prepara diccionario, añade low/mid/high y, si hay FFT, crea 12 claves "20Hz", "50Hz", … "20000Hz" con dBFS redondeado a 0.01. 
+    def _export_json(self, d: dict, new: list):
+        # Mismo JSON de siempre (json_bridge.payload: nivel, picos, onsets/beats desde el último tick,
+        # estéreo, fuentes extra, features y espectro de 11 claves / bandas ISO 266); el daemon
+        # headless escribe exactamente lo mismo sin Qt.
         # Escribe con indent=2 para que el diff en Git sea legible.
-        JSON_PATH.parent.mkdir(exist_ok=True)
-        data = dict(volume=round(vol, 2),
-                    dominant_freq=round(freq, 2),
-                    version=VERSION)
-        
-        if extra:                      # <-- nueva línea
-            data.update(extra)         # <--
-        if fft is not None and len(fft):
-            f=np.fft.rfftfreq(len(fft)*2-2,1/sr); spec={}
-            for t in (20,50,100,250,500,1000,2000,5000,10000,15000,20000):
-                spec[f"{t}Hz"]=round(20*np.log10(max(fft[(np.abs(f-t)).argmin()],1e-10)),2)
-            data["spectrum"]=spec
-        with open(JSON_PATH,"w") as f: json.dump(data,f,indent=2)
+        data = json_bridge.payload(d, new, VERSION, self._frame_seq, self._sources_fields())
+        json_bridge.write(JSON_PATH, data)
+
+    def _show_timings(self):
+        # Panel detallado: n, media, p50/p99, máx, presupuesto, overruns e histograma de cada etapa.
+        # Se refresca con el footer (1 s); "Save" vuelca los buckets a captures/ para comparar shows.
+        if self._timings_dlg is None:
+            dlg=QDialog(self); dlg.setWindowTitle("Hot-path timings"); v=QVBoxLayout(dlg)
+            self._timings_lbl=QLabel(styleSheet="font-family:monospace;font-size:11px"); v.addWidget(self._timings_lbl)
+            bb=QDialogButtonBox(QDialogButtonBox.Save|QDialogButtonBox.Reset|QDialogButtonBox.Close)
+            bb.button(QDialogButtonBox.Save).clicked.connect(self._dump_timings)
+            bb.button(QDialogButtonBox.Reset).clicked.connect(HOT_PATH.reset)
+            bb.rejected.connect(dlg.close); v.addWidget(bb)
+            self._timings_dlg=dlg
+        self._timings_lbl.setText(HOT_PATH.table() or "no samples yet")
+        self._timings_dlg.show(); self._timings_dlg.raise_()
+
+    def _dump_timings(self):
+        path=HOT_PATH.dump(CAPT_DIR/time.strftime("timings_%Y%m%d_%H%M%S.json"))
+        self.statusBar().showMessage(f"✔ saved {path.name}",5000)
+
+    def _run_diagnostics(self):
+        # Profiler de muestreo sobre todos los hilos (GUI, audio, escritores) + diff de tracemalloc
+        # durante DIAG_SECONDS; corre en su propio hilo, la UI sigue funcionando mientras tanto.
+        if self.diag.start(DIAG_SECONDS):
+            self.diag_act.setEnabled(False)
+            self.statusBar().showMessage(f"● diagnostics: profiling {DIAG_SECONDS} s …",5000)
+
+    def _diag_done(self, res: dict):
+        self.diag_act.setEnabled(True)
+        if "error" in res:
+            self.statusBar().showMessage(f"Diagnostics failed: {res['error']}",8000)
+        else:
+            self.statusBar().showMessage(f"✔ diagnostics: {res['samples']} samples → {Path(res['path']).name}",8000)
+
+    def _show_startup(self):
+        # Fases del arranque de este proceso + desglose -X importtime de un import en frío de orbis_ui
+        # (intérprete aparte, tarda unos segundos → hilo; la ventana sigue viva).
+        if self._startup_dlg is None:
+            dlg=QDialog(self); dlg.setWindowTitle("Startup & import times"); v=QVBoxLayout(dlg)
+            self._startup_lbl=QLabel(styleSheet="font-family:monospace;font-size:11px"); v.addWidget(self._startup_lbl)
+            bb=QDialogButtonBox(QDialogButtonBox.Close); bb.rejected.connect(dlg.close); v.addWidget(bb)
+            self._startup_dlg=dlg
+        if self._imports_report is None:
+            self._imports_report="measuring imports in a fresh interpreter …"
+            def run():
+                try: self.importsReady.emit(import_table(import_times("orbis_ui", cwd=BASE_DIR)))
+                except Exception as exc: self.importsReady.emit(f"import timing failed: {exc}")
+            threading.Thread(target=run,name="orbis-importtime",daemon=True).start()
+        self._refresh_startup()
+        self._startup_dlg.show(); self._startup_dlg.raise_()
+
+    def _on_imports(self, report: str):
+        self._imports_report=report
+        if self._startup_dlg is not None: self._refresh_startup()
+
+    def _refresh_startup(self):
+        rows=[f"{'phase':<14}{'at':>10}{'step':>10}   (from the start of orbis_ui's imports)"]; prev=T_START
+        for name,t in self._startup:
+            rows.append(f"{name:<14}{(t-T_START)*1e3:>7.0f} ms{(t-prev)*1e3:>7.0f} ms"); prev=t
+        self._startup_lbl.setText("\n".join(rows)+"\n\n"+(self._imports_report or ""))
+
+    def _toggle_metrics(self, on: bool):
+        # El servidor lee contadores (frames.seq, HOT_PATH, overflows): no toca el hilo de audio.
+        if not on:
+            self.metrics_server.stop(); return
+        try:
+            port=self.metrics_server.start()
+        except OSError as exc:
+            self.metrics_act.blockSignals(True); self.metrics_act.setChecked(False); self.metrics_act.blockSignals(False)
+            self.statusBar().showMessage(f"Metrics endpoint: {exc}",8000); return
+        self.statusBar().showMessage(f"● metrics on http://127.0.0.1:{port}/metrics",5000)
+
+    def _metric_streams(self) -> dict:
+        # Todas las fuentes del manager; si no hay, el analizador suelto (o el reproductor de sesión).
+        if self.streams is not None:
+            return {n: self.streams[n] for n in self.streams.names}
+        return {"main": self.analyzer} if self.analyzer is not None else {}
+
+    def _metric_stats(self) -> dict:
+        return self.streams.stats() if self.streams is not None else {}
 
     def _capture(self):
         # Captura la vista de pyqtgraph a una PNG nombrada con timestamp dentro de ./captures.  
@@ -745,9 +991,77 @@ class OrbisUI(QMainWindow):
         path=CAPT_DIR/f"spectrum_{time.strftime('%Y%m%d_%H%M%S')}.png"
         self.pg.grab().save(str(path)); self.statusBar().showMessage(f"✔ saved {path.name}",5000)
 
+    def _toggle_record(self, on: bool):
+        # Graba la sesión del analizador principal: WAV + log columnar de frames (recorder.py).
+        # El escritor corre en su propio hilo → ni el callback de audio ni la UI esperan al disco.
+        if not on:
+            if self.timeline is not None:
+                self.timeline.close(); self.timeline=None
+            if self.recorder.recording:
+                st=self.recorder.stop()
+                self.statusBar().showMessage(f"✔ session saved: {Path(st['path']).name} ({st['rows']} frames)",5000)
+            return
+        if not self.running or self.analyzer is None:
+            self.statusBar().showMessage("Start the analysis before recording",5000)
+            self.rec_btn.setChecked(False); return
+        try:
+            path=self.recorder.start(self.analyzer)
+        except Exception as exc:
+            self.statusBar().showMessage(f"Recording failed: {exc}",5000)
+            self.rec_btn.setChecked(False); return
+        # además una línea de tiempo columnar: Parquet si hay pyarrow, si no CSV
+        try:
+            self.timeline=TimelineExporter(path/"timeline.parquet").attach(self.analyzer)
+        except RuntimeError:
+            self.timeline=TimelineExporter(path/"timeline.csv").attach(self.analyzer)
+        self.statusBar().showMessage(f"● recording → {path.name}",5000)
+
+    def _open_session(self):
+        # Abre captures/session_* y la reproduce como si fuera en vivo: el SessionPlayer hace de analizador,
+        # así espectro, espectrograma, orbe, métricas y export JSON no cambian.  Lectura perezosa (memmap).
+        path=QFileDialog.getExistingDirectory(self,"Open Session",str(CAPT_DIR))
+        if not path: return
+        try:
+            player=SessionPlayer(SessionReader(path))
+        except Exception as exc:
+            QMessageBox.warning(self,"Open Session",f"Not a recorded session:\n{exc}"); return
+        if self.running:
+            self._toggle_stream()             # para el análisis en vivo (y la grabación)
+        self._stop_streams()
+        self.player=player; self.analyzer=player; self.history.clear(); self._attach_analyzer()
+        player.speed=self.speed_cb.currentData(); player.start()
+        for w in (self.play_btn,self.seek_sl,self.speed_cb): w.setEnabled(True)
+        self.play_btn.blockSignals(True); self.play_btn.setChecked(True); self.play_btn.blockSignals(False)
+        self.statusBar().showMessage(f"▶ replay {Path(path).name} ({player.duration:.0f} s)",5000)
+
+    def _toggle_play(self, on: bool):
+        if self.player is None: return
+        self.player.play() if on else self.player.pause()
+
+    def _seek_session(self, v: int):
+        # Scrub: búsqueda binaria en el índice de tiempos + frame leído del memmap (funciona en pausa).
+        if self.player is not None:
+            self.history.clear()              # la historia solo avanza: se rehace desde la nueva posición
+            self.player.seek(v/1000*self.player.duration)
+
+    def _set_speed(self, _=None):
+        if self.player is not None:
+            self.player.speed=self.speed_cb.currentData()
+
+    def _sync_replay(self):
+        # Barra de posición y play/pausa siguen al reloj del player (no se toca mientras se arrastra).
+        p=self.player; dur=max(p.duration,1e-9)
+        if not self.seek_sl.isSliderDown():
+            self.seek_sl.blockSignals(True); self.seek_sl.setValue(int(p.position/dur*1000)); self.seek_sl.blockSignals(False)
+        if self.play_btn.isChecked()!=p.playing:
+            self.play_btn.blockSignals(True); self.play_btn.setChecked(p.playing); self.play_btn.blockSignals(False)
+        fmt=lambda t: f"{int(t)//60:02}:{int(t)%60:02}"
+        self.lbl_pos.setText(f"{fmt(p.position)} / {fmt(p.duration)}")
+
     def _open_baryon(self):
         # Lanza el visor 3D Baryon si no está ya abierto.
         # Si falla, muestra un botón para reintentar.
+        from visualizers.launch_baryon import launch as launch_baryon
 
         if launch_baryon(force_local=False, ask=True):
             self.btn_baryon.setText("Launched ✔")
@@ -760,15 +1074,132 @@ class OrbisUI(QMainWindow):
         # Si está corriendo, lo detiene y cambia el texto del botón a "Start Analysis".
         # Si no, lo inicia con el dispositivo seleccionado y cambia el texto a "Stop Analysis". 
         # Esto evita estado zombie de PortAudio.
+        # Todas las fuentes (principal + extra) van en un MultiStreamManager: un InputStream por
+        # dispositivo y un único pool de workers para el DSP, sin una UI por dispositivo.
         if self.running:
-            self.analyzer.stop(); self.running=False
+            self._stop_streams(); self.running=False
             self.start_btn.setText(chr(0xefea)+"  Start Analysis")
         else:
-            self.analyzer.stop()
-            self.analyzer=AudioAnalyzer(device=self.device_cb.currentData())
-            self.analyzer.start(); self.running=True
+            self._stop_streams()
+            # se abre con la FFT de referencia (escala de dB fija) y el panel se aplica justo antes de arrancar
+            kw=dict(band_fraction=self.band_cb.currentData(), multirate=self.chk_multirate.isChecked(), hop=UI_HOP)
+            main=self.device_cb.currentData()
+            self._main_key=self._key_of(main)      # identidad estable del dispositivo (para el fallback)
+            self.streams=MultiStreamManager()
+            self.analyzer=self.streams.add("main", device=main, channels=self._device_channels(main), **kw)
+            for i in range(self.src_list.count()):
+                it=self.src_list.item(i); dev=it.data(Qt.UserRole)
+                if it.checkState()!=Qt.Checked or dev==main:
+                    continue
+                try:
+                    self.streams.add(it.text(), device=dev, channels=self._device_channels(dev),
+                                     **kw).subscribe(("band_peaks",))
+                except Exception as exc:      # dispositivo ocupado / desaparecido: seguimos con el resto
+                    warnings.warn(f"Source {it.text()} not opened: {exc}")
+            self._attach_analyzer(); self._apply_plan()
+            self.streams.start(); self.running=True
             self.start_btn.setText(chr(0xef47)+"  Stop Analysis")
 
+    def closeEvent(self, e):
+        # Cierra los InputStream al salir: el pool de workers del manager no es daemon.
+        self._stop_streams(); self.metrics_server.stop(); self.devman.stop(); super().closeEvent(e)
+
+    def _recover_device(self):
+        # El dispositivo principal dejó de entregar bloques (desenchufado, driver reiniciado): cierra todo,
+        # re-escanea PortAudio (ya sin streams abiertos → ve el hardware actual) y reabre en el fallback
+        # sin reiniciar la app.  La grabación sigue en una sesión nueva.
+        lost=self.devman.table.find(self._main_key); was_rec=self.recorder.recording
+        self._stop_streams(); self.running=False
+        self.start_btn.setText(chr(0xefea)+"  Start Analysis")
+        self.devman.refresh()
+        idx=self.devman.fallback(self._main_key)
+        name=lost['name'] if lost else "input device"
+        if idx is None or self.device_cb.findData(idx)<0:
+            self.statusBar().showMessage(f"⚠ {name} lost – no input device to fall back to",0); return
+        self.device_cb.setCurrentIndex(self.device_cb.findData(idx))
+        try:
+            self._toggle_stream()
+        except Exception as exc:              # el fallback tampoco abre: queda parado con el aviso
+            self._stop_streams(); self.statusBar().showMessage(f"⚠ {name} lost – fallback failed: {exc}",0); return
+        if was_rec: self.rec_btn.setChecked(True)
+        self.statusBar().showMessage(f"⚠ {name} lost → {self.device_cb.currentText()}",10000)
+
+    def _stop_streams(self):
+        # Cierra el manager (o el analizador suelto que llega del constructor).
+        # La grabación va ligada al analizador: se cierra antes que él.
+        if self.recorder.recording:
+            self.rec_btn.setChecked(False)
+        if self.player is not None:
+            self.player.stop(); self.player=None; self.history.clear()
+            for w in (self.play_btn,self.seek_sl,self.speed_cb): w.setEnabled(False)
+            self.lbl_pos.setText("")
+        if self.streams is not None:
+            self.streams.stop(); self.streams=None
+        elif self.analyzer is not None:
+            self.analyzer.stop()
+
+    def _sources_fields(self) -> dict:
+        # Vista combinada de las fuentes extra → etiqueta en el panel y clave "sources" del JSON.
+        if self.streams is None or len(self.streams) < 2:
+            self.lbl_sources.setText("")
+            return {}
+        out = json_bridge.source_fields(self.streams.view())
+        self.lbl_sources.setText("\n".join(
+            f"{n[:18]}  {s['volume']:+.1f} dB · {s['dominant_freq']:.0f} Hz" for n, s in out.items()))
+        return out
+
+    def _attach_analyzer(self):
+        # Cada AudioAnalyzer trae su propio registro y canal de frames → hay que engancharse otra vez al recrearlo.
+        self._frame_seq = 0
+        self._t_done, self._lag = -np.inf, 0.0
+        self._silent = False                       # el último frame pintado / exportado era de silencio
+        if self.analyzer is not None:
+            self._feat_sub = self.analyzer.subscribe(UI_FEATURES)
+            self.analyzer.frames.add_listener(self._on_frame)
+
+    def _on_frame(self, fr: dict):
+        # Hilo de audio: solo reenvía el golpe; el orbe se mueve en el hilo Qt sin esperar al tick de 100 ms.
+        # La historia usa reloj de pared en vivo (sobrevive a reinicios) y tiempo de sesión en replay.
+        self.history.add_frame(fr, time.time() if self.player is None else fr["t"])
+        for o in fr["onsets"]:
+            self.onsetDetected.emit(o["strength"])
+
+    def _pulse_orb(self, strength: float):
+        # Golpe → salto de 2‥6 frames hacia fuera; _advance_idle lo devuelve al destino.
+        orb = self.vis.orb
+        kick = int(min(6, 1 + strength))
+        orb.set_level(orb.level + (kick if orb.level >= 16 else -kick))
+
+    def _device_info(self, device=None) -> dict | None:
+        # Datos del dispositivo desde la tabla cacheada (None → entrada por defecto); None si aún no hay tabla.
+        t = self.devman.table
+        return t.get(t.default_input if device is None else device)
+
+    def _device_channels(self, device=None) -> int:
+        # Estéreo si el dispositivo lo permite (correlación / anchura); si no, mono.
+        d = self._device_info(device)
+        return max(1, min(2, int(d["max_input_channels"]))) if d else 1
+
+    def _plan_kw(self) -> dict:
+        # Panel → argumentos de AudioAnalyzer.set_plan (tope de rango logarítmico: 500 Hz · 40^(v/100)).
+        return dict(n_fft=FFT_SIZES[self.plan_sl["fft"].value()],
+                    f_max=round(500 * 40 ** (self.plan_sl["range"].value() / 100)),
+                    gain_db=float(self.plan_sl["sens"].value() - 24),
+                    band_fraction=self.band_cb.currentData())
+
+    def _apply_plan(self, _=None):
+        # Rango / FFT / sensibilidad / bandas en caliente para todas las fuentes: ventana y pesos se construyen
+        # aquí (hilo Qt) y cada analizador cambia de plan entre dos bloques – el stream no se detiene.
+        # Resolution cambia resolución por latencia: la ventana de 8192 a 48 kHz son 170 ms de audio por frame.
+        kw=self._plan_kw(); sr=getattr(self.analyzer,"sample_rate",48000)
+        self.plan_lbl["range"].setText(f"20Hz – {kw['f_max']/1000:.1f}kHz")
+        self.plan_lbl["fft"].setText(f"{kw['n_fft']} FFT · {kw['n_fft']/sr*1000:.0f} ms")
+        self.plan_lbl["sens"].setText(f"{kw['gain_db']:+.0f}dB")
+        for a in self._metric_streams().values():
+            if hasattr(a,"set_plan"):             # el reproductor de sesiones no analiza
+                try: a.set_plan(**kw)
+                except ValueError as exc: self.statusBar().showMessage(f"Analysis plan: {exc}",5000)
+
     # modos
     # Cambian entre los cuatro modos y aplican CSS distinto (cyan para spectrum/shape, morado para wave/spec).
     def _set_mode(self,m):
@@ -785,13 +1216,30 @@ class OrbisUI(QMainWindow):
     # footer
     def _tick_footer(self):
         # Uptime HH:MM:SS, CPU psutil, tamaño de buffer y sample‑rate del dispositivo cada segundo.
+        # Buffer / sample-rate salen de la lista cacheada: nada de consultar PortAudio desde el hilo Qt.
+        import psutil                            # primer uso al segundo de arrancar, no en el import del módulo
         t=int(time.time()-self.t0); h,m,s=t//3600,(t//60)%60,t%60
         self.lbl_time.setText(f"Session {h:02}:{m:02}:{s:02}")
         self.lbl_cpu.setText(f"CPU {psutil.cpu_percent():>3.0f}%")
-        try:
-            d=sd.query_devices(self.device_cb.currentData() or 0)
+        if self.running and self.streams is not None and self.analyzer.source.stalled(DEVICE_LOST_S):
+            self._recover_device(); return
+        d=self._device_info(self.device_cb.currentData())
+        if d:
             sr=int(d['default_samplerate']); buf=int(d['default_low_input_latency']*sr)
-        except Exception: sr=buf=0
+        else: sr=buf=0
+        if self.recorder.recording:
+            st=self.recorder.stats(); lost=st['dropped_audio']+st['dropped_frames']
+            self.lbl_rec.setText(f"● REC {st['rows']} frames" + (f" · {lost} dropped" if lost else ""))
+        else:
+            self.lbl_rec.setText("")
+        fresh = time.monotonic() - self._t_done < STALE_S
+        self.lbl_lag.setText((f"Lag {self._lag*1000:.0f} ms" if fresh else "Lag –") + (" · silent" if self._silent else ""))
+        # rojo mientras alguna etapa se haya pasado de presupuesto en los últimos 5 s
+        bad = HOT_PATH.worst()
+        self.perf_btn.setText(HOT_PATH.summary() or "timings")
+        self.perf_btn.setStyleSheet(f"color:{COLORS['alert'] if bad else COLORS['text']}")
+        if self._timings_dlg is not None and self._timings_dlg.isVisible():
+            self._timings_lbl.setText(HOT_PATH.table())
         self.lbl_buf.setText(f"Buffer {buf}"); self.lbl_sr.setText(f"Sample Rate {sr} Hz")
 
     def _advance_idle(self):
@@ -856,9 +1304,28 @@ class OrbisUI(QMainWindow):
             self._breath_seq = [16,17,18,19,18,17,16,15,14,13,14,15]
 
 # ════════════════════════════════════════════════════════════════════════════
-if __name__=="__main__":
-    # Punto de entrada.  Crea QApplication, configura icono (ICO ≫ PNG), instancia OrbisUI con un AudioAnalyzer vacío y llama a exec().
+def _selftest() -> bool:
+    # `python orbis_ui.py --selftest`: ventana offscreen sin audio; endpoint /metrics encendido por ORBIS_METRICS_PORT
+    # (puerto libre), apagado y re-encendido desde el menú, y cierre limpio (servidor parado).  Sin pantalla ni PortAudio.
+    import urllib.request
+    ui=OrbisUI(None)
+    def scrape():
+        url=f"http://127.0.0.1:{ui.metrics_server.port}/metrics"
+        return b"orbis_" in urllib.request.urlopen(url,timeout=5).read()
+    ok=ui.metrics_server.running and scrape()
+    ui.metrics_act.setChecked(False); ok=ok and not ui.metrics_server.running
+    ui.metrics_act.setChecked(True);  ok=ok and ui.metrics_server.running and scrape()
+    ui.close(); ok=ok and not ui.metrics_server.running
+    return bool(ok)
+
+if __name__=="__main__" and "--selftest" in sys.argv:
+    os.environ.setdefault("QT_QPA_PLATFORM","offscreen"); os.environ["ORBIS_METRICS_PORT"]="0"
+    app=QApplication(sys.argv); ok=_selftest()
+    print("ok" if ok else "selftest FAILED"); sys.exit(0 if ok else 1)
+elif __name__=="__main__":
+    # Punto de entrada.  Crea QApplication, configura icono (ICO ≫ PNG), instancia OrbisUI sin analizador y llama a exec().
+    # El AudioAnalyzer (y con él PortAudio) se crea al pulsar Start; la lista de dispositivos llega del hilo de DeviceManager.
     app=QApplication(sys.argv)
     if ICON_PATH.exists(): app.setWindowIcon(QIcon(str(ICON_PATH)))
     elif LOGO_PATH.exists(): app.setWindowIcon(QIcon(str(LOGO_PATH)))
-    ui=OrbisUI(AudioAnalyzer()); ui.show(); sys.exit(app.exec())
+    ui=OrbisUI(None); ui.show(); sys.exit(app.exec())
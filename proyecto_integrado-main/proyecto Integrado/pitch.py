@@ -0,0 +1,207 @@
+"""
+pitch  – streaming pitch / dominant-frequency tracker on the shared FFT
+• Harmonic product spectrum (sum of log-magnitudes at k, 2k … Hk) over a
+  precomputed gather table → one vectorized pass per frame, no extra FFT.
+• f0 is refined from the interpolated harmonic partials, so the estimate
+  does not depend on the block length PortAudio happened to deliver.
+• A candidate only counts if its own fundamental bin carries energy
+  (≥ FUND_FLOOR of the spectrum peak) and lies ≥ MIN_BINS bins up, so a
+  pure tone or a Hann main lobe cannot pose as a harmonic series of some
+  sub-harmonic.  No such candidate, or the spectrum peak / a fundamental-
+  grade peak under those MIN_BINS (small FFTs: too close to DC to resolve) →
+  unvoiced, and AudioAnalyzer falls back to the raw spectral peak.
+  Missing-fundamental tones read as their lowest present partial.
+• Tracking state (octave-jump hysteresis, median, log-frequency smoothing,
+  short hold through unvoiced frames) keeps the value stable for the orb
+  and the Blender DominantFreq socket.
+• `python pitch.py` sweeps sines over 512 … 16384-point FFTs (regression
+  check: a voiced estimate must be within 3 %; exit code 1 otherwise).
+"""
+from __future__ import annotations
+
+from collections import deque
+
+import numpy as np
+
+_EPS = 1e-12
+FUND_FLOOR = 0.05       # fundamental (3-bin max) vs spectrum peak: −26 dB, under Hann's −31 dB sidelobes
+MIN_BINS   = 4          # Hann main lobe is 4 bins wide: closer partials are not resolved
+
+
+class PitchTracker:
+    """update(mag, sample_rate) → dict(pitch, confidence, voiced, partials)."""
+
+    def __init__(
+        self,
+        f_min: float = 40.0,
+        f_max: float = 2000.0,
+        harmonics: int = 5,
+        min_confidence: float = 0.5,
+        hold_frames: int = 4,
+        median: int = 5,
+        smoothing: float = 0.5,
+    ):
+        self.f_min, self.f_max = f_min, f_max
+        self.harmonics      = harmonics
+        self.min_confidence = min_confidence
+        self.hold_frames    = hold_frames
+        self.smoothing      = smoothing          # 0 = raw … 1 = frozen
+        self._hist   = deque(maxlen=median)
+        self._plan_key = None
+        self.reset()
+
+    def reset(self) -> None:
+        self.pitch, self.confidence = 0.0, 0.0
+        self.partials: list[tuple[float, float]] = []
+        self._miss = self._jump = 0
+        self._hist.clear()
+
+    # -----------------------------------------------------------------------
+    def _plan(self, n_bins: int, sample_rate: float) -> None:
+        """Gather table for the HPS; rebuilt only if the spectrum shape changes."""
+        if self._plan_key == (n_bins, sample_rate):
+            return
+        df = sample_rate / (2 * (n_bins - 1))
+        h  = np.arange(1, self.harmonics + 1)
+        k_lo = max(int(self.f_min / df), MIN_BINS)
+        k_hi = min(int(self.f_max / df), (n_bins - 2) // self.harmonics)
+        self._k   = np.arange(k_lo, max(k_lo, k_hi) + 1)
+        self._k_min = max(int(self.f_min / df), 1)       # < k_lo only when MIN_BINS raised it
+        self._idx = self._k[:, None] * h[None, :]
+        self._h   = h
+        self._df  = df
+        self._plan_key = (n_bins, sample_rate)
+
+    def _estimate(self, mag: np.ndarray):
+        """Single-frame f0, confidence and partials."""
+        # −60 dB floor: absent harmonics all score the same instead of being
+        # ranked by tiny leakage differences
+        peak = mag.max()
+        logm = np.log(np.maximum(mag, 1e-3 * peak) + _EPS)
+        # 3-bin max → harmonics that fall between bins still line up
+        wide = np.maximum(logm, np.maximum(np.r_[logm[1:], -np.inf], np.r_[-np.inf, logm[:-1]]))
+        # fundamental = a local maximum within ±1 bin (the flank of a lower
+        # tone's main lobe does not count); 3-bin max of the peaks only
+        top  = np.where((mag >= np.r_[0.0, mag[:-1]]) & (mag >= np.r_[mag[1:], 0.0]), mag, 0.0)
+        mag3 = np.maximum(top, np.maximum(np.r_[top[1:], 0.0], np.r_[0.0, top[:-1]]))
+        # only candidates whose own fundamental is there: leakage and empty
+        # sub-harmonic bins would otherwise win on the floored log spectrum
+        live = mag3[self._k] >= FUND_FLOOR * peak
+        if (not live.any() or int(np.argmax(mag)) < self._k[0]
+                or top[self._k_min:self._k[0]].max(initial=0.0) >= FUND_FLOOR * peak):
+            return 0.0, 0.0, []
+        hps  = np.where(live, wide[self._idx].sum(axis=1), -np.inf)
+        k0   = int(self._k[np.argmax(hps)])
+
+        # octave check: a real sub-harmonic at k0/2 means HPS picked 2·f0
+        half = k0 // 2
+        series = mag[np.minimum(self._h * k0, len(mag) - 1)].max()
+        if half >= self._k[0] and mag[half - 1:half + 2].max() > 0.2 * series:
+            k0 = half
+
+        # sub-harmonic check: if every partial that carries energy is a multiple
+        # of g > 1 (a pure sine: only h = g), the real f0 is that g-th partial
+        pk = np.empty(len(self._h), int)
+        for i, h in enumerate(self._h):
+            lo = max(h * k0 - h // 2 - 1, 0)
+            seg = mag[lo:h * k0 + h // 2 + 2]
+            pk[i] = lo + int(np.argmax(seg)) if len(seg) else 0
+        amp = mag[pk]
+        g = int(np.gcd.reduce(self._h[amp > 0.1 * amp.max()])) if amp.max() > 0 else 1
+        if g > 1:
+            k0 = int(pk[g - 1])
+        if mag3[k0] < FUND_FLOOR * peak:                # not reliable: let the caller use the raw peak
+            return 0.0, 0.0, []
+
+        # refine each partial: local max ±1 bin, parabolic interp in log-mag
+        c   = np.clip(np.rint(self._h * k0).astype(int), 1, len(mag) - 2)
+        nb  = np.clip(c[:, None] + np.arange(-1, 2)[None, :], 1, len(mag) - 2)
+        pk  = nb[np.arange(len(c)), np.argmax(mag[nb], axis=1)]
+        a, b, g = logm[pk - 1], logm[pk], logm[pk + 1]
+        den = a - 2 * b + g
+        off = np.where(np.abs(den) > _EPS, 0.5 * (a - g) / np.where(den == 0, 1, den), 0.0)
+        f_h = (pk + np.clip(off, -0.5, 0.5)) * self._df
+        w   = mag[pk] ** 2
+        f0  = float(np.sum(w * f_h / self._h) / (np.sum(w) + _EPS))
+
+        # confidence: share of energy carried by the partials (±1 bin each)
+        lo, hi = self._k[0], min(int(pk[-1]) + 2, len(mag))
+        total  = float(np.sum(mag[lo:hi] ** 2)) + _EPS
+        near   = np.unique(np.clip(pk[:, None] + np.arange(-1, 2)[None, :], 0, len(mag) - 1))
+        share  = float(np.sum(mag[near] ** 2)) / total
+        cover  = len(near) / max(hi - lo, 1)           # what a flat spectrum would score
+        conf   = max(0.0, (share - cover) / (1 - cover)) if cover < 1 else 0.0
+        partials = [(float(f), float(20 * np.log10(m + _EPS))) for f, m in zip(f_h, mag[pk])]
+        return f0, min(conf, 1.0), partials
+
+    # -----------------------------------------------------------------------
+    def update(self, mag: np.ndarray, sample_rate: float) -> dict:
+        mag = np.asarray(mag, float)
+        if len(mag) < 8:
+            return self.values()
+        self._plan(len(mag), float(sample_rate))
+        if not len(self._k) or not np.any(mag):
+            f0, conf, partials = 0.0, 0.0, []
+        else:
+            f0, conf, partials = self._estimate(mag)
+        self.confidence = conf
+
+        if f0 > 0 and conf >= self.min_confidence:
+            self._miss = 0
+            self.partials = partials
+            if self.pitch > 0:
+                octs = np.log2(f0 / self.pitch)
+                if abs(octs) > 0.9 and abs(octs - round(octs)) < 0.05:
+                    # octave jump: only accept it once it has persisted
+                    self._jump += 1
+                    if self._jump < self.hold_frames:
+                        f0 /= 2.0 ** round(octs)
+                    else:
+                        self._hist.clear(); self._jump = 0
+                else:
+                    self._jump = 0
+            self._hist.append(f0)
+            med = float(np.median(self._hist))
+            if self.pitch > 0:
+                # smoothing in log-frequency (cents), not Hz
+                self.pitch *= (med / self.pitch) ** (1 - self.smoothing)
+            else:
+                self.pitch = med
+        else:
+            self._miss += 1
+            if self._miss > self.hold_frames:
+                self.pitch, self.partials = 0.0, []
+                self._hist.clear()
+        return self.values()
+
+    def values(self) -> dict:
+        return {
+            "pitch": self.pitch,
+            "pitch_confidence": self.confidence,
+            "voiced": self.pitch > 0,
+            "partials": self.partials,
+        }
+
+
+if __name__ == "__main__":
+    # regression check: pure sines and 1/h harmonic tones at every FFT size the
+    # cockpit offers; a voiced answer must be within 3 %, unvoiced is allowed
+    import sys
+
+    sr, failures = 44100, 0
+    for n in (512, 1024, 2048, 4096, 8192, 16384):
+        row = []
+        for f in (60.0, 82.4, 110.0, 200.0, 220.0, 300.0, 440.0, 1000.0, 1500.0):
+            for kind, parts in (("sine", 1), ("harm", 8)):
+                p = PitchTracker()
+                for i in range(8):
+                    t = (np.arange(n) + i * n) / sr
+                    x = sum(np.sin(2 * np.pi * h * f * t) / h for h in range(1, parts + 1) if h * f < sr / 2)
+                    v = p.update(np.abs(np.fft.rfft(x * np.hanning(n))), sr)
+                ok = not v["voiced"] or abs(v["pitch"] / f - 1) < 0.03
+                failures += not ok
+                if not ok or not v["voiced"]:
+                    row.append(f"{kind} {f:g}→{v['pitch']:.1f}{'' if ok else ' FAIL'}")
+        print(f"n_fft {n:>5}: " + ("; ".join(row) if row else "all voiced and within 3 %"))
+    print("ok" if not failures else f"{failures} wrong estimates")
+    sys.exit(1 if failures else 0)
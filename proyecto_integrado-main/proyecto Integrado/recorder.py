@@ -0,0 +1,343 @@
+"""
+recorder  – session recorder: raw capture + analysis frames on disk
+• One directory per session (session_YYYYmmdd_HHMMSS/):
+    audio.wav | audio.flac   every block the analyzer received, 24-bit PCM
+                             (bit-exact for 16/24-bit inputs)
+    frames/<column>.<k>.bin  one raw little-endian file per frame field,
+                             one fixed-size row per analysed block
+    events.jsonl             onsets / beats, tagged with their frame row
+    frames.ofc               compact=True: the same frames through
+                             frame_codec (length-prefixed packets)
+    meta.json                columns (dtype, shape, segments), row count,
+                             band centres, drop counters
+• Nested dicts (stereo, features …) are flattened to "stereo.width" etc.
+  A field whose shape changes mid-session (band resolution switched) opens
+  a new segment file at that row; rows where a field is missing or empty
+  (no partials on an unvoiced frame) are NaN.
+• The analyzer thread only enqueues (a block copy / the frame reference)
+  into a bounded queue; a writer thread does all encoding and file I/O.
+  If the disk stalls and the queue fills, items are dropped and counted –
+  never waited for.  Dropped audio is written back as silence so the file
+  stays sample-aligned with the frames' "sample" column.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+import time
+import wave
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+
+from frame_codec import FrameEncoder, frame_fields, write_packet
+
+FRAME_SKIP = {"band_engine", "onsets", "beats", "sample_rate", "channels"}
+INT_COLUMNS = {"seq", "sample"}
+_STOP = object()
+
+
+def flatten_frame(d: Dict[str, Any], prefix: str = "") -> Iterator[tuple[str, Any]]:
+    """(dotted name, value) for every field a frame log stores."""
+    for k, v in d.items():
+        if not prefix and k in FRAME_SKIP:
+            continue
+        if isinstance(v, dict):
+            yield from flatten_frame(v, f"{prefix}{k}.")
+        else:
+            yield prefix + k, v
+
+
+class _Column:
+    """Append-only raw file per field; a new segment whenever the shape changes."""
+
+    def __init__(self, directory: Path, name: str, dtype):
+        self.directory, self.name = directory, name
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        self.segments: list[dict] = []
+        self._file = None
+        self._fill = b""
+
+    def _open(self, shape: tuple, row: int) -> None:
+        if self._file is not None:
+            self._file.close()
+        fname = f"{self.name}.{len(self.segments)}.bin"
+        self.segments.append({"file": fname, "row": row, "shape": list(shape)})
+        self._file = open(self.directory / fname, "wb")
+        missing = np.nan if self.dtype.kind == "f" else -1
+        self._fill = np.full(shape, missing, self.dtype).tobytes()
+
+    def write(self, value, row: int) -> None:
+        if value is None or np.size(value) == 0:
+            if self._file is not None:
+                self._file.write(self._fill)
+            return
+        a = np.asarray(value, self.dtype)
+        if self._file is None or list(a.shape) != self.segments[-1]["shape"]:
+            self._open(a.shape, row)
+        self._file.write(a.tobytes())
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def meta(self) -> dict:
+        return {"dtype": self.dtype.str, "segments": self.segments}
+
+
+class _AudioWriter:
+    """24-bit PCM to WAV (stdlib) or FLAC (optional soundfile)."""
+
+    def __init__(self, path: Path, sample_rate: int, channels: int):
+        self.path, self.channels = path, channels
+        self.frames = 0
+        if path.suffix == ".flac":
+            try:
+                import soundfile as sf
+            except ImportError:
+                raise RuntimeError("FLAC recording needs the 'soundfile' package") from None
+            self._sf = sf.SoundFile(str(path), "w", sample_rate, channels,
+                                    subtype="PCM_24", format="FLAC")
+            self._wav = None
+        else:
+            self._sf = None
+            self._wav = wave.open(str(path), "wb")
+            self._wav.setnchannels(channels)
+            self._wav.setsampwidth(3)
+            self._wav.setframerate(sample_rate)
+
+    def write(self, block: np.ndarray) -> None:
+        if self._sf is not None:
+            self._sf.write(block)
+        else:
+            q = np.clip(np.rint(block * 8388608.0), -8388608, 8388607).astype("<i4")
+            self._wav.writeframesraw(q.view(np.uint8).reshape(-1, 4)[:, :3].tobytes())
+        self.frames += len(block)
+
+    def silence(self, n: int) -> None:
+        self.write(np.zeros((n, self.channels), np.float32))
+
+    def close(self) -> None:
+        if self._sf is not None:
+            self._sf.close()
+        else:
+            self._wav.close()                      # patches the RIFF sizes
+
+
+class SessionRecorder:
+    """
+    start(analyzer) → session directory; stop() → stats.
+    audio_format: "wav" | "flac" | None (frames only); spectrum=False leaves
+    out the FFT column, by far the largest one; compact=True adds the
+    quantized frames.ofc stream (about a tenth of the JSON size).
+    """
+
+    def __init__(self, root: str | Path, audio_format: Optional[str] = "wav",
+                 spectrum: bool = True, max_queue: int = 512, flush_s: float = 1.0,
+                 compact: bool = False):
+        if audio_format not in ("wav", "flac", None):
+            raise ValueError(f"unknown audio format '{audio_format}'")
+        self.root = Path(root)
+        self.audio_format = audio_format
+        self.spectrum = spectrum
+        self.compact = compact
+        self.flush_s = flush_s
+        self.path: Optional[Path] = None
+        self.dropped_audio = self.dropped_frames = 0
+        self.rows = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._analyzer = None
+        self._thread: Optional[threading.Thread] = None
+        self._audio_pos = 0                        # samples handed to the queue (tap side)
+
+    @property
+    def recording(self) -> bool:
+        return self._thread is not None
+
+    # -----------------------------------------------------------------------
+    def start(self, analyzer) -> Path:
+        if self.recording:
+            raise RuntimeError("recorder already running")
+        self.path = self.root / f"session_{time.strftime('%Y%m%d_%H%M%S')}"
+        (self.path / "frames").mkdir(parents=True, exist_ok=False)
+        self.dropped_audio = self.dropped_frames = self.rows = 0
+        self._audio_pos = analyzer._sample_pos
+        self._analyzer = analyzer
+        self._writer = _SessionWriter(self, analyzer)      # opens the files here: errors surface
+        self._thread = threading.Thread(target=self._writer.run, name="orbis-recorder",
+                                        daemon=True)
+        self._thread.start()
+        if self.audio_format:
+            analyzer.add_tap(self._on_block)
+        analyzer.frames.add_listener(self._on_frame)
+        return self.path
+
+    def stop(self) -> dict:
+        """Detach, drain what is queued, close the files."""
+        if not self.recording:
+            return self.stats()
+        self._analyzer.frames.remove_listener(self._on_frame)
+        self._analyzer.remove_tap(self._on_block)
+        self._queue.put(_STOP)                     # blocking: the writer is draining
+        self._thread.join()
+        self._thread = None
+        self._analyzer = None
+        return self.stats()
+
+    def stats(self) -> dict:
+        return dict(rows=self.rows, queue=self._queue.qsize(),
+                    dropped_audio=self.dropped_audio, dropped_frames=self.dropped_frames,
+                    path=str(self.path) if self.path else None)
+
+    # analyzer thread: copy / reference + put_nowait, nothing else
+    def _on_block(self, indata: np.ndarray) -> None:
+        pos, self._audio_pos = self._audio_pos, self._audio_pos + len(indata)
+        try:
+            self._queue.put_nowait(("audio", pos, indata.copy()))
+        except queue.Full:
+            self.dropped_audio += 1
+
+    def _on_frame(self, frame: dict) -> None:
+        try:
+            self._queue.put_nowait(("frame", time.time(), frame))
+        except queue.Full:
+            self.dropped_frames += 1
+
+
+class _SessionWriter:
+    """Owns every file of one session; runs on the recorder's thread."""
+
+    def __init__(self, rec: SessionRecorder, analyzer):
+        self.rec = rec
+        self.dir = rec.path
+        self.sample_rate = analyzer.sample_rate
+        self.channels = analyzer.channels
+        self.start_sample = rec._audio_pos
+        self.columns: Dict[str, _Column] = {}
+        self.bands: list[dict] = []                # [{"row", "centers"}] on every layout change
+        self._centers = None
+        self._meta_dirty = True
+        self.audio = None
+        if rec.audio_format:
+            self.audio = _AudioWriter(self.dir / f"audio.{rec.audio_format}",
+                                      self.sample_rate, self.channels)
+        self.events = open(self.dir / "events.jsonl", "w")
+        self.codec = self.ofc = None
+        if rec.compact:
+            self.codec = FrameEncoder("zlib")
+            self.ofc = open(self.dir / "frames.ofc", "wb")
+        self.meta = dict(created=time.time(), sample_rate=self.sample_rate,
+                         channels=self.channels, start_sample=self.start_sample,
+                         blocksize=analyzer.blocksize,
+                         audio=self.audio.path.name if self.audio else None,
+                         compact="frames.ofc" if self.ofc else None)
+
+    def run(self) -> None:
+        q, last_flush = self.rec._queue, time.monotonic()
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=self.rec.flush_s)
+                except queue.Empty:
+                    item = None
+                if item is _STOP:
+                    break
+                if item is not None:
+                    try:
+                        self._handle(item)
+                    except Exception as exc:       # one bad frame must not end the session
+                        print("SessionRecorder › write error:", exc)
+                if time.monotonic() - last_flush >= self.rec.flush_s:
+                    self._flush()
+                    last_flush = time.monotonic()
+        finally:
+            self._close()
+
+    def _handle(self, item) -> None:
+        if item[0] == "audio":
+            _, pos, block = item
+            gap = pos - (self.start_sample + self.audio.frames)
+            if gap > 0:                            # blocks dropped upstream
+                self.audio.silence(gap)
+            self.audio.write(block)
+        else:
+            self._frame(*item[1:])
+
+    def _frame(self, wall: float, frame: dict) -> None:
+        row = self.rec.rows
+        values = dict(flatten_frame(frame))
+        values["time"] = wall
+        if not self.rec.spectrum:
+            values.pop("fft", None)
+        for name, v in values.items():
+            col = self.columns.get(name)
+            if col is None:
+                if v is None or isinstance(v, str) or np.size(v) == 0:
+                    continue
+                col = self._new_column(name, v, row)
+            col.write(v, row)
+        for name, col in self.columns.items():
+            if name not in values:
+                col.write(None, row)
+        ob = frame.get("band_engine")
+        if ob is not None and (self._centers is None or not np.array_equal(ob.centers, self._centers)):
+            self._centers = ob.centers
+            self.bands.append({"row": row, "fraction": ob.fraction,
+                               "centers": [float(c) for c in ob.centers]})
+            self._meta_dirty = True
+        for kind in ("onsets", "beats"):
+            for ev in frame.get(kind) or ():
+                self.events.write(json.dumps({"kind": kind[:-1], "row": row, **ev}) + "\n")
+        if self.ofc is not None:
+            write_packet(self.ofc, self.codec.encode(frame_fields(frame), frame["seq"]))
+        self.rec.rows = row + 1
+
+    def _new_column(self, name: str, value, row: int) -> _Column:
+        # counters int64, scalars float64, spectra / band vectors float32
+        dtype = "<i8" if name in INT_COLUMNS else "<f8" if np.ndim(value) == 0 else "<f4"
+        col = _Column(self.dir / "frames", name, dtype)
+        if row:                                    # field appears late: pad the rows before it
+            col.write(np.full(np.shape(value), np.nan if dtype != "<i8" else -1), 0)
+            for r in range(1, row):
+                col.write(None, r)
+        self.columns[name] = col
+        self._meta_dirty = True
+        return col
+
+    def _write_meta(self) -> None:
+        meta = dict(self.meta, rows=self.rec.rows,
+                    columns={n: c.meta() for n, c in self.columns.items()},
+                    bands=self.bands,
+                    audio_frames=self.audio.frames if self.audio else 0,
+                    dropped_audio=self.rec.dropped_audio,
+                    dropped_frames=self.rec.dropped_frames)
+        tmp = self.dir / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=1))
+        tmp.replace(self.dir / "meta.json")
+        self._meta_dirty = False
+
+    def _flush(self) -> None:
+        for col in self.columns.values():
+            col.flush()
+        self.events.flush()
+        if self.ofc is not None:
+            self.ofc.flush()
+        if self._meta_dirty:
+            self._write_meta()
+
+    def _close(self) -> None:
+        for col in self.columns.values():
+            col.close()
+        self.events.close()
+        if self.ofc is not None:
+            self.ofc.close()
+        if self.audio is not None:
+            self.audio.close()
+        self._write_meta()
@@ -0,0 +1,288 @@
+"""
+session_replay  – read recorded sessions (recorder.py) back as if they were live
+• SessionReader: memory-maps every column segment lazily, so opening a
+  multi-hour session reads meta.json and events.jsonl only; a frame is a
+  handful of page reads.  Seeks go through the recorded "sample" column
+  with searchsorted (O(log n), touches ~log n pages).
+• frame(i) rebuilds the analyzer snapshot: nested keys ("stereo.width")
+  unflattened, band layout for that row, onsets / beats of that row.
+• SessionPlayer: stands in for an AudioAnalyzer (frames, get_audio_data,
+  subscribe …).  A clock thread advances the position at `speed`
+  (negative = reverse) and publishes the due frame on a FrameChannel, at
+  most `max_fps` per second; events of skipped frames are carried along.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from frames       import FrameChannel
+from octave_bands import BandLayout, band_edges
+
+
+class SessionReader:
+    """Random access to one session directory; len() = analysed frames."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self.sample_rate = int(self.meta["sample_rate"])
+        self.channels = int(self.meta["channels"])
+        self.start_sample = int(self.meta.get("start_sample", 0))
+        self._columns: Dict[str, dict] = self.meta["columns"]
+        for col in self._columns.values():
+            col["rows"] = [s["row"] for s in col["segments"]]
+        self._maps: Dict[tuple, np.memmap] = {}
+        # meta.json is rewritten about once a second: after a crash the
+        # sample column (one int64 per row) knows the real row count
+        sample = self._segment_map("sample", 0)
+        self.rows = len(sample) if sample is not None else int(self.meta["rows"])
+        self._sample = sample
+        self._band_rows = [b["row"] for b in self.meta.get("bands", ())]
+        self._layouts: Dict[int, BandLayout] = {}
+        self._events = self._read_events()
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def audio_path(self) -> Optional[Path]:
+        name = self.meta.get("audio")
+        return self.path / name if name else None
+
+    @property
+    def duration(self) -> float:
+        return self.time_at(self.rows - 1) if self.rows else 0.0
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._columns)
+
+    # -----------------------------------------------------------------------
+    def _segment_map(self, name: str, k: int) -> Optional[np.memmap]:
+        key = (name, k)
+        m = self._maps.get(key)
+        if m is None:
+            col = self._columns.get(name)
+            if col is None or k >= len(col["segments"]):
+                return None
+            seg = col["segments"][k]
+            f = self.path / "frames" / seg["file"]
+            dtype, shape = np.dtype(col["dtype"]), tuple(seg["shape"])
+            n = f.stat().st_size // (dtype.itemsize * int(np.prod(shape, dtype=int)))
+            if n == 0:
+                return None
+            m = np.memmap(f, dtype=dtype, mode="r", shape=(n, *shape))
+            self._maps[key] = m
+        return m
+
+    def value(self, name: str, i: int) -> Any:
+        """Field `name` at row i (None where it was missing)."""
+        col = self._columns.get(name)
+        if col is None:
+            return None
+        segs = col["segments"]
+        k = bisect.bisect_right(col["rows"], i) - 1
+        if k < 0:
+            return None
+        m = self._segment_map(name, k)
+        j = i - segs[k]["row"]
+        if m is None or j >= len(m):
+            return None
+        v = np.array(m[j])                         # copy: frames outlive the map
+        if v.ndim == 0:
+            v = v.item()
+            if isinstance(v, float) and v != v:
+                return None
+            return v
+        return None if v.dtype.kind == "f" and np.isnan(v).all() else v
+
+    # -----------------------------------------------------------------------
+    def time_at(self, i: int) -> float:
+        """Stream time (s since the recording started) of row i."""
+        if self._sample is None:
+            return 0.0
+        return (int(self._sample[i]) - self.start_sample) / self.sample_rate
+
+    def index_at(self, t: float) -> int:
+        """Last row at or before t (binary search on the memory-mapped sample column)."""
+        if self._sample is None or not self.rows:
+            return 0
+        s = self.start_sample + t * self.sample_rate
+        i = int(np.searchsorted(self._sample[:self.rows], s, side="right")) - 1
+        return min(max(i, 0), self.rows - 1)
+
+    def layout(self, i: int) -> Optional[BandLayout]:
+        k = bisect.bisect_right(self._band_rows, i) - 1
+        if k < 0:
+            return None
+        ob = self._layouts.get(k)
+        if ob is None:
+            b = self.meta["bands"][k]
+            fc = np.asarray(b["centers"])
+            ob = BandLayout(fc, *band_edges(b["fraction"], fc), b["fraction"])
+            self._layouts[k] = ob
+        return ob
+
+    def _read_events(self) -> dict:
+        out: dict = {"onset": {}, "beat": {}}
+        f = self.path / "events.jsonl"
+        if f.exists():
+            for line in f.read_text().splitlines():
+                try:
+                    ev = json.loads(line)
+                except ValueError:                 # last line of a crashed session
+                    continue
+                kind, row = ev.pop("kind"), ev.pop("row")
+                out.setdefault(kind, {}).setdefault(row, []).append(ev)
+        return out
+
+    def events(self, kind: str, i0: int, i1: int) -> list[dict]:
+        """Events of rows i0 … i1 (inclusive)."""
+        rows = self._events.get(kind, {})
+        if i1 - i0 > len(rows):
+            return [e for r in sorted(rows) if i0 <= r <= i1 for e in rows[r]]
+        return [e for r in range(i0, i1 + 1) for e in rows.get(r, ())]
+
+    # -----------------------------------------------------------------------
+    def frame(self, i: int, since: Optional[int] = None) -> Dict[str, Any]:
+        """Analyzer snapshot of row i; onsets / beats of rows since+1 … i."""
+        fr: Dict[str, Any] = {"stereo": None, "channel_bands": None}
+        for name in self._columns:
+            v = self.value(name, i)
+            *path, key = name.split(".")
+            d = fr
+            for p in path:
+                if d.get(p) is None:
+                    d[p] = {}
+                d = d[p]
+            d[key] = v
+        fr.setdefault("features", {})
+        fr["sample_rate"] = self.sample_rate
+        fr["channels"] = self.channels
+        fr["band_engine"] = self.layout(i)
+        lo = i if since is None else since + 1
+        fr["onsets"] = self.events("onset", lo, i)
+        fr["beats"] = self.events("beat", lo, i)
+        fr["row"] = i
+        fr["t"] = self.time_at(i)
+        return fr
+
+
+class SessionPlayer:
+    """
+    Plays a SessionReader into a FrameChannel.  Duck-types the parts of
+    AudioAnalyzer the UI uses, so views and exports run unchanged.
+    """
+
+    def __init__(self, reader: SessionReader, speed: float = 1.0, max_fps: float = 60.0):
+        self.reader = reader
+        self.sample_rate = reader.sample_rate
+        self.channels = reader.channels
+        self.frames = FrameChannel()
+        self.speed = float(speed)
+        self.max_fps = max_fps
+        self.playing = False
+        self._t = 0.0
+        self._row: Optional[int] = None            # row last published
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._alive = False
+
+    @property
+    def position(self) -> float:
+        return self._t
+
+    @property
+    def duration(self) -> float:
+        return self.reader.duration
+
+    # -----------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the clock thread and play (analyzer-compatible)."""
+        if self._thread is None:
+            self._alive = True
+            self._thread = threading.Thread(target=self._run, name="orbis-replay", daemon=True)
+            self._thread.start()
+        self.play()
+
+    def stop(self) -> None:
+        self._alive = False
+        self.playing = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def play(self) -> None:
+        if self.speed > 0 and self._t >= self.duration:
+            self.seek(0.0)
+        self.playing = True
+
+    def pause(self) -> None:
+        self.playing = False
+
+    def seek(self, t: float) -> None:
+        """Jump to t seconds and publish that frame now (works while paused)."""
+        with self._lock:
+            self._t = min(max(float(t), 0.0), self.duration)
+            self._publish(self.reader.index_at(self._t), jump=True)
+
+    # -----------------------------------------------------------------------
+    def _run(self) -> None:
+        period = 1.0 / self.max_fps
+        last = time.perf_counter()
+        while self._alive:
+            time.sleep(period)
+            now = time.perf_counter()
+            dt, last = now - last, now
+            if not self.playing:
+                continue
+            with self._lock:
+                t = self._t + self.speed * dt
+                if not 0.0 <= t <= self.duration:
+                    t = min(max(t, 0.0), self.duration)
+                    self.playing = False           # end (or start) of the session
+                self._t = t
+                i = self.reader.index_at(t)
+                if i != self._row:
+                    self._publish(i)
+
+    def _publish(self, i: int, jump: bool = False) -> None:
+        if not self.reader.rows:
+            return
+        prev = self._row
+        # events only when playing forward; skipped rows hand theirs on
+        forward = not jump and prev is not None and prev < i
+        fr = self.reader.frame(i, prev if forward else None)
+        if not forward:
+            fr["onsets"], fr["beats"] = [], []
+        # restamp on today's clock, keeping the recorded capture → analysis latency
+        lat = (fr.get("t_done") or 0.0) - (fr.get("t_adc") or 0.0)
+        fr["t_done"] = time.monotonic()
+        fr["t_adc"] = fr["t_done"] - max(lat, 0.0)
+        self._row = i
+        self.frames.publish(fr)
+
+    # --- AudioAnalyzer surface ---------------------------------------------
+    def get_audio_data(self) -> Dict[str, Any]:
+        fr = self.frames.latest()
+        if fr is None and self.reader.rows:
+            fr = self.reader.frame(0)
+            fr["onsets"], fr["beats"] = [], []
+        return fr or {}
+
+    def subscribe(self, names):
+        """Features are whatever was recorded; nothing to activate."""
+        return None
+
+    def set_band_resolution(self, fraction: int) -> None:
+        """Recorded bands are replayed as they were captured."""
+
+    def reset_peak_hold(self) -> None:
+        pass
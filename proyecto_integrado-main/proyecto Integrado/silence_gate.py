@@ -0,0 +1,52 @@
+"""
+silence_gate  – block-level silence detection with hysteresis
+• update(level_db, n) → silent.  The gate closes once the block level has
+  stayed under `close_db` for `hold_s`, and opens again on the first block
+  at or over `open_db` – no hold on the way back, so the block that brings
+  the signal back is analysed in full.  open_db > close_db keeps a noise
+  floor hovering at the threshold from flapping.
+• due(n) → True once per `idle_s` while closed: the analyzer still runs a
+  full analysis at that reduced rate (spectrum / features do not freeze
+  forever), every other silent block is metering only.
+• Consumers key on the frame's "silent" flag: draw / write the first silent
+  frame, then nothing until a frame with silent = False arrives.
+"""
+from __future__ import annotations
+
+
+class SilenceGate:
+    """Per-stream state; sample counts, so any block size works."""
+
+    def __init__(self, sample_rate: int, open_db: float = -60.0, close_db: float = -66.0,
+                 hold_s: float = 2.0, idle_s: float = 1.0):
+        if close_db > open_db:
+            raise ValueError(f"close_db ({close_db}) must not be above open_db ({open_db})")
+        self.sample_rate = int(sample_rate)
+        self.open_db, self.close_db = float(open_db), float(close_db)
+        self.hold_s, self.idle_s = float(hold_s), float(idle_s)
+        self.silent = False
+        self.closed_blocks = 0               # silent blocks seen (counter, for health views)
+        self._quiet = 0                      # samples under close_db while open
+        self._idle = 0                       # samples since the last full analysis while closed
+
+    def update(self, level_db: float, n: int) -> bool:
+        if level_db >= self.open_db or (not self.silent and level_db >= self.close_db):
+            self.silent, self._quiet = False, 0
+        elif not self.silent:
+            self._quiet += n
+            if self._quiet >= self.hold_s * self.sample_rate:
+                self.silent, self._idle = True, 0
+        if self.silent:
+            self.closed_blocks += 1
+        return self.silent
+
+    def due(self, n: int) -> bool:
+        """While closed: True for the block that completes another idle_s."""
+        self._idle += n
+        if self._idle < self.idle_s * self.sample_rate:
+            return False
+        self._idle = 0
+        return True
+
+    def reset(self) -> None:
+        self.silent, self._quiet, self._idle = False, 0, 0
@@ -0,0 +1,341 @@
+"""
+sources  – where the analyzer's blocks come from
+• AudioSource: start(callback) / stop(); callback(block, t_adc) gets float32
+  (samples, channels) arrays of `blocksize` frames and the capture time of
+  their first sample on the time.monotonic() clock (PortAudio's ADC time
+  mapped onto it; the pacing clock for file / synthetic sources).
+• PortAudioSource: live input (sounddevice imported lazily, so headless
+  boxes and tests never touch PortAudio); LoopbackSource picks the
+  system-output capture device ("Stereo Mix", "Monitor of …", …).
+  Streams open and close under PA_LOCK and are counted in open_streams,
+  so device_manager only re-initialises PortAudio when none is open;
+  stalled() tells a consumer its device went away.
+• FileSource: WAV (stdlib) or anything soundfile reads; realtime=True paces
+  blocks like a live input, realtime=False runs as fast as the DSP allows.
+  The last partial block is zero-padded (looping wraps it into the start).
+• SyntheticSource: sine / noise / sweep / clicks generator for benchmarks
+  and soak tests on machines without audio hardware.
+"""
+from __future__ import annotations
+
+import threading
+import time
+import warnings
+import wave
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+
+Callback = Callable[[np.ndarray, float], None]
+
+# capture devices that record what the machine plays (Windows / PulseAudio / macOS)
+LOOPBACK_NAMES = ("Stereo Mix", "Monitor of", "Loopback", "BlackHole", "What U Hear")
+# PortAudio re-initialisation (device_manager) vs. streams being opened / closed
+PA_LOCK = threading.RLock()
+
+
+class AudioSource:
+    """Base class; blocksize=None lets the consumer (AudioAnalyzer) choose."""
+
+    def __init__(self, sample_rate: int, channels: int = 1, blocksize: Optional[int] = None,
+                 name: str = ""):
+        self.sample_rate = int(sample_rate)
+        self.channels    = int(channels)
+        self.blocksize   = blocksize
+        self.name        = name or type(self).__name__
+        self.overflows   = 0
+        self.running     = False
+
+    def open(self) -> None:
+        """Acquire the device once blocksize is known (errors surface here)."""
+
+    def start(self, callback: Callback) -> None:
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        self.running = False
+
+    def stalled(self, timeout: float) -> bool:
+        """Running but delivering nothing for `timeout` s (lost device); False by default."""
+        return False
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Live input
+# ═══════════════════════════════════════════════════════════════════════════
+def find_loopback_device() -> Optional[int]:
+    """Index of the first input device that captures the system output, or None."""
+    import sounddevice as sd
+    return next((i for i, d in enumerate(sd.query_devices())
+                 if d["max_input_channels"] > 0
+                 and any(k in d["name"] for k in LOOPBACK_NAMES)), None)
+
+
+class PortAudioSource(AudioSource):
+    """
+    sounddevice InputStream.  The stream is opened in open() (called by the
+    consumer once blocksize is known) so PortAudioError surfaces there.
+    device=None keeps the old behaviour: prefer a loopback device, else the
+    PortAudio default input.
+    """
+
+    open_streams = 0                            # class-wide, changed under PA_LOCK
+
+    def __init__(self, device: Optional[int | str] = None, sample_rate: int = 44100,
+                 channels: int = 1, blocksize: Optional[int] = None):
+        super().__init__(sample_rate, channels, blocksize, name=f"portaudio-{device}")
+        self.device  = device
+        self._stream = None
+        self._cb: Optional[Callback] = None
+        self.last_block = 0.0                  # time.monotonic() of the latest callback
+
+    def open(self) -> None:
+        import sounddevice as sd
+        with PA_LOCK:
+            device = self.device
+            if device is None:
+                device = find_loopback_device()
+                if device is not None:
+                    print(f"✓ Using input device: {sd.query_devices(device)['name']}  (index {device})")
+                else:
+                    warnings.warn("No loopback input found – using system-default input device")
+            self._stream = sd.InputStream(
+                callback=self._on_block,
+                channels=self.channels,
+                samplerate=self.sample_rate,
+                blocksize=self.blocksize or 0,
+                device=device,
+            )
+            PortAudioSource.open_streams += 1
+
+    def _on_block(self, indata, frames, time_info, status):
+        now = self.last_block = time.monotonic()
+        if status and status.input_overflow:
+            self.overflows += 1
+        # ADC time is on the stream clock: shift it onto monotonic via currentTime.
+        # Host APIs that report 0 fall back to "the block just finished arriving".
+        adc, cur = time_info.inputBufferAdcTime, time_info.currentTime
+        t_adc = now - (cur - adc) if adc and cur else now - frames / self.sample_rate
+        cb = self._cb
+        if cb is not None:
+            cb(indata, t_adc)
+
+    def start(self, callback: Callback) -> None:
+        if self._stream is None:
+            self.open()
+        self._cb = callback
+        self.last_block = time.monotonic()
+        self._stream.start()
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+        if self._stream is None:
+            return
+        stream, self._stream = self._stream, None
+        with PA_LOCK:
+            try:
+                stream.stop()                      # raises when the device is already gone
+            finally:
+                try:
+                    stream.close()
+                finally:
+                    PortAudioSource.open_streams -= 1
+
+    def stalled(self, timeout: float) -> bool:
+        # unplugged: most host APIs end the stream, some just stop calling back
+        if not self.running:
+            return False
+        stream = self._stream
+        return stream is None or not stream.active or time.monotonic() - self.last_block > timeout
+
+
+class LoopbackSource(PortAudioSource):
+    """PortAudioSource on the system-output capture device (fails if there is none)."""
+
+    def open(self) -> None:
+        if self.device is None:
+            self.device = find_loopback_device()
+            if self.device is None:
+                raise RuntimeError("no loopback capture device found "
+                                   f"(looked for {', '.join(LOOPBACK_NAMES)})")
+        super().open()
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Thread-driven sources (file, synthetic)
+# ═══════════════════════════════════════════════════════════════════════════
+class _ThreadedSource(AudioSource):
+    """Runs _blocks() on a worker thread, optionally paced to the wall clock."""
+
+    def __init__(self, sample_rate: int, channels: int, blocksize: Optional[int],
+                 realtime: bool, name: str):
+        super().__init__(sample_rate, channels, blocksize, name)
+        self.realtime = realtime
+        self.finished = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _blocks(self, n: int) -> Iterator[np.ndarray]:
+        raise NotImplementedError
+
+    def run(self, callback: Callback) -> int:
+        """Blocking loop (used by the thread, or directly for offline runs); returns frames."""
+        n = self.blocksize or 1024
+        self.running = True
+        self.finished.clear()
+        period = n / self.sample_rate
+        t_next, total = time.monotonic(), 0
+        try:
+            for block in self._blocks(n):
+                if not self.running:
+                    break
+                if self.realtime:
+                    t_next += period
+                    delay = t_next - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    elif delay < -period:             # consumer too slow: count it like PortAudio
+                        self.overflows += 1
+                        t_next = time.monotonic()
+                    t_adc = t_next - period           # when a live input would have captured it
+                else:
+                    t_adc = time.monotonic()
+                callback(block, t_adc)
+                total += len(block)
+        finally:
+            self.running = False
+            self.finished.set()
+        return total
+
+    def start(self, callback: Callback) -> None:
+        self._thread = threading.Thread(target=self.run, args=(callback,),
+                                        name=f"source-{self.name}", daemon=True)
+        self.running = True
+        self.finished.clear()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the source is exhausted (never, for endless sources)."""
+        return self.finished.wait(timeout)
+
+
+def read_audio(path: str | Path) -> tuple[np.ndarray, int]:
+    """(samples, channels) float32 in [-1, 1] and the sample rate."""
+    path = Path(path)
+    if path.suffix.lower() == ".wav":
+        with wave.open(str(path), "rb") as w:
+            sw, ch, sr = w.getsampwidth(), w.getnchannels(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+        if sw == 1:
+            x = (np.frombuffer(raw, np.uint8).astype(np.float32) - 128) / 128
+        elif sw == 2:
+            x = np.frombuffer(raw, "<i2").astype(np.float32) / 32768
+        elif sw == 3:
+            b = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+            i = (b[:, 0].astype(np.int32) | b[:, 1].astype(np.int32) << 8
+                 | b[:, 2].astype(np.int32) << 16)
+            x = (np.where(i & 0x800000, i - 0x1000000, i) / 8388608).astype(np.float32)
+        elif sw == 4:
+            x = np.frombuffer(raw, "<i4").astype(np.float32) / 2147483648
+        else:
+            raise ValueError(f"unsupported WAV sample width {sw}")
+        return x.reshape(-1, ch), sr
+    try:
+        import soundfile as sf                     # optional: FLAC, OGG, AIFF …
+    except ImportError:
+        raise RuntimeError(f"reading {path.suffix} needs the 'soundfile' package") from None
+    x, sr = sf.read(str(path), dtype="float32", always_2d=True)
+    return x, sr
+
+
+class FileSource(_ThreadedSource):
+    """Plays a file as if it were an input; realtime=False = fast offline reader."""
+
+    def __init__(self, path: str | Path, realtime: bool = True, loop: bool = False,
+                 blocksize: Optional[int] = None, channels: Optional[int] = None):
+        self.path = Path(path)
+        self._data, sr = read_audio(self.path)
+        if channels is not None and channels != self._data.shape[1]:
+            # fold to mono / duplicate mono so the consumer gets what it asked for
+            mono = self._data.mean(axis=1, keepdims=True)
+            self._data = np.repeat(mono, channels, axis=1)
+        super().__init__(sr, self._data.shape[1], blocksize, realtime, self.path.name)
+        self.loop = loop
+
+    @property
+    def duration(self) -> float:
+        return len(self._data) / self.sample_rate
+
+    def _blocks(self, n: int) -> Iterator[np.ndarray]:
+        # the last partial block is zero-padded (a file shorter than one block still plays);
+        # when looping it wraps into the start instead, so the loop point has no gap
+        data, total = self._data, len(self._data)
+        pos = 0
+        while pos < total:
+            if pos + n <= total:
+                yield data[pos:pos + n]
+            elif self.loop:
+                yield data.take(np.arange(pos, pos + n), axis=0, mode="wrap")
+            else:
+                yield np.concatenate([data[pos:], np.zeros((pos + n - total, data.shape[1]), data.dtype)])
+            pos += n
+            if self.loop:
+                pos %= total
+
+
+class SyntheticSource(_ThreadedSource):
+    """
+    kind: "sine" | "noise" | "sweep" | "clicks" | "mix" (sine + clicks + noise).
+    duration=None runs until stop(); stereo output is decorrelated by `width`.
+    """
+
+    KINDS = ("sine", "noise", "sweep", "clicks", "mix")
+
+    def __init__(self, kind: str = "sine", freq: float = 440.0, level_db: float = -12.0,
+                 sample_rate: int = 44100, channels: int = 1, blocksize: Optional[int] = None,
+                 duration: Optional[float] = None, realtime: bool = True, bpm: float = 120.0,
+                 width: float = 0.0, seed: int = 0):
+        if kind not in self.KINDS:
+            raise ValueError(f"unknown synthetic kind '{kind}', expected one of {self.KINDS}")
+        super().__init__(sample_rate, channels, blocksize, realtime, f"synthetic-{kind}")
+        self.kind, self.freq, self.bpm, self.width = kind, freq, bpm, width
+        self.amp = 10 ** (level_db / 20)
+        self.duration = duration
+        self._rng = np.random.default_rng(seed)
+
+    def _mono(self, t: np.ndarray) -> np.ndarray:
+        sr, kind = self.sample_rate, self.kind
+        if kind == "noise":
+            return self._rng.standard_normal(len(t)) * 0.5
+        if kind == "sweep":                           # 20 Hz → 20 kHz log sweep, 10 s period
+            T, f0, f1 = 10.0, 20.0, min(20000.0, sr / 2)
+            k = np.log(f1 / f0)
+            tt = t % T
+            return np.sin(2 * np.pi * f0 * T / k * (np.exp(tt / T * k) - 1))
+        sine = np.sin(2 * np.pi * self.freq * t)
+        period = 60.0 / self.bpm
+        age = t % period
+        click = np.exp(-age * 60) * np.sin(2 * np.pi * 80 * age)
+        if kind == "sine":
+            return sine
+        if kind == "clicks":
+            return click
+        return 0.25 * sine + 0.7 * click + 0.01 * self._rng.standard_normal(len(t))
+
+    def _blocks(self, n: int) -> Iterator[np.ndarray]:
+        total = None if self.duration is None else int(self.duration * self.sample_rate)
+        pos = 0
+        while total is None or pos + n <= total:
+            t = (pos + np.arange(n)) / self.sample_rate
+            m = self._mono(t)
+            out = np.repeat(m[:, None], self.channels, axis=1)
+            if self.channels > 1 and self.width > 0:
+                out += self.width * 0.5 * self._rng.standard_normal(out.shape)
+            yield (self.amp * out).astype(np.float32)
+            pos += n
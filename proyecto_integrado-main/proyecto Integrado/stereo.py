@@ -0,0 +1,60 @@
+"""
+stereo  – mid/side, phase correlation and stereo width on a channels × samples block
+• Broadband meters are plain dot products on the block the analyzer already
+  holds; per-band correlation reuses its batched rFFT (L·R* cross-spectrum
+  through the same band weights) – no extra FFT.
+• correlation: +1 mono … 0 unrelated … −1 out of phase, integrated with a
+  time constant like a hardware correlation meter.
+• mid / side levels (M = (L+R)/2, S = (L−R)/2) in dBFS, derived from the
+  same dot products.
+• width: side share of the energy, 0 mono … 0.5 fully decorrelated … 1 anti-phase.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+_EPS = 1e-20
+
+
+class StereoMeter:
+    """process(x, spec=None, bands=None) → dict(correlation, width, balance, band_correlation)."""
+
+    def __init__(self, sample_rate: int, tau_s: float = 0.3):
+        self.sample_rate = int(sample_rate)
+        self.tau_s = tau_s
+        self.correlation = 0.0
+        self.width = 0.0
+        self.balance = 0.0                   # R − L in dB
+        self.mid_level = self.side_level = -200.0
+        self.band_correlation: np.ndarray | None = None
+
+    def process(self, x: np.ndarray, spec: np.ndarray | None = None, bands=None) -> dict:
+        x = np.asarray(x, float)
+        ll, rr, lr = np.dot(x[0], x[0]), np.dot(x[1], x[1]), np.dot(x[0], x[1])
+        n = x.shape[1]
+        a = float(np.exp(-n / (self.tau_s * self.sample_rate)))
+        em, es = (ll + rr + 2 * lr) / (4 * n), (ll + rr - 2 * lr) / (4 * n)
+        self.mid_level  = float(10 * np.log10(max(em, _EPS)))
+        self.side_level = float(10 * np.log10(max(es, _EPS)))
+
+        if ll > _EPS and rr > _EPS:          # silence on either side: hold the reading
+            corr = lr / np.sqrt(ll * rr)
+            self.correlation = a * self.correlation + (1 - a) * float(corr)
+            self.width = a * self.width + (1 - a) * float(es / (em + es))
+            self.balance = float(10 * np.log10(rr / ll))
+
+        if spec is not None and bands is not None:
+            p = bands.band_sum(np.abs(spec[:2]) ** 2)
+            c = bands.band_sum((spec[0] * np.conj(spec[1])).real)
+            self.band_correlation = c / np.sqrt(np.maximum(p[0] * p[1], _EPS))
+        return self.values()
+
+    def values(self) -> dict:
+        return {
+            "correlation": self.correlation,
+            "width": self.width,
+            "balance": self.balance,
+            "mid_level": self.mid_level,
+            "side_level": self.side_level,
+            "band_correlation": self.band_correlation,
+        }
@@ -0,0 +1,279 @@
+"""
+timeline_export  – analysis frames → columnar timeline files (CSV / Parquet / Arrow / NPZ)
+• TimelineExporter.attach(analyzer): frames go through a bounded queue to a
+  writer thread that appends one row group per `row_group` frames; the
+  analyzer never waits for the disk (block=True for offline runs, where
+  waiting beats dropping).
+• One row per analysed block: time (stream seconds), every scalar field
+  (nested dicts flattened: "stereo.width", "features.flux"), band levels as
+  "bands.<label>", short vectors as "<name>.<i>", plus per-frame onset
+  strength / beat flag.  The FFT is left out.
+• The first row group fixes the schema (CSV header / Arrow schema); fields
+  that only appear later are ignored, missing values are NaN.
+• csv: stdlib.  parquet / arrow (Feather v2): pyarrow, optional, one row
+  group / record batch per chunk.  npz: every chunk appends
+  "<column>/<k>.npy" entries to the zip (column order in "_columns");
+  read_timeline() joins them.
+• export_file(): the offline analyzer – a FileSource read as fast as the
+  DSP runs, straight into a timeline.  Also `python timeline_export.py in.wav out.parquet`.
+"""
+from __future__ import annotations
+
+import csv
+import queue
+import sys
+import threading
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from recorder import INT_COLUMNS, flatten_frame
+
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow",
+           ".feather": "arrow", ".npz": "npz"}
+INT_FIELDS = INT_COLUMNS | {"beat"}
+_STOP = object()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise RuntimeError("Parquet / Arrow export needs the 'pyarrow' package") from None
+    return pa
+
+
+def frame_row(frame: Dict[str, Any], max_width: int = 16) -> Dict[str, float]:
+    """Flat {column: number} view of one analyzer snapshot."""
+    sr = frame["sample_rate"]
+    row: Dict[str, float] = {"time": frame["sample"] / sr}
+    ob = frame.get("band_engine")
+    for name, v in flatten_frame(frame):
+        if name == "fft" or v is None or isinstance(v, str):
+            continue
+        if np.ndim(v) == 0:
+            row[name] = v
+        elif name == "bands" and ob is not None and len(ob) == len(v):
+            row.update(zip((f"bands.{lab}" for lab in ob.labels), v))
+        elif np.ndim(v) == 1 and len(v) <= max_width:
+            row.update((f"{name}.{i}", x) for i, x in enumerate(v))
+    row["onset"] = max((o["strength"] for o in frame["onsets"]), default=0.0)
+    row["beat"] = int(bool(frame["beats"]))
+    return row
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+#  Sinks: open(columns, dtypes) once, write(arrays) per row group, close()
+# ═══════════════════════════════════════════════════════════════════════════
+class _CsvSink:
+    def __init__(self, path: Path):
+        self._f = open(path, "w", newline="")
+        self._w = csv.writer(self._f)
+
+    def open(self, columns, dtypes) -> None:
+        self._w.writerow(columns)
+
+    def write(self, arrays) -> None:
+        cols = [[("" if x != x else f"{x:.7g}") if a.dtype.kind == "f" else str(x)
+                 for x in a.tolist()] for a in arrays]
+        self._w.writerows(zip(*cols))
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class _ArrowSink:
+    def __init__(self, path: Path, fmt: str):
+        self.path, self.fmt = path, fmt
+        self._pa = _pyarrow()
+        self._writer = None
+
+    def open(self, columns, dtypes) -> None:
+        pa = self._pa
+        self._schema = pa.schema([(c, pa.int64() if d.kind == "i" else pa.float64())
+                                  for c, d in zip(columns, dtypes)])
+        if self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(str(self.path), self._schema)
+        else:
+            self._writer = pa.ipc.new_file(str(self.path), self._schema)
+
+    def write(self, arrays) -> None:
+        self._writer.write_table(self._pa.Table.from_arrays(list(arrays), schema=self._schema))
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _NpzSink:
+    def __init__(self, path: Path):
+        self._zip = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+        self._chunk = 0
+
+    def open(self, columns, dtypes) -> None:
+        self._columns = columns
+        with self._zip.open("_columns.npy", "w") as f:
+            np.lib.format.write_array(f, np.array(columns))
+
+    def write(self, arrays) -> None:
+        for c, a in zip(self._columns, arrays):
+            with self._zip.open(f"{c}/{self._chunk:05d}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, a)
+        self._chunk += 1
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+def _sink(path: Path, fmt: str):
+    if fmt == "csv":
+        return _CsvSink(path)
+    if fmt in ("parquet", "arrow"):
+        return _ArrowSink(path, fmt)
+    if fmt == "npz":
+        return _NpzSink(path)
+    raise ValueError(f"unknown timeline format '{fmt}', expected one of {sorted(set(FORMATS.values()))}")
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+class TimelineExporter:
+    """
+    attach(analyzer) … close() → stats.  `fmt` defaults to the file suffix.
+    Rows are buffered per row group on the writer thread only.
+    """
+
+    def __init__(self, path: str | Path, fmt: Optional[str] = None, row_group: int = 4096,
+                 max_queue: int = 1024, block: bool = False, max_width: int = 16):
+        self.path = Path(path)
+        self.fmt = fmt or FORMATS.get(self.path.suffix.lower())
+        self._sink = _sink(self.path, self.fmt)          # pyarrow missing → error here, not later
+        self.row_group = row_group
+        self.block = block
+        self.max_width = max_width
+        self.rows = self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._columns: Optional[list[str]] = None
+        self._pending: list[dict] = []
+        self._analyzer = None
+        self._thread = threading.Thread(target=self._run, name="orbis-timeline", daemon=True)
+        self._thread.start()
+
+    def attach(self, analyzer) -> "TimelineExporter":
+        self._analyzer = analyzer
+        analyzer.frames.add_listener(self.add)
+        return self
+
+    def add(self, frame: dict) -> None:
+        """Queue one frame (any thread); drops and counts when the writer is behind."""
+        try:
+            self._queue.put(frame, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> dict:
+        """Detach, write what is queued and the last (partial) row group."""
+        if self._analyzer is not None:
+            self._analyzer.frames.remove_listener(self.add)
+            self._analyzer = None
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        return dict(path=str(self.path), format=self.fmt, rows=self.rows, dropped=self.dropped)
+
+    # --- writer thread -----------------------------------------------------
+    def _run(self) -> None:
+        try:
+            while True:
+                frame = self._queue.get()
+                if frame is _STOP:
+                    break
+                try:
+                    self._pending.append(frame_row(frame, self.max_width))
+                except Exception as exc:
+                    print("TimelineExporter › bad frame:", exc)
+                    continue
+                if len(self._pending) >= self.row_group:
+                    self._flush()
+            self._flush()
+        finally:
+            self._sink.close()
+
+    def _flush(self) -> None:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return
+        if self._columns is None:
+            seen: Dict[str, None] = {}
+            for r in rows:
+                seen.update(dict.fromkeys(r))
+            self._columns = list(seen)
+            self._dtypes = [np.dtype(np.int64 if c in INT_FIELDS else np.float64)
+                            for c in self._columns]
+            self._sink.open(self._columns, self._dtypes)
+        arrays = [np.array([r.get(c, -1 if d.kind == "i" else np.nan) for r in rows], d)
+                  for c, d in zip(self._columns, self._dtypes)]
+        self._sink.write(arrays)
+        self.rows += len(rows)
+
+
+# ═══════════════════════════════════════════════════════════════════════════
+def export_file(audio_path: str | Path, out_path: str | Path, fmt: Optional[str] = None,
+                features=("band_peaks", "balance", "centroid", "rolloff", "flatness", "flux"),
+                **analyzer_kw) -> dict:
+    """Offline analyzer: decode `audio_path`, analyse it at full speed, write the timeline."""
+    from audio_analyzer import AudioAnalyzer
+    from sources import FileSource
+
+    src = FileSource(audio_path, realtime=False, channels=analyzer_kw.pop("channels", None))
+    analyzer = AudioAnalyzer(source=src, **analyzer_kw)
+    analyzer.subscribe(features)
+    exporter = TimelineExporter(out_path, fmt, block=True).attach(analyzer)
+    t0 = time.perf_counter()
+    try:
+        src.run(analyzer.process)
+    finally:
+        stats = exporter.close()
+    stats.update(audio_s=src.duration, elapsed_s=time.perf_counter() - t0)
+    return stats
+
+
+def read_timeline(path: str | Path) -> Dict[str, np.ndarray]:
+    """Load any exported timeline as {column: array}."""
+    path = Path(path)
+    fmt = FORMATS.get(path.suffix.lower())
+    if fmt in ("parquet", "arrow"):
+        pa = _pyarrow()
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+            table = pq.read_table(str(path))
+        else:
+            table = pa.ipc.open_file(str(path)).read_all()
+        return {c: table.column(c).to_numpy() for c in table.column_names}
+    if fmt == "npz":
+        parts: Dict[str, list] = {}
+        with np.load(path) as z:
+            for c in z["_columns"].tolist():
+                parts[c] = []
+            for key in sorted(k for k in z.files if "/" in k):
+                col, _ = key.rsplit("/", 1)
+                parts[col].append(z[key])
+        return {c: np.concatenate(p) for c, p in parts.items()}
+    if fmt == "csv":
+        with open(path, newline="") as f:
+            r = csv.reader(f)
+            header = next(r)
+            data = np.array([[float(x) if x else np.nan for x in row] for row in r]).reshape(-1, len(header))
+        return {c: data[:, i].astype(np.int64) if c in INT_FIELDS else data[:, i]
+                for i, c in enumerate(header)}
+    raise ValueError(f"unknown timeline format for {path.name}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python timeline_export.py <audio file> <out.csv|.parquet|.arrow|.npz> [--multirate]")
+    st = export_file(sys.argv[1], sys.argv[2], multirate="--multirate" in sys.argv[3:])
+    print(f"{st['rows']} frames · {st['audio_s']:.1f} s of audio in {st['elapsed_s']:.1f} s → {st['path']}")
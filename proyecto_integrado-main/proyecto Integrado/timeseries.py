@@ -0,0 +1,189 @@
+"""
+timeseries  – bounded multi-resolution history of analysis metrics
+• Every metric (scalar, or fixed-width vector such as the band levels)
+  keeps one preallocated ring per resolution: the raw values plus
+  min / max / mean buckets (1 s, 10 s, 1 min by default).  Memory is fixed
+  at construction – see memory_bytes().
+• add() costs O(levels) per metric, cheap enough for the analyzer thread;
+  a bucket closes when t crosses its boundary.  Time only moves forward:
+  older samples are ignored (clear() before replaying from the start).
+• series(name, span) answers from the finest resolution that still covers
+  the span, so the last minute comes from raw frames and a whole night
+  from 1-minute buckets – no raw frame is ever reprocessed.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# (bucket seconds, ring capacity); 0 = raw.  Raw ≈ 13 min at 8192/44.1 kHz,
+# 1 s → 1 h, 10 s → 24 h, 1 min → 24 h.
+DEFAULT_LEVELS = ((0.0, 4096), (1.0, 3600), (10.0, 8640), (60.0, 1440))
+DEFAULT_METRICS = ("volume", "true_peak", "short_term_lufs", "dominant_freq", "bands")
+
+
+class _Ring:
+    """Fixed-capacity (t, min, max, mean) rows; raw rings store the value once."""
+
+    def __init__(self, capacity: int, width: int, raw: bool):
+        self.capacity = capacity
+        self.t = np.full(capacity, np.nan)
+        self.mean = np.full((capacity, width), np.nan, np.float32)
+        self.lo = self.mean if raw else np.full((capacity, width), np.nan, np.float32)
+        self.hi = self.mean if raw else np.full((capacity, width), np.nan, np.float32)
+        self.n = 0                                 # rows ever written
+
+    def push(self, t: float, lo, hi, mean) -> None:
+        i = self.n % self.capacity
+        self.t[i] = t
+        self.mean[i] = mean
+        if self.lo is not self.mean:
+            self.lo[i], self.hi[i] = lo, hi
+        self.n += 1
+
+    @property
+    def oldest(self) -> float:
+        return self.t[self.n % self.capacity] if self.n >= self.capacity else self.t[0]
+
+    def since(self, t0: float) -> tuple[np.ndarray, ...]:
+        """Chronological copies of the rows with t ≥ t0."""
+        k = min(self.n, self.capacity)
+        order = np.arange(self.n - k, self.n) % self.capacity
+        t = self.t[order]
+        sel = order[t >= t0]
+        return self.t[sel], self.lo[sel], self.hi[sel], self.mean[sel]
+
+    def nbytes(self) -> int:
+        arrays = {id(a): a for a in (self.t, self.mean, self.lo, self.hi)}
+        return sum(a.nbytes for a in arrays.values())
+
+
+class _Level:
+    """One resolution of one metric: open bucket + ring of closed ones."""
+
+    def __init__(self, resolution: float, capacity: int, width: int):
+        self.resolution = resolution
+        self.ring = _Ring(capacity, width, raw=resolution <= 0)
+        self._start = None                         # open bucket
+        self._lo = self._hi = self._sum = None
+        self._n = 0
+
+    def add(self, t: float, v: np.ndarray) -> None:
+        if self.resolution <= 0:
+            self.ring.push(t, v, v, v)
+            return
+        start = math.floor(t / self.resolution) * self.resolution
+        if start != self._start:
+            self._close()
+            self._start = start
+            self._lo, self._hi, self._sum, self._n = v.copy(), v.copy(), v.astype(float), 0
+        else:
+            np.minimum(self._lo, v, out=self._lo)
+            np.maximum(self._hi, v, out=self._hi)
+            self._sum += v
+        self._n += 1
+
+    def _close(self) -> None:
+        if self._n:
+            self.ring.push(self._start, self._lo, self._hi, self._sum / self._n)
+            self._n = 0
+
+    def open_bucket(self):
+        """(t, lo, hi, mean) of the bucket still filling, or None."""
+        if not self._n or self.resolution <= 0:
+            return None
+        return self._start, self._lo.copy(), self._hi.copy(), self._sum / self._n
+
+
+class TimeSeriesStore:
+    """
+    add(t, {metric: value}) / add_frame(frame, t); series(metric, span_s).
+    Metric names may be dotted to reach nested frame fields ("features.flux").
+    """
+
+    def __init__(self, metrics=DEFAULT_METRICS, levels=DEFAULT_LEVELS):
+        self.metrics = tuple(metrics)
+        self.levels = tuple((float(r), int(c)) for r, c in levels)
+        self._data: Dict[str, list[_Level]] = {}
+        self._width: Dict[str, int] = {}
+        self._last_t = -math.inf
+        self._lock = threading.Lock()
+
+    @property
+    def resolutions(self) -> tuple[float, ...]:
+        return tuple(r for r, _ in self.levels)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._width.clear()
+            self._last_t = -math.inf
+
+    # -----------------------------------------------------------------------
+    def add(self, t: float, values: Dict[str, Any]) -> None:
+        with self._lock:
+            if t < self._last_t:
+                return
+            self._last_t = t
+            for name, v in values.items():
+                if v is None:
+                    continue
+                v = np.atleast_1d(np.asarray(v, float)).ravel()
+                if self._width.get(name) != len(v):
+                    # new metric, or the band layout changed: old rows are not comparable
+                    self._width[name] = len(v)
+                    self._data[name] = [_Level(r, c, len(v)) for r, c in self.levels]
+                for level in self._data[name]:
+                    level.add(t, v)
+
+    def add_frame(self, frame: Dict[str, Any], t: Optional[float] = None) -> None:
+        """Feed an analyzer snapshot; t defaults to its stream time."""
+        if t is None:
+            t = frame["sample"] / frame["sample_rate"]
+        values = {}
+        for name in self.metrics:
+            v: Any = frame
+            for key in name.split("."):
+                v = v.get(key) if isinstance(v, dict) else None
+            values[name] = v
+        self.add(t, values)
+
+    # -----------------------------------------------------------------------
+    def series(self, name: str, span_s: Optional[float] = None,
+               resolution: Optional[float] = None) -> Dict[str, Any]:
+        """
+        dict(t, min, max, mean, resolution) over the last span_s seconds
+        (all retained history if None).  Vector metrics come as (n, width).
+        """
+        with self._lock:
+            levels = self._data.get(name)
+            if not levels:
+                e = np.zeros(0)
+                return dict(t=e, min=e, max=e, mean=e, resolution=None)
+            t0 = -math.inf if span_s is None else self._last_t - span_s
+            level = self._pick(levels, t0, resolution)
+            t, lo, hi, mean = level.ring.since(t0)
+            tail = level.open_bucket()
+            if tail is not None:                   # the trend reaches "now"
+                t = np.append(t, tail[0])
+                lo, hi, mean = (np.vstack((a, b[None])) for a, b in zip((lo, hi, mean), tail[1:]))
+        if self._width.get(name) == 1:
+            lo, hi, mean = lo[:, 0], hi[:, 0], mean[:, 0]
+        return dict(t=t, min=lo, max=hi, mean=mean, resolution=level.resolution)
+
+    @staticmethod
+    def _pick(levels: list[_Level], t0: float, resolution: Optional[float]) -> _Level:
+        if resolution is not None:
+            return min(levels, key=lambda lv: abs(lv.resolution - resolution))
+        for level in levels:                       # finest level that still reaches t0
+            ring = level.ring
+            if ring.n < ring.capacity or ring.oldest <= t0:
+                return level
+        return levels[-1]
+
+    def memory_bytes(self) -> int:
+        with self._lock:
+            return sum(lv.ring.nbytes() for levels in self._data.values() for lv in levels)